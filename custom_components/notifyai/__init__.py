@@ -1,9 +1,14 @@
+import asyncio
 import logging
 import re
-import os
 import json
-import base64
+import uuid
 import aiohttp
+import voluptuous as vol
+from collections import deque
+from functools import partial
+
+import time as monotonic_time
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
@@ -20,8 +25,88 @@ from .const import (
     CONF_NOTIFY_SERVICE_3,
     CONF_NOTIFY_SERVICE_4,
     CONF_AI_PROVIDER,
-    CONF_GROQ_API_KEY
+    CONF_GROQ_API_KEY,
+    CONF_EXTRA_API_KEYS,
+    CONF_KEY_STRATEGY,
+    DEFAULT_KEY_STRATEGY,
+    DEFAULT_PROVIDER_TIMEOUT,
+    CONF_SIMILARITY_THRESHOLD,
+    CONF_SIMILARITY_MAX_ENTRIES,
+    DEFAULT_SIMILARITY_THRESHOLD,
+    DEFAULT_SIMILARITY_MAX_ENTRIES,
+    CONF_VARIANT_COUNT,
+    CONF_VARIANT_MAX_AGE,
+    DEFAULT_VARIANT_COUNT,
+    DEFAULT_VARIANT_MAX_AGE,
+    CONF_AUTO_MODEL,
+    DEFAULT_AUTO_MODEL,
+    CONF_BREAKER_FAILURES,
+    CONF_BREAKER_FAILURE_RATE,
+    CONF_BREAKER_RECOVERY,
+    DEFAULT_BREAKER_FAILURES,
+    DEFAULT_BREAKER_FAILURE_RATE,
+    DEFAULT_BREAKER_RECOVERY,
+    CONF_REPETITION_THRESHOLD,
+    CONF_REPETITION_HISTORY,
+    DEFAULT_REPETITION_THRESHOLD,
+    DEFAULT_REPETITION_HISTORY,
+    PROVIDER_BASE_URLS,
+    CONF_RECORD_TRAFFIC,
+    DEFAULT_RECORD_TRAFFIC,
+    CONF_LOCAL_API_KEY,
+    CONF_CRITICAL_RESERVE,
+    CONF_THROTTLE_LOW_PRIORITY,
+    DEFAULT_CRITICAL_RESERVE,
+    DEFAULT_THROTTLE_LOW_PRIORITY,
+    CONF_LOOP_WATCHDOG,
+    CONF_SLOW_STEP_MS,
+    DEFAULT_LOOP_WATCHDOG,
+    DEFAULT_SLOW_STEP_MS,
+    CONF_DIGEST_INTERVAL,
+    CONF_DIGEST_MAX_EVENTS,
+    DEFAULT_DIGEST_INTERVAL,
+    DEFAULT_DIGEST_MAX_EVENTS,
+    CONF_TRIGGER_RULES,
+    CONF_NOTIFICATION_LANGUAGE,
+    DEFAULT_NOTIFICATION_LANGUAGE
+)
+from .batch import (
+    DEFAULT_BATCH_CONCURRENCY,
+    DEFAULT_PACK_SIZE,
+    PACKED_SYSTEM_PROMPT,
+    build_packed_prompt,
+    can_pack,
+    chunked,
+    parse_packed_response
+)
+from .cache import ResponseCache
+from .circuit_breaker import CircuitBreakers, CircuitOpenError, ProviderError, is_outage
+from .digest import DIGEST_SYSTEM_PROMPT, DigestManager, is_digest
+from .forecast import QuotaForecast
+from .images import async_load_images, has_image
+from .jobs import JobTracker
+from .key_pool import ApiKeyPool, RateLimitError, parse_api_keys, parse_retry_after
+from .loop_monitor import LoopWatchdog, loop_phase, loop_stage
+from .local_templates import render_local_notification
+from .model_policy import ModelPolicy
+from .openai_compat import NO_API_KEY, async_fetch_models, auth_headers, entry_base_url
+from .repetition import RepetitionGuard
+from .replay import (
+    DEFAULT_REPLAY_CONCURRENCY,
+    DEFAULT_STANDIN_LATENCY_MS,
+    StandInProvider,
+    async_replay
 )
+from .recipients import RECIPIENTS_SYSTEM_PROMPT, build_recipients_prompt, normalize_recipients, recipient_call_data
+from .router import RECENT_ERRORS, async_select_entry, record_error, record_latency
+from .similarity import SimilarityIndex, retemplate
+from .supersede import SupersedeTracker
+from .suppression import SuppressionManager
+from .triggers import TriggerEngine, parse_rules
+from .traffic import TrafficRecorder, build_record, load_records
+from .usage import UsageTracker, next_quota_reset
+from .views import NotifyAIBulkView
+from .variants import VARIANTS_SYSTEM_PROMPT, VariantPool
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -34,286 +119,1298 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     # Get appropriate API key based on provider
     if provider == "gemini":
         api_key = entry.data.get(CONF_API_KEY)
+    elif provider == "local":
+        # Local servers usually run without authentication
+        api_key = entry.data.get(CONF_LOCAL_API_KEY) or NO_API_KEY
     else:  # groq
         api_key = entry.data.get(CONF_GROQ_API_KEY)
     
     if not api_key:
         _LOGGER.error("No API key found in configuration entry.")
         return False
+
+    hass.data[DOMAIN][entry.entry_id] = create_entry_data(hass, entry, provider, api_key)
+    usage = hass.data[DOMAIN][entry.entry_id]["usage"]
+    model_name = hass.data[DOMAIN][entry.entry_id][CONF_MODEL]
+
+    # Debug: List available models to help user find correct one (only for Gemini)
+    if provider == "gemini":
+        hass.async_create_task(log_available_models(hass, api_key))
+    elif provider == "local":
+        hass.async_create_task(log_local_models(hass, hass.data[DOMAIN][entry.entry_id]["base_url"], api_key, model_name))
+
+    usage.async_start()
+    entry.async_on_unload(usage.async_stop)
+    entry.async_on_unload(entry.add_update_listener(update_listener))
+    
+    # Set up sensor platform
+    await hass.config_entries.async_forward_entry_setups(entry, ["sensor"])
+
+    # The service is shared by all entries; keep it registered while any entry is loaded
+    hass.data[DOMAIN]["service_refs"] = hass.data[DOMAIN].get("service_refs", 0) + 1
+    hass.data[DOMAIN].setdefault("jobs", JobTracker(hass))
+    hass.data[DOMAIN].setdefault("suppression", SuppressionManager(hass, partial(_async_flush_summary, hass)))
+    hass.data[DOMAIN].setdefault("traffic", TrafficRecorder(hass))
+    hass.data[DOMAIN].setdefault("supersede", SupersedeTracker())
+    if "digest" not in hass.data[DOMAIN]:
+        hass.data[DOMAIN]["digest"] = DigestManager(hass, partial(_async_flush_summary, hass))
+        await hass.data[DOMAIN]["digest"].async_load()
+    hass.data[DOMAIN].setdefault("loop_watchdog", LoopWatchdog(hass)).configure(
+        entry.entry_id,
+        entry.options.get(CONF_LOOP_WATCHDOG, DEFAULT_LOOP_WATCHDOG),
+        entry.options.get(CONF_SLOW_STEP_MS, DEFAULT_SLOW_STEP_MS)
+    )
+    if not hass.services.has_service(DOMAIN, "generate"):
+        async_register_services(hass)
+    # Views can't be unregistered; the view answers 503 while no entry is loaded
+    if not hass.data[DOMAIN].get("bulk_view"):
+        hass.http.register_view(NotifyAIBulkView(partial(async_handle_generate, hass)))
+        hass.data[DOMAIN]["bulk_view"] = True
+
+    # Trigger rules feed state changes into the pipeline without an automation per notification
+    try:
+        rules = parse_rules(entry.options.get(CONF_TRIGGER_RULES, ""))
+    except vol.Invalid as e:
+        _LOGGER.error("NotifyAI - Ignoring invalid trigger rules: %s", e)
+        rules = []
+    triggers = TriggerEngine(hass, rules, partial(async_handle_generate, hass, entry))
+    hass.data[DOMAIN][entry.entry_id]["triggers"] = triggers
+    triggers.async_start()
+    entry.async_on_unload(triggers.async_stop)
+
+    return True
+
+def create_entry_data(hass: HomeAssistant, entry: ConfigEntry, provider: str, api_key: str) -> dict:
+    """Build the runtime state of an entry (also used for isolated traffic replays)."""
+    default_model = {
+        "gemini": "gemini-flash-latest",
+        "groq": "llama-3.3-70b-versatile",
+    }.get(provider, entry.data.get(CONF_MODEL))
+    model_name = entry.options.get(CONF_MODEL, default_model)
+    breakers = CircuitBreakers(
+        entry.options.get(CONF_BREAKER_FAILURES, DEFAULT_BREAKER_FAILURES),
+        entry.options.get(CONF_BREAKER_FAILURE_RATE, DEFAULT_BREAKER_FAILURE_RATE) / 100,
+        entry.options.get(CONF_BREAKER_RECOVERY, DEFAULT_BREAKER_RECOVERY)
+    )
+
+    # Request counters; daily totals reset at the provider's quota boundary
+    usage = UsageTracker(hass, provider)
+
+    # Extra keys for the same provider are rotated together with the primary key
+    key_pool = ApiKeyPool(
+        parse_api_keys([api_key] + list(entry.data.get(CONF_EXTRA_API_KEYS, []))),
+        entry.options.get(CONF_KEY_STRATEGY, DEFAULT_KEY_STRATEGY),
+        partial(next_quota_reset, provider)
+    )
+    usage.add_reset_listener(key_pool.reset_daily)
         
-    hass.data[DOMAIN][entry.entry_id] = {
+    entry_data = {
+        # Option changes are applied live; a change of these (credentials, provider) reloads
+        "config_data": dict(entry.data),
         CONF_AI_PROVIDER: provider,
         CONF_API_KEY: api_key,  # Store for backward compatibility
-        CONF_MODEL: entry.options.get(CONF_MODEL, "gemini-flash-latest" if provider == "gemini" else "llama-3.3-70b-versatile"),
+        "base_url": entry_base_url(provider, entry.data, entry.options),
+        "key_pool": key_pool,
+        "usage": usage,
+        "response_cache": ResponseCache(),
+        "similarity_index": SimilarityIndex(
+            entry.options.get(CONF_SIMILARITY_THRESHOLD, DEFAULT_SIMILARITY_THRESHOLD),
+            entry.options.get(CONF_SIMILARITY_MAX_ENTRIES, DEFAULT_SIMILARITY_MAX_ENTRIES)
+        ),
+        "repetition_guard": RepetitionGuard(
+            entry.options.get(CONF_REPETITION_THRESHOLD, DEFAULT_REPETITION_THRESHOLD),
+            entry.options.get(CONF_REPETITION_HISTORY, DEFAULT_REPETITION_HISTORY)
+        ),
+        "variant_pool": VariantPool(
+            entry.options.get(CONF_VARIANT_COUNT, DEFAULT_VARIANT_COUNT) - 1,
+            entry.options.get(CONF_VARIANT_MAX_AGE, DEFAULT_VARIANT_MAX_AGE) * 60
+        ),
+        CONF_MODEL: model_name,
+        "breakers": breakers,
+        "forecast": QuotaForecast(
+            hass,
+            entry.entry_id,
+            usage,
+            entry.options.get(CONF_CRITICAL_RESERVE, DEFAULT_CRITICAL_RESERVE),
+            entry.options.get(CONF_THROTTLE_LOW_PRIORITY, DEFAULT_THROTTLE_LOW_PRIORITY)
+        ),
+        "model_policy": ModelPolicy(
+            hass, provider, model_name, usage, entry.options.get(CONF_AUTO_MODEL, DEFAULT_AUTO_MODEL), breakers
+        ),
         "usage_data": {
             "daily_count": 0,
             "last_call_time": None,
             "last_call_status": None,
             "last_reset": None,
             "last_error": None
-        }
+        },
+        "latency": {
+            "ewma_ms": None,
+            "last_ms": None,
+            "samples": 0
+        },
+        # Diagnostics: classes of recent provider failures and what each TTS service accepted
+        "recent_errors": deque(maxlen=RECENT_ERRORS),
+        "tts_findings": {}
     }
+    usage.add_reset_listener(partial(_reset_daily_usage, entry_data))
+    return entry_data
 
-    # Debug: List available models to help user find correct one (only for Gemini)
-    if provider == "gemini":
-        hass.async_create_task(log_available_models(hass, api_key))
+async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    """Unload a config entry."""
+    unload_ok = await hass.config_entries.async_unload_platforms(entry, ["sensor"])
+    if unload_ok:
+        hass.data[DOMAIN].pop(entry.entry_id)
+        hass.data[DOMAIN]["jobs"].async_cancel_entry(entry.entry_id)
+        hass.data[DOMAIN]["loop_watchdog"].remove(entry.entry_id)
 
+        hass.data[DOMAIN]["service_refs"] = max(0, hass.data[DOMAIN].get("service_refs", 1) - 1)
+        if hass.data[DOMAIN]["service_refs"] == 0:
+            hass.services.async_remove(DOMAIN, "generate")
+            hass.services.async_remove(DOMAIN, "generate_batch")
+            hass.services.async_remove(DOMAIN, "replay")
+            # Buffered digest events are written out and restored by the next setup
+            await hass.data[DOMAIN].pop("digest").async_stop()
+    return unload_ok
 
-    entry.async_on_unload(entry.add_update_listener(update_listener))
-    
-    # Set up sensor platform
-    await hass.config_entries.async_forward_entry_setups(entry, ["sensor"])
+def _reset_daily_usage(entry_data: dict) -> None:
+    """Drop the previous day's quota view when the provider's daily quota resets."""
+    from homeassistant.util import dt as dt_util
+
+    entry_data.pop("quota_data", None)
+    entry_data["usage_data"]["daily_count"] = 0
+    entry_data["usage_data"]["last_reset"] = dt_util.now().isoformat()
+
+async def update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Apply option changes to the running entry; reload only for new credentials or provider."""
+    entry_data = hass.data.get(DOMAIN, {}).get(entry.entry_id)
+    if entry_data is None or entry_data.get("reloading"):
+        # Not loaded or already reloading; setup reads the current data and options
+        return
+    if entry_data["config_data"] != dict(entry.data):
+        entry_data["reloading"] = True
+        await hass.config_entries.async_reload(entry.entry_id)
+        return
+    async_apply_options(hass, entry, entry_data)
+
+def async_apply_options(hass: HomeAssistant, entry: ConfigEntry, entry_data: dict) -> None:
+    """Push the entry's current options into its runtime objects.
+
+    Caches, counters and in-flight calls are kept; bounded structures are
+    resized in place.
+    """
+    options = entry.options
+    provider = entry_data[CONF_AI_PROVIDER]
+
+    model_name = options.get(CONF_MODEL, entry_data["model_policy"].preferred_model)
+    if model_name != entry_data[CONF_MODEL]:
+        # Quota headers described the previous model
+        entry_data.pop("quota_data", None)
+        _LOGGER.info("NotifyAI - Model changed to %s", model_name)
+    entry_data[CONF_MODEL] = model_name
+    entry_data["model_policy"].configure(model_name, options.get(CONF_AUTO_MODEL, DEFAULT_AUTO_MODEL))
+    entry_data["base_url"] = entry_base_url(provider, entry.data, options)
+    entry_data["key_pool"].strategy = options.get(CONF_KEY_STRATEGY, DEFAULT_KEY_STRATEGY)
+
+    similarity_index = entry_data["similarity_index"]
+    similarity_index.threshold = options.get(CONF_SIMILARITY_THRESHOLD, DEFAULT_SIMILARITY_THRESHOLD)
+    similarity_index.resize(options.get(CONF_SIMILARITY_MAX_ENTRIES, DEFAULT_SIMILARITY_MAX_ENTRIES))
+    repetition_guard = entry_data["repetition_guard"]
+    repetition_guard.threshold = options.get(CONF_REPETITION_THRESHOLD, DEFAULT_REPETITION_THRESHOLD)
+    repetition_guard.resize(options.get(CONF_REPETITION_HISTORY, DEFAULT_REPETITION_HISTORY))
+    entry_data["variant_pool"].resize(
+        options.get(CONF_VARIANT_COUNT, DEFAULT_VARIANT_COUNT) - 1,
+        options.get(CONF_VARIANT_MAX_AGE, DEFAULT_VARIANT_MAX_AGE) * 60
+    )
+    entry_data["breakers"].configure(
+        options.get(CONF_BREAKER_FAILURES, DEFAULT_BREAKER_FAILURES),
+        options.get(CONF_BREAKER_FAILURE_RATE, DEFAULT_BREAKER_FAILURE_RATE) / 100,
+        options.get(CONF_BREAKER_RECOVERY, DEFAULT_BREAKER_RECOVERY)
+    )
+    forecast = entry_data["forecast"]
+    forecast.reserve = options.get(CONF_CRITICAL_RESERVE, DEFAULT_CRITICAL_RESERVE)
+    forecast.throttle_low = options.get(CONF_THROTTLE_LOW_PRIORITY, DEFAULT_THROTTLE_LOW_PRIORITY)
+    hass.data[DOMAIN]["loop_watchdog"].configure(
+        entry.entry_id,
+        options.get(CONF_LOOP_WATCHDOG, DEFAULT_LOOP_WATCHDOG),
+        options.get(CONF_SLOW_STEP_MS, DEFAULT_SLOW_STEP_MS)
+    )
+
+    # Rules are swapped only when they are valid; the old ones keep running otherwise
+    try:
+        rules = parse_rules(options.get(CONF_TRIGGER_RULES, ""))
+    except vol.Invalid as e:
+        _LOGGER.error("NotifyAI - Keeping the previous trigger rules, the new ones are invalid: %s", e)
+    else:
+        entry_data["triggers"].async_reload(rules)
+
+    # Notify targets, variant count, digest and traffic settings are read per call
+    _LOGGER.debug("NotifyAI - Applied options to %s without a reload", entry.title)
+
+def async_register_services(hass: HomeAssistant) -> None:
+    """Register the domain-level services (once for all entries)."""
 
     async def generate_notification(call: ServiceCall) -> ServiceResponse:
-        """Handle the service call."""
-        from datetime import datetime
-        
-        event = call.data.get("event")
-        custom_title = call.data.get("custom_title")  # New: optional custom title
-        context = call.data.get("context", "")  # Optional now
-        mode = call.data.get("mode", "smart")  # Default to smart
-        persona = call.data.get("persona") 
-        image_path = call.data.get("image_path")
-        
-        # Auto-generate time if not provided
-        time = datetime.now().strftime('%H:%M')
-        
-        # Service call override
-        notify_service_arg = call.data.get("notify_service")
-        
-        # TTS arguments
-        audio_device = call.data.get("audio_device")
-        tts_service = call.data.get("tts_service", "tts.google_translate_say")
-        language = call.data.get("language")
+        """Handle the service call by routing it to a loaded entry."""
+        entry = async_select_entry(hass, call.data.get("entry_id"))
 
-        model_name = hass.data[DOMAIN][entry.entry_id][CONF_MODEL]
+        data = {**call.data, "call_context": call.context}
+        # Fire-and-forget: return a job id now, report the result on the event bus
+        if call.data.get("background"):
+            job_id = hass.data[DOMAIN]["jobs"].submit(
+                entry.entry_id, data, partial(async_handle_generate, hass, entry, data)
+            )
+            return {"job_id": job_id, "status": "queued", "entry_id": entry.entry_id}
 
-        system_prompt = await hass.async_add_executor_job(load_system_prompt, hass)
+        return await async_handle_generate(hass, entry, data)
+
+    async def generate_batch(call: ServiceCall) -> ServiceResponse:
+        """Handle a batch of generate requests."""
+        items = call.data.get("items")
+        if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+            raise HomeAssistantError("items must be a list of event objects")
+        with loop_phase(hass, "generate_batch"):
+            return await async_generate_batch(
+                hass, {**call.data, "items": [{**item, "call_context": call.context} for item in items]}
+            )
+
+    async def replay_traffic(call: ServiceCall) -> ServiceResponse:
+        """Replay recorded generate calls offline and report the measurements."""
+        entry = async_select_entry(hass, call.data.get("entry_id"))
+        return await async_replay_traffic(hass, entry, call.data)
+
+    hass.services.async_register(
+        DOMAIN, 
+        "generate", 
+        generate_notification,
+        supports_response=SupportsResponse.OPTIONAL
+    )
+    hass.services.async_register(
+        DOMAIN,
+        "generate_batch",
+        generate_batch,
+        supports_response=SupportsResponse.OPTIONAL
+    )
+    hass.services.async_register(
+        DOMAIN,
+        "replay",
+        replay_traffic,
+        supports_response=SupportsResponse.ONLY
+    )
+
+async def async_handle_generate(hass: HomeAssistant, entry: ConfigEntry, data: dict) -> dict:
+    """Apply debounce/cooldown suppression, then generate and deliver."""
+    started = monotonic_time.monotonic()
+    try:
+        with loop_phase(hass, "generate"):
+            # Dry runs (replays, previews) never cancel or get cancelled by real calls
+            if data.get("supersede_key") and not data.get("dry_run"):
+                response = await _async_run_latest(hass, entry, data)
+            else:
+                response = await _async_handle_call(hass, entry, data)
+    except Exception as e:
+        _record_traffic(hass, entry, data, None, e, started)
+        raise
+    _record_traffic(hass, entry, data, response, None, started)
+    return response
+
+async def _async_handle_call(hass: HomeAssistant, entry: ConfigEntry, data: dict) -> dict:
+    if data.get("dry_run"):
+        # Dry runs must not touch the live debounce/cooldown state or queue a real digest
+        call_data = data
+    else:
+        call_data, suppressed = await hass.data[DOMAIN]["suppression"].async_check(entry.entry_id, data)
+        if call_data is None:
+            # Suppressed calls never touch the network
+            return {"status": "suppressed", "entry_id": entry.entry_id, **suppressed}
+    if call_data.get("digest") and not call_data.get("dry_run"):
+        # Informational events wait for the next summary instead of costing a call each
+        return {
+            "status": "digested",
+            "entry_id": entry.entry_id,
+            **hass.data[DOMAIN]["digest"].add(
+                entry.entry_id,
+                call_data,
+                entry.options.get(CONF_DIGEST_INTERVAL, DEFAULT_DIGEST_INTERVAL) * 60,
+                entry.options.get(CONF_DIGEST_MAX_EVENTS, DEFAULT_DIGEST_MAX_EVENTS)
+            )
+        }
+    if call_data.get("recipients"):
+        return await async_generate_for_recipients(hass, entry, call_data)
+    return await async_generate_notification(hass, entry, call_data)
+
+async def _async_run_latest(hass: HomeAssistant, entry: ConfigEntry, data: dict) -> dict:
+    """Run a call in its own task so a newer call with the same supersede_key can cancel it.
+
+    Only that task is cancelled, never the caller (an automation or the HTTP view).
+    """
+    task = hass.async_create_task(_async_handle_call(hass, entry, data))
+    hass.data[DOMAIN]["supersede"].track(entry.entry_id, data["supersede_key"], task)
+    try:
+        await asyncio.wait({task})
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    if task.cancelled():
+        return {"status": "superseded", "entry_id": entry.entry_id, "supersede_key": data["supersede_key"]}
+    return task.result()
+
+def _record_traffic(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    data: dict,
+    response: dict,
+    error: Exception,
+    started: float
+) -> None:
+    """Append the call to the traffic file if the entry records traffic (replays are never recorded)."""
+    if data.get("dry_run") or not entry.options.get(CONF_RECORD_TRAFFIC, DEFAULT_RECORD_TRAFFIC):
+        return
+    recorder = hass.data[DOMAIN].get("traffic")
+    if recorder is None:
+        return
+    recorder.record(build_record(
+        entry.entry_id,
+        hass.data[DOMAIN].get(entry.entry_id, {}).get(CONF_AI_PROVIDER),
+        data,
+        response,
+        error,
+        (monotonic_time.monotonic() - started) * 1000
+    ))
+
+class _ReplayEntry:
+    """An entry's settings under a separate id, so a replay gets its own runtime state."""
+
+    def __init__(self, entry: ConfigEntry) -> None:
+        """Copy what the pipeline reads from a config entry."""
+        self.entry_id = f"{entry.entry_id}_replay_{uuid.uuid4().hex[:8]}"
+        self.title = f"{entry.title} (replay)"
+        self.data = entry.data
+        self.options = entry.options
+
+async def async_replay_traffic(hass: HomeAssistant, entry: ConfigEntry, data: dict) -> dict:
+    """Re-issue recorded calls through an isolated copy of an entry whose provider is a local stand-in.
+
+    Notifications are generated but not delivered (dry run). The copy has its
+    own caches, usage, key pool, breakers and base URL, so neither real calls
+    nor the entry's sensors are affected while a replay runs.
+    """
+    path = data.get("file") or hass.data[DOMAIN]["traffic"].path
+    records = await hass.async_add_executor_job(load_records, path, data.get("limit"))
+    if not records:
+        raise HomeAssistantError(f"No recorded calls found in {path}")
+
+    live_data = hass.data[DOMAIN][entry.entry_id]
+    replay_entry = _ReplayEntry(entry)
+    replay_data = create_entry_data(hass, replay_entry, live_data[CONF_AI_PROVIDER], live_data[CONF_API_KEY])
+    standin = StandInProvider(float(data.get("latency_ms", DEFAULT_STANDIN_LATENCY_MS)))
+    replay_data["base_url"] = await standin.async_start()
+    hass.data[DOMAIN][replay_entry.entry_id] = replay_data
+    try:
+        async def handler(call_data: dict) -> dict:
+            return await async_handle_generate(hass, replay_entry, {**call_data, "dry_run": True})
+
+        report = await async_replay(
+            records,
+            handler,
+            float(data.get("speed", 1.0)),
+            int(data.get("concurrency", DEFAULT_REPLAY_CONCURRENCY))
+        )
+    finally:
+        hass.data[DOMAIN].pop(replay_entry.entry_id, None)
+        await standin.async_stop()
+
+    report["provider_calls"] = standin.requests
+    report["entry_id"] = entry.entry_id
+    report["file"] = path
+    return report
+
+async def _async_flush_summary(hass: HomeAssistant, entry_id: str, data: dict) -> None:
+    """Send a summary built outside a service call (cooldown leftovers, digests)."""
+    try:
+        entry = async_select_entry(hass, entry_id)
+    except HomeAssistantError:
+        # The entry went away meanwhile; any other loaded entry will do
+        try:
+            entry = async_select_entry(hass)
+        except HomeAssistantError:
+            return
+    await async_generate_notification(hass, entry, data)
+
+async def async_generate_notification(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    data: dict,
+    system_prompt: str = None
+) -> dict:
+    """Generate a notification with the given entry and deliver it."""
+    from datetime import datetime
+    
+    event = data.get("event")
+    custom_title = data.get("custom_title")  # New: optional custom title
+    context = data.get("context", "")  # Optional now
+    mode = data.get("mode", "smart")  # Default to smart
+    persona = data.get("persona") 
+    timeout_ms = data.get("timeout_ms")
+    
+    # Auto-generate time if not provided
+    time = datetime.now().strftime('%H:%M')
+
+    started = monotonic_time.monotonic()
+    entry_data = hass.data[DOMAIN][entry.entry_id]
+    response_cache = entry_data["response_cache"]
+    cache_key = ResponseCache.make_key(event, mode, persona, context, data.get("output_language"))
+
+    result = None
+    source = "ai"
+    fallback_reason = None
+    if data.get("local_only"):
+        fallback_reason = "requested"
+    elif not has_image(data) and (variant := entry_data["variant_pool"].take(cache_key)):
+        # An unused variant from an earlier multi-variant call for the same event
+        result = variant
+        source = "variant"
+    elif entry_data["key_pool"].available_count() == 0:
+        fallback_reason = "quota_exhausted"
+    elif not has_image(data) and not is_digest(data) and (similar := reuse_similar(entry_data, data)):
+        # A near-identical event was generated recently; reuse it with fresh numbers
+        result = similar
+        source = "similar"
+    elif throttle_reason := entry_data["forecast"].throttle_reason(data.get("priority")):
+        # Keep the remaining quota for more important calls
+        fallback_reason = throttle_reason
+    elif timeout_ms:
+        # Run the provider call as a task so the deadline doesn't abort it
+        task = hass.async_create_task(async_generate_with_ai(hass, entry, data, time, system_prompt))
+        try:
+            result = await asyncio.wait_for(asyncio.shield(task), timeout_ms / 1000)
+        except asyncio.CancelledError:
+            # Superseded: the shield only protects against the deadline
+            task.cancel()
+            raise
+        except asyncio.TimeoutError:
+            _LOGGER.warning("NotifyAI - Provider missed the %s ms deadline, using fallback", timeout_ms)
+            fallback_reason = "timeout"
+            # Keep the late answer so the next fallback for this event is AI-written
+            task.add_done_callback(partial(_remember_late_result, entry_data, data))
+        except CircuitOpenError as e:
+            _LOGGER.debug("NotifyAI - %s, using fallback", e)
+            fallback_reason = "circuit_open"
+        except Exception as e:
+            _LOGGER.error("Error generating notification: %s", e)
+            fallback_reason = "error"
+    else:
+        try:
+            result = await async_generate_with_ai(hass, entry, data, time, system_prompt)
+        except CircuitOpenError as e:
+            _LOGGER.debug("NotifyAI - %s, using fallback", e)
+            fallback_reason = "circuit_open"
+        except Exception as e:
+            _LOGGER.error("Error generating notification: %s", e)
+            fallback_reason = "error"
+
+    if result is not None:
+        if source == "ai":
+            remember_result(entry_data, data, result)
+    else:
+        # Fallback: last AI result for the same event, else a local template
+        result = response_cache.get(cache_key)
+        source = "cache"
+        if result is None:
+            result = render_local_notification(
+                event, mode, persona, context, time, data.get("output_language") or entry_language(entry)
+            )
+            source = "local"
+
+    # Don't send (nearly) the same wording as the last few notifications of this event
+    repeated = False
+    repetition_guard = entry_data["repetition_guard"]
+    with loop_stage(hass, "repetition_check"):
+        is_repeat = not has_image(data) and repetition_guard.is_repeat(cache_key, result[1])
+    if is_repeat:
+        result, source, repeated = await async_replace_repeat(
+            hass, entry, data, result, source,
+            fallback_reason is None and source == "ai" and not timeout_ms,
+            time, system_prompt
+        )
+
+    parsed_title, parsed_body = result
+    generated = monotonic_time.monotonic()
+    
+    # Use custom title if provided, otherwise use parsed title
+    if custom_title:
+        title = custom_title
+        body = parsed_body  # Use only the body part from AI response
+    else:
+        title = parsed_title
+        body = parsed_body
+
+    try:
+        if not data.get("dry_run"):
+            with loop_phase(hass, "deliver"):
+                await async_deliver_notification(hass, entry, title, body, data)
+    except Exception as e:
+        _LOGGER.error("Error delivering notification: %s", e)
+    if not has_image(data):
+        repetition_guard.remember(cache_key, title, body)
+
+    response = {
+        "title": title,
+        "body": body,
+        "entry_id": entry.entry_id,
+        "source": source,
+        "timings": {
+            "generation_ms": round((generated - started) * 1000, 1),
+            "delivery_ms": round((monotonic_time.monotonic() - generated) * 1000, 1)
+        }
+    }
+    if source == "ai":
+        response["model"] = entry_data["model_policy"].active_model
+    if fallback_reason:
+        response["fallback_reason"] = fallback_reason
+    if repeated:
+        response["repeated"] = True
+    return response
+
+async def async_generate_for_recipients(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    data: dict,
+    system_prompt: str = None
+) -> dict:
+    """Write one event for several recipients in a single request and deliver each variant.
+
+    Every recipient may have its own language, mode/persona and notify/TTS
+    target; the model returns all variants as one JSON array, so the cost and
+    latency don't grow with the number of recipients. When that request can't
+    be made or answered, the recipients are served one by one instead; after a
+    missed `timeout_ms` deadline they get local fallbacks right away.
+    """
+    from datetime import datetime
+
+    recipients = normalize_recipients(data.get("recipients"))
+    time = datetime.now().strftime('%H:%M')
+    started = monotonic_time.monotonic()
+    entry_data = hass.data[DOMAIN][entry.entry_id]
+
+    calls = [recipient_call_data(data, recipient) for recipient in recipients]
+    timeout_ms = data.get("timeout_ms")
+
+    async def request_variants() -> tuple:
+        """One structured request for every recipient; (model, variants or None)."""
+        nonlocal system_prompt
+        # Batches pass the prompt in so it's read from disk only once
+        if system_prompt is None:
+            system_prompt = await hass.async_add_executor_job(load_system_prompt, hass)
         if not system_prompt:
-             return {"title": "Error", "body": "System prompt missing."}
+            raise Exception("System prompt missing.")
+        user_message_text = build_recipients_prompt(data, recipients, time, entry_language(entry))
+        images = await async_load_images(hass, data) if has_image(data) else None
+        if images and len(images) > 1:
+            user_message_text += f"\nImages: {len(images)} frames in chronological order"
 
-        if persona:
-             system_prompt += f"\n\nIMPORTANT: You must adopt the persona of '{persona}'. Ignore the standard 'Mode' setting. Act exactly like {persona} would."
+        model_name = entry_data["model_policy"].select()
+        response_text = await async_request_completion(
+            hass,
+            entry.entry_id,
+            model_name,
+            localize_prompt(system_prompt, entry_language(entry)) + RECIPIENTS_SYSTEM_PROMPT.format(count=len(recipients)),
+            user_message_text,
+            images
+        )
+        with loop_stage(hass, "parse_response"):
+            return model_name, parse_packed_response(response_text, len(recipients))
 
-        # Build user message (context is optional)
-        user_message_text = f"""Event: {event}
+    def remember_late_variants(task: asyncio.Task) -> None:
+        """Store the variants of a structured answer that arrived after the deadline."""
+        if task.cancelled() or task.exception() is not None or task.result()[1] is None:
+            return
+        for call_data, variant in zip(calls, task.result()[1]):
+            remember_result(entry_data, call_data, variant)
+
+    variants = None
+    model_name = None
+    fallback_reason = None
+    if (
+        not data.get("local_only")
+        and entry_data["key_pool"].available_count()
+        and not entry_data["forecast"].throttle_reason(data.get("priority"), count=False)
+    ):
+        try:
+            if timeout_ms:
+                # Same deadline handling as a single call: the request keeps running
+                task = hass.async_create_task(request_variants())
+                try:
+                    model_name, variants = await asyncio.wait_for(asyncio.shield(task), timeout_ms / 1000)
+                except asyncio.CancelledError:
+                    task.cancel()
+                    raise
+                except asyncio.TimeoutError:
+                    _LOGGER.warning("NotifyAI - Recipients request missed the %s ms deadline, using fallback", timeout_ms)
+                    fallback_reason = "timeout"
+                    task.add_done_callback(remember_late_variants)
+            else:
+                model_name, variants = await request_variants()
+            if variants is None and fallback_reason is None:
+                _LOGGER.warning("NotifyAI - Recipients answer didn't hold %s notifications, serving them one by one", len(recipients))
+        except Exception as e:
+            _LOGGER.warning("NotifyAI - Recipients request failed, serving them one by one: %s", e)
+
+    if variants is None:
+        if fallback_reason:
+            # The deadline is already spent; no second round of provider calls
+            calls = [{**call_data, "local_only": True} for call_data in calls]
+        responses = await asyncio.gather(
+            *(async_generate_notification(hass, entry, call_data, system_prompt) for call_data in calls)
+        )
+        if fallback_reason:
+            for response in responses:
+                response["fallback_reason"] = fallback_reason
+        return {
+            "entry_id": entry.entry_id,
+            "requests": 1 if fallback_reason else len(calls),
+            "recipients": [{"index": index, **response} for index, response in enumerate(responses)],
+        }
+
+    generated = monotonic_time.monotonic()
+    repetition_guard = entry_data["repetition_guard"]
+    results = []
+    deliveries = []
+    for index, (call_data, (title, body)) in enumerate(zip(calls, variants)):
+        remember_result(entry_data, call_data, (title, body))
+        if data.get("custom_title"):
+            title = data["custom_title"]
+        result = {"index": index, "title": title, "body": body}
+        for field in ("notify_service", "audio_device", "output_language"):
+            if call_data.get(field):
+                result[field] = call_data[field]
+        if not has_image(call_data):
+            # Flagged only, like packed batch answers; replacing one would cost a request
+            item_key = ResponseCache.make_key(
+                call_data.get("event"), call_data.get("mode", "smart"), call_data.get("persona"),
+                call_data.get("context", ""), call_data.get("output_language")
+            )
+            if repetition_guard.is_repeat(item_key, body):
+                result["repeated"] = True
+            repetition_guard.remember(item_key, title, body)
+        results.append(result)
+        deliveries.append((title, body, call_data))
+
+    async def deliver(title: str, body: str, call_data: dict) -> None:
+        try:
+            await async_deliver_notification(hass, entry, title, body, call_data)
+        except Exception as e:
+            _LOGGER.error("Error delivering notification: %s", e)
+
+    if not data.get("dry_run"):
+        with loop_phase(hass, "deliver"):
+            await asyncio.gather(*(deliver(*delivery) for delivery in deliveries))
+
+    return {
+        "entry_id": entry.entry_id,
+        "source": "ai",
+        "model": model_name,
+        "requests": 1,
+        "recipients": results,
+        "timings": {
+            "generation_ms": round((generated - started) * 1000, 1),
+            "delivery_ms": round((monotonic_time.monotonic() - generated) * 1000, 1)
+        }
+    }
+
+async def async_replace_repeat(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    data: dict,
+    result: tuple,
+    source: str,
+    can_regenerate: bool,
+    time: str,
+    system_prompt: str = None
+) -> tuple:
+    """Swap a too-similar notification for an alternative; regenerate only as a last resort.
+
+    Returns (result, source, still_repeated).
+    """
+    entry_data = hass.data[DOMAIN][entry.entry_id]
+    repetition_guard = entry_data["repetition_guard"]
+    event = data.get("event")
+    mode = data.get("mode", "smart")
+    persona = data.get("persona")
+    context = data.get("context", "")
+    cache_key = ResponseCache.make_key(event, mode, persona, context, data.get("output_language"))
+
+    def is_fresh(candidate) -> bool:
+        return candidate is not None and not repetition_guard.is_repeat(cache_key, candidate[1], count=False)
+
+    # 1. Spare variants of the same event
+    while (variant := entry_data["variant_pool"].take(cache_key)) is not None:
+        if is_fresh(variant):
+            repetition_guard.replaced += 1
+            return variant, "variant", False
+
+    # 2. The last AI answer for the event, or another local template
+    if source != "cache":
+        cached = entry_data["response_cache"].get(cache_key)
+        if cached != result and is_fresh(cached):
+            repetition_guard.replaced += 1
+            return cached, "cache", False
+    if source == "local":
+        for _ in range(3):
+            candidate = render_local_notification(
+                event, mode, persona, context, time, data.get("output_language") or entry_language(entry)
+            )
+            if is_fresh(candidate):
+                repetition_guard.replaced += 1
+                return candidate, "local", False
+
+    # 3. One more provider call that is told which wording to avoid
+    if can_regenerate:
+        try:
+            candidate = await async_generate_with_ai(hass, entry, data, time, system_prompt, avoid_text=result[1])
+        except Exception as e:
+            _LOGGER.debug("NotifyAI - Regeneration after a repeat failed: %s", e)
+        else:
+            remember_result(entry_data, data, candidate)
+            if is_fresh(candidate):
+                repetition_guard.replaced += 1
+                return candidate, "ai", False
+
+    _LOGGER.debug("NotifyAI - No fresh alternative for a repeated notification, sending it anyway")
+    return result, source, True
+
+def similarity_key(data: dict) -> tuple:
+    """Return (scope, text) under which a call is looked up in the similarity index."""
+    scope = (
+        data.get("mode", "smart"),
+        (data.get("persona") or "").strip().lower(),
+        (data.get("output_language") or "").strip().lower(),
+    )
+    text = f"{data.get('event') or ''} {data.get('context') or ''}".strip()
+    return scope, text
+
+def reuse_similar(entry_data: dict, data: dict):
+    """(title, body) of a near-identical recent generation with the new numbers, or None."""
+    similar = entry_data["similarity_index"].lookup(*similarity_key(data))
+    if not similar:
+        return None
+    source_text, (similar_title, similar_body), score = similar
+    similarity_text = similarity_key(data)[1]
+    title = retemplate(source_text, similarity_text, similar_title)
+    body = retemplate(source_text, similarity_text, similar_body)
+    if title is None or body is None:
+        _LOGGER.debug("NotifyAI - Similar generation found but its numbers don't map, calling the provider")
+        return None
+    _LOGGER.debug("NotifyAI - Reused a similar generation (score %.2f)", score)
+    return title, body
+
+def remember_result(entry_data: dict, data: dict, result: tuple) -> None:
+    """Keep an AI-generated (title, body) for fallbacks and near-duplicate reuse."""
+    entry_data["response_cache"].put(
+        ResponseCache.make_key(
+            data.get("event"), data.get("mode", "smart"), data.get("persona"), data.get("context", ""),
+            data.get("output_language")
+        ),
+        result
+    )
+    if not has_image(data) and not is_digest(data):
+        entry_data["similarity_index"].add(*similarity_key(data), result)
+
+def _remember_late_result(entry_data: dict, data: dict, task: asyncio.Task) -> None:
+    """Store a provider answer that arrived after the deadline."""
+    if task.cancelled() or task.exception() is not None:
+        return
+    remember_result(entry_data, data, task.result())
+
+async def async_generate_with_ai(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    data: dict,
+    time: str,
+    system_prompt: str = None,
+    avoid_text: str = None
+) -> tuple:
+    """Build the prompt, call the provider and return the parsed (title, body)."""
+    event = data.get("event")
+    context = data.get("context", "")
+    mode = data.get("mode", "smart")
+    persona = data.get("persona")
+    with_image = has_image(data)
+
+    model_name = hass.data[DOMAIN][entry.entry_id]["model_policy"].select()
+
+    # Batches pass the prompt in so it's read from disk only once
+    if system_prompt is None:
+        system_prompt = await hass.async_add_executor_job(load_system_prompt, hass)
+    if not system_prompt:
+        raise Exception("System prompt missing.")
+    system_prompt = localize_prompt(system_prompt, data.get("output_language") or entry_language(entry))
+
+    if is_digest(data):
+        system_prompt += DIGEST_SYSTEM_PROMPT
+    if persona:
+         system_prompt += f"\n\nIMPORTANT: You must adopt the persona of '{persona}'. Ignore the standard 'Mode' setting. Act exactly like {persona} would."
+
+    # Build user message (context is optional)
+    user_message_text = f"""Event: {event}
 Time: {time}
 Mode: {mode}"""
-        
-        if context:
-            user_message_text += f"\nContext: {context}"
+    
+    if context:
+        user_message_text += f"\nContext: {context}"
+    if avoid_text:
+        user_message_text += f"\nAlready sent (use different wording): {avoid_text}"
+
+    # Camera images are fetched in memory; files are read and frames prepared in the executor
+    images = await async_load_images(hass, data) if with_image else None
+    if images and len(images) > 1:
+        user_message_text += f"\nImages: {len(images)} frames in chronological order"
 
-        image_data = None
-        if image_path:
+    # Ask for several variants at once and keep the spare ones for repeats of this event
+    variant_count = entry.options.get(CONF_VARIANT_COUNT, DEFAULT_VARIANT_COUNT)
+    with_variants = variant_count > 1 and not with_image and not is_digest(data)
+    if with_variants:
+        system_prompt += VARIANTS_SYSTEM_PROMPT.format(count=variant_count)
+
+    response_text = await async_request_completion(
+        hass, entry.entry_id, model_name, system_prompt, user_message_text, images
+    )
+
+    if with_variants:
+        with loop_stage(hass, "parse_response"):
+            variants = parse_packed_response(response_text)
+        if variants:
+            hass.data[DOMAIN][entry.entry_id]["variant_pool"].fill(
+                ResponseCache.make_key(event, mode, persona, context, data.get("output_language")), variants[1:]
+            )
+            return variants[0]
+        _LOGGER.debug("NotifyAI - Variant answer was not a JSON array, using it as a single notification")
+    with loop_stage(hass, "parse_response"):
+        return parse_ai_response(response_text)
+
+async def async_generate_batch(hass: HomeAssistant, data: dict) -> dict:
+    """Generate and deliver several notifications with shared prompt and bounded concurrency."""
+    from datetime import datetime
+
+    items = [dict(item) for item in data["items"]]
+    concurrency = max(1, int(data.get("concurrency", DEFAULT_BATCH_CONCURRENCY)))
+    pack = data.get("pack", False)
+    pack_size = int(data.get("pack_size", DEFAULT_PACK_SIZE))
+
+    semaphore = asyncio.Semaphore(concurrency)
+    results = [None] * len(items)
+    system_prompt = await hass.async_add_executor_job(load_system_prompt, hass)
+    time = datetime.now().strftime('%H:%M')
+
+    # Route every item up front; packing only combines items of the same entry
+    routed = {}
+    for index, item in enumerate(items):
+        try:
+            entry = async_select_entry(hass, item.get("entry_id", data.get("entry_id")))
+        except HomeAssistantError as e:
+            results[index] = {"index": index, "status": "error", "error": str(e)}
+            continue
+        routed.setdefault(entry.entry_id, (entry, []))[1].append(index)
+
+    # Suppression and digest buffering run before anything is packed or sent
+    suppression = hass.data[DOMAIN]["suppression"]
+    digest = hass.data[DOMAIN]["digest"]
+    for entry_id, (entry, indexes) in routed.items():
+        checks = await asyncio.gather(*(suppression.async_check(entry_id, items[index]) for index in indexes))
+        kept = []
+        for index, (item_data, suppressed) in zip(indexes, checks):
+            if item_data is None:
+                results[index] = {"index": index, "status": "suppressed", "entry_id": entry_id, **suppressed}
+            elif item_data.get("digest"):
+                results[index] = {
+                    "index": index,
+                    "status": "digested",
+                    "entry_id": entry_id,
+                    **digest.add(
+                        entry_id,
+                        item_data,
+                        entry.options.get(CONF_DIGEST_INTERVAL, DEFAULT_DIGEST_INTERVAL) * 60,
+                        entry.options.get(CONF_DIGEST_MAX_EVENTS, DEFAULT_DIGEST_MAX_EVENTS)
+                    )
+                }
+            else:
+                items[index] = item_data
+                kept.append(index)
+        indexes[:] = kept
+
+    async def run_single(entry: ConfigEntry, index: int) -> None:
+        async with semaphore:
             try:
-                 image_data = await hass.async_add_executor_job(load_image_base64, image_path)
+                if items[index].get("recipients"):
+                    response = await async_generate_for_recipients(hass, entry, items[index], system_prompt)
+                else:
+                    response = await async_generate_notification(hass, entry, items[index], system_prompt)
+                results[index] = {"index": index, "status": "ok", **response}
             except Exception as e:
-                _LOGGER.warning("Could not load image at %s: %s", image_path, e)
+                _LOGGER.error("NotifyAI - Batch item %s failed: %s", index, e)
+                results[index] = {"index": index, "status": "error", "error": str(e)}
 
-        try:
-            # Get provider from hass.data
-            provider = hass.data[DOMAIN][entry.entry_id].get(CONF_AI_PROVIDER, "gemini")
-            
-            # Call appropriate API based on provider
-            if provider == "groq":
-                # Groq doesn't support images yet
-                if image_data:
-                    _LOGGER.warning("Groq doesn't support image analysis. Ignoring image.")
-                response_text = await call_groq_api(
-                    hass, api_key, model_name, system_prompt, user_message_text, entry.entry_id
-                )
-            else:  # gemini
-                response_text = await call_gemini_api(
-                    hass, api_key, model_name, system_prompt, user_message_text, image_data, entry.entry_id
+    async def run_packed(entry: ConfigEntry, indexes: list) -> None:
+        async with semaphore:
+            chunk = [items[index] for index in indexes]
+            model_name = hass.data[DOMAIN][entry.entry_id]["model_policy"].select()
+            packed = None
+            try:
+                if not hass.data[DOMAIN][entry.entry_id]["key_pool"].available_count():
+                    raise Exception("no API key available")
+                response_text = await async_request_completion(
+                    hass,
+                    entry.entry_id,
+                    model_name,
+                    localize_prompt(system_prompt, entry_language(entry)) + PACKED_SYSTEM_PROMPT.format(count=len(chunk)),
+                    build_packed_prompt(chunk, time)
                 )
+                with loop_stage(hass, "parse_response"):
+                    packed = parse_packed_response(response_text, len(chunk))
+            except Exception as e:
+                _LOGGER.warning("NotifyAI - Packed request failed, retrying items one by one: %s", e)
 
-            
-            # Parse AI response first
-            parsed_title = None
-            parsed_body = None
-            
+        if packed is None:
+            await asyncio.gather(*(run_single(entry, index) for index in indexes))
+            return
+
+        repetition_guard = hass.data[DOMAIN][entry.entry_id]["repetition_guard"]
+        for index, (title, body) in zip(indexes, packed):
+            item = items[index]
+            remember_result(hass.data[DOMAIN][entry.entry_id], item, (title, body))
+            # Packed answers are only flagged; replacing them would cost the saved requests
+            item_key = ResponseCache.make_key(
+                item.get("event"), item.get("mode", "smart"), item.get("persona"), item.get("context", "")
+            )
+            repeated = repetition_guard.is_repeat(item_key, body)
+            if item.get("custom_title"):
+                title = item["custom_title"]
             try:
-                # 1. Try strict JSON
-                ai_response = json.loads(response_text)
+                await async_deliver_notification(hass, entry, title, body, item)
+            except Exception as e:
+                _LOGGER.error("Error delivering notification: %s", e)
+            repetition_guard.remember(item_key, title, body)
+            results[index] = {
+                "index": index,
+                "status": "ok",
+                "title": title,
+                "body": body,
+                "entry_id": entry.entry_id,
+                "source": "ai",
+                "model": model_name,
+                "packed": True
+            }
+            if repeated:
+                results[index]["repeated"] = True
+
+    jobs = []
+    packed_requests = 0
+    for entry, indexes in routed.values():
+        entry_data = hass.data[DOMAIN][entry.entry_id]
+        if pack and system_prompt and entry_data["key_pool"].available_count():
+            # Items the forecast would throttle take the single path, which applies the fallback
+            packable = [
+                index for index in indexes
+                if can_pack(items[index])
+                and not entry_data["forecast"].throttle_reason(items[index].get("priority"), count=False)
+            ]
+            for chunk in chunked(packable, pack_size):
+                if len(chunk) > 1:
+                    packed_requests += 1
+                    jobs.append(run_packed(entry, chunk))
+                else:
+                    jobs.append(run_single(entry, chunk[0]))
+            indexes = [index for index in indexes if index not in packable]
+        jobs.extend(run_single(entry, index) for index in indexes)
+
+    await asyncio.gather(*jobs)
+
+    return {
+        "results": results,
+        "count": len(results),
+        "succeeded": sum(1 for result in results if result["status"] == "ok"),
+        "suppressed": sum(1 for result in results if result["status"] == "suppressed"),
+        "digested": sum(1 for result in results if result["status"] == "digested"),
+        "failed": sum(1 for result in results if result["status"] == "error"),
+        "packed_requests": packed_requests
+    }
+
+async def async_request_completion(
+    hass: HomeAssistant,
+    entry_id: str,
+    model_name: str,
+    system_prompt: str,
+    user_text: str,
+    images: list = None
+) -> str:
+    """Send one prompt to the entry's provider, rotating over its key pool."""
+    entry_data = hass.data[DOMAIN][entry_id]
+    provider = entry_data.get(CONF_AI_PROVIDER, "gemini")
+    key_pool = entry_data["key_pool"]
+    model_policy = entry_data["model_policy"]
+    
+    # Only the Gemini request carries images
+    if provider != "gemini" and images:
+        _LOGGER.warning("%s doesn't support image analysis. Ignoring image.", provider)
+
+    # During an outage don't wait for a request that is going to fail
+    breaker = entry_data["breakers"].get(model_name)
+    if not breaker.allow_request():
+        raise CircuitOpenError(f"Circuit open for {provider}/{model_name}")
+
+    try:
+        # Try each pooled key at most once; a 429 moves on to the next key
+        tried_keys = set()
+        while True:
+            pool_key = key_pool.acquire(exclude=tried_keys)
+            if pool_key is None:
+                raise Exception("All API keys are rate limited or out of quota")
+            tried_keys.add(pool_key)
+
+            started = monotonic_time.monotonic()
+            previous_quota = entry_data.get("quota_data")
+            try:
+                # Call appropriate API based on provider
+                if provider == "groq":
+                    response_text = await call_groq_api(
+                        hass, pool_key, model_name, system_prompt, user_text, entry_id
+                    )
+                elif provider == "local":
+                    response_text = await call_local_api(
+                        hass, pool_key, model_name, system_prompt, user_text, entry_id
+                    )
+                else:  # gemini
+                    response_text = await call_gemini_api(
+                        hass, pool_key, model_name, system_prompt, user_text, images, entry_id
+                    )
+            except RateLimitError as e:
+                _LOGGER.warning("NotifyAI - %s", e)
+                record_error(entry_data, e, model_name)
+                # The provider is up, this key/model is just out of quota
+                breaker.record_success()
+                model_policy.report_rate_limited(model_name, e.retry_after)
+                continue
+            except Exception as e:
+                record_error(entry_data, e, model_name)
+                if is_outage(e):
+                    breaker.record_failure(e)
+                raise
+
+            breaker.record_success()
+            # Recent latency feeds the router's load balancing
+            record_latency(entry_data, (monotonic_time.monotonic() - started) * 1000)
+            # Only quota headers from this very call describe this model
+            quota_data = entry_data.get("quota_data")
+            model_policy.report_success(model_name, quota_data if quota_data is not previous_quota else None)
+            return response_text
+    finally:
+        # A probe that ended without a verdict (cancelled, no key left) frees its slot
+        breaker.release()
+
+def parse_ai_response(response_text: str) -> tuple:
+    """Extract (title, body) from the model output."""
+    parsed_title = None
+    parsed_body = None
+    
+    try:
+        # 1. Try strict JSON
+        ai_response = json.loads(response_text)
+        parsed_title = ai_response.get("title", "AI Bildirim")
+        parsed_body = ai_response.get("body", "")
+    except:
+        # 2. Try to find JSON block
+        match = re.search(r'\{.*\}', response_text, re.DOTALL)
+        if match:
+            try:
+                ai_response = json.loads(match.group())
                 parsed_title = ai_response.get("title", "AI Bildirim")
                 parsed_body = ai_response.get("body", "")
             except:
-                # 2. Try to find JSON block
-                match = re.search(r'\{.*\}', response_text, re.DOTALL)
-                if match:
-                    try:
-                        ai_response = json.loads(match.group())
-                        parsed_title = ai_response.get("title", "AI Bildirim")
-                        parsed_body = ai_response.get("body", "")
-                    except:
-                        pass
-                
-                if not parsed_title or not parsed_body:
-                    # 3. Fallback: Parse "Title: ... Body: ..." format
-                    parsed_title = "Bildirim"
-                    parsed_body = response_text
-                    
-                    for line in response_text.split('\n'):
-                        clean_line = line.strip()
-                        if clean_line.lower().startswith('title:'):
-                            parsed_title = clean_line.split(':', 1)[1].strip()
-                        elif clean_line.lower().startswith('body:'):
-                            parsed_body = clean_line.split(':', 1)[1].strip()
-                        elif clean_line.lower().startswith('başlık:'):
-                            parsed_title = clean_line.split(':', 1)[1].strip()
-                        elif clean_line.lower().startswith('gönderi:'):
-                            parsed_body = clean_line.split(':', 1)[1].strip()
+                pass
+        
+        if not parsed_title or not parsed_body:
+            # 3. Fallback: Parse "Title: ... Body: ..." format
+            parsed_title = "Bildirim"
+            parsed_body = response_text
             
-            # Use custom title if provided, otherwise use parsed title
-            if custom_title:
-                title = custom_title
-                body = parsed_body  # Use only the body part from AI response
-            else:
-                title = parsed_title
-                body = parsed_body
+            for line in response_text.split('\n'):
+                clean_line = line.strip()
+                if clean_line.lower().startswith('title:'):
+                    parsed_title = clean_line.split(':', 1)[1].strip()
+                elif clean_line.lower().startswith('body:'):
+                    parsed_body = clean_line.split(':', 1)[1].strip()
+                elif clean_line.lower().startswith('başlık:'):
+                    parsed_title = clean_line.split(':', 1)[1].strip()
+                elif clean_line.lower().startswith('gönderi:'):
+                    parsed_body = clean_line.split(':', 1)[1].strip()
 
+    return parsed_title, parsed_body
 
-            # Determine targets
-            targets = []
-            if notify_service_arg:
-                targets.append(notify_service_arg)
-            else:
-                for key in [CONF_NOTIFY_SERVICE_1, CONF_NOTIFY_SERVICE_2, CONF_NOTIFY_SERVICE_3, CONF_NOTIFY_SERVICE_4]:
-                    srv = entry.options.get(key)
-                    if srv and srv.strip() and srv != "none":
-                        targets.append(srv.strip())
-            
-            # Send to all targets
-            for target in targets:
-                if "." in target:
-                    try:
-                        domain, service = target.split(".", 1)
-                        await hass.services.async_call(
-                            domain, service,
-                            {"title": title, "message": body},
-                            blocking=False 
-                        )
-                    except Exception as e:
-                         _LOGGER.error("Failed to call notify service %s: %s", target, e)
-                else:
-                    _LOGGER.warning("Invalid notify_service format: %s", target)
-            
-            # Send TTS if audio device is selected
-            if audio_device and tts_service:
-                _LOGGER.info("NotifyAI - Attempting TTS on %s via %s", audio_device, tts_service)
+async def async_deliver_notification(hass: HomeAssistant, entry: ConfigEntry, title: str, body: str, data: dict) -> None:
+    """Send the notification to notify targets and speak it via TTS."""
+    # Service call override
+    notify_service_arg = data.get("notify_service")
+    
+    # TTS arguments
+    audio_device = data.get("audio_device")
+    tts_service = data.get("tts_service", "tts.google_translate_say")
+    language = data.get("language")
+    # Services run on behalf of whoever asked (service call or HTTP user)
+    context = data.get("call_context")
+
+    # Determine targets
+    targets = []
+    if notify_service_arg:
+        targets.append(notify_service_arg)
+    else:
+        for key in [CONF_NOTIFY_SERVICE_1, CONF_NOTIFY_SERVICE_2, CONF_NOTIFY_SERVICE_3, CONF_NOTIFY_SERVICE_4]:
+            srv = entry.options.get(key)
+            if srv and srv.strip() and srv != "none":
+                targets.append(srv.strip())
+    
+    # Send to all targets
+    for target in targets:
+        if "." in target:
+            try:
+                domain, service = target.split(".", 1)
+                await hass.services.async_call(
+                    domain, service,
+                    {"title": title, "message": body},
+                    blocking=False,
+                    context=context
+                )
+            except Exception as e:
+                 _LOGGER.error("Failed to call notify service %s: %s", target, e)
+        else:
+            _LOGGER.warning("Invalid notify_service format: %s", target)
+    
+    # Send TTS if audio device is selected
+    if audio_device and tts_service:
+        _LOGGER.info("NotifyAI - Attempting TTS on %s via %s", audio_device, tts_service)
+        
+        # Combine title and body for a more natural speech experience
+        full_message = f"{title}. {body}"
+        
+        # Remove markdown characters and emojis from body for better TTS
+        with loop_stage(hass, "tts_cleanup"):
+            clean_message = full_message.replace("*", "").replace("#", "").replace("- ", "").replace("`", "")
+            clean_message = re.sub(r'[\U00010000-\U0010ffff]', '', clean_message)
+            clean_message = clean_message.strip()
+
+        tts_errors = []
+
+        async def perform_tts_call(service_name, service_data, is_legacy=False):
+            """Helper to perform TTS call with language fallback.
+
+            Returns how the language was passed ("as_is", "normalized", "dropped") or None on failure.
+            """
+            try:
+                domain = "tts" if not is_legacy else tts_service.split(".", 1)[0]
+                service = service_name if not is_legacy else tts_service.split(".", 1)[1]
                 
-                # Combine title and body for a more natural speech experience
-                full_message = f"{title}. {body}"
+                _LOGGER.debug("NotifyAI - Calling %s.%s with data: %s", domain, service, service_data)
+                await hass.services.async_call(
+                    domain, service, service_data,
+                    blocking=True,
+                    context=context
+                )
+                return "as_is"
+            except Exception as e:
+                error_msg = str(e)
+                tts_errors.append(type(e).__name__)
+                _LOGGER.warning("NotifyAI - TTS call failed (%s): %s", service_name, error_msg)
                 
-                # Remove markdown characters and emojis from body for better TTS
-                clean_message = full_message.replace("*", "").replace("#", "").replace("- ", "").replace("`", "")
-                clean_message = re.sub(r'[\U00010000-\U0010ffff]', '', clean_message)
-                clean_message = clean_message.strip()
+                # Fallback for language support error
+                if "not supported" in error_msg.lower() and "language" in error_msg.lower() and "language" in service_data:
+                    lang = service_data.get("language")
+                    
+                    # 1. Try normalization (e.g. 'tr' -> 'tr-TR') if it's a 2-char code
+                    if lang and len(lang) == 2:
+                        normalized_lang = f"{lang}-{lang.upper()}"
+                        _LOGGER.info("NotifyAI - Language '%s' failed, trying normalized '%s'", lang, normalized_lang)
+                        fallback_data = service_data.copy()
+                        fallback_data["language"] = normalized_lang
+                        try:
+                            await hass.services.async_call(domain, service, fallback_data, blocking=True, context=context)
+                            _LOGGER.info("NotifyAI - TTS successful with normalized language code: %s", normalized_lang)
+                            return "normalized"
+                        except Exception as e_norm:
+                            tts_errors.append(type(e_norm).__name__)
+                            _LOGGER.warning("NotifyAI - Normalized language also failed: %s", e_norm)
 
-                async def perform_tts_call(service_name, service_data, is_legacy=False):
-                    """Helper to perform TTS call with language fallback."""
+                    # 2. Last resort: try without language parameter entirely
+                    _LOGGER.info("NotifyAI - Language support completely failed for %s, trying without language parameter.", service_name)
+                    final_fallback_data = service_data.copy()
+                    final_fallback_data.pop("language")
+                    
                     try:
-                        domain = "tts" if not is_legacy else tts_service.split(".", 1)[0]
-                        service = service_name if not is_legacy else tts_service.split(".", 1)[1]
-                        
-                        _LOGGER.debug("NotifyAI - Calling %s.%s with data: %s", domain, service, service_data)
                         await hass.services.async_call(
-                            domain, service, service_data,
-                            blocking=True 
+                            domain, service, final_fallback_data,
+                            blocking=True,
+                            context=context
                         )
-                        return True
-                    except Exception as e:
-                        error_msg = str(e)
-                        _LOGGER.warning("NotifyAI - TTS call failed (%s): %s", service_name, error_msg)
-                        
-                        # Fallback for language support error
-                        if "not supported" in error_msg.lower() and "language" in error_msg.lower() and "language" in service_data:
-                            lang = service_data.get("language")
-                            
-                            # 1. Try normalization (e.g. 'tr' -> 'tr-TR') if it's a 2-char code
-                            if lang and len(lang) == 2:
-                                normalized_lang = f"{lang}-{lang.upper()}"
-                                _LOGGER.info("NotifyAI - Language '%s' failed, trying normalized '%s'", lang, normalized_lang)
-                                fallback_data = service_data.copy()
-                                fallback_data["language"] = normalized_lang
-                                try:
-                                    await hass.services.async_call(domain, service, fallback_data, blocking=True)
-                                    _LOGGER.info("NotifyAI - TTS successful with normalized language code: %s", normalized_lang)
-                                    return True
-                                except Exception as e_norm:
-                                    _LOGGER.warning("NotifyAI - Normalized language also failed: %s", e_norm)
-
-                            # 2. Last resort: try without language parameter entirely
-                            _LOGGER.info("NotifyAI - Language support completely failed for %s, trying without language parameter.", service_name)
-                            final_fallback_data = service_data.copy()
-                            final_fallback_data.pop("language")
-                            
-                            try:
-                                await hass.services.async_call(
-                                    domain, service, final_fallback_data,
-                                    blocking=True
-                                )
-                                _LOGGER.info("NotifyAI - TTS successful without language parameter")
-                                return True
-                            except Exception as e_final:
-                                _LOGGER.error("NotifyAI - All TTS methods failed: %s", e_final)
-                        return False
-
-                # 1. Try Modern format: tts.speak
-                tts_data = {
-                    "entity_id": tts_service,
-                    "media_player_entity_id": audio_device,
-                    "message": clean_message,
-                    "cache": True
-                }
-                if language:
-                    tts_data["language"] = language
-
-                success = await perform_tts_call("speak", tts_data)
-                
-                # 2. Try Legacy fallback if modern failed and it's not already a legacy service name
-                if not success and "." in tts_service and not tts_service.startswith("tts."):
-                    legacy_data = {
-                        "entity_id": audio_device, 
-                        "message": clean_message,
-                        "cache": True
-                    }
-                    if language:
-                        legacy_data["language"] = language
-                    
-                    await perform_tts_call(None, legacy_data, is_legacy=True)
+                        _LOGGER.info("NotifyAI - TTS successful without language parameter")
+                        return "dropped"
+                    except Exception as e_final:
+                        tts_errors.append(type(e_final).__name__)
+                        _LOGGER.error("NotifyAI - All TTS methods failed: %s", e_final)
+                return None
 
-            return {
-                "title": title,
-                "body": body
-            }
+        # 1. Try Modern format: tts.speak
+        tts_data = {
+            "entity_id": tts_service,
+            "media_player_entity_id": audio_device,
+            "message": clean_message,
+            "cache": True
+        }
+        if language:
+            tts_data["language"] = language
 
-        except Exception as e:
-            _LOGGER.error("Error generating notification: %s", e)
-            return {
-                "title": "Error",
-                "body": f"AI Generation failed: {str(e)}"
+        method = "speak"
+        language_handling = await perform_tts_call("speak", tts_data)
+        
+        # 2. Try Legacy fallback if modern failed and it's not already a legacy service name
+        if not language_handling and "." in tts_service and not tts_service.startswith("tts."):
+            legacy_data = {
+                "entity_id": audio_device, 
+                "message": clean_message,
+                "cache": True
             }
+            if language:
+                legacy_data["language"] = language
+            
+            method = "legacy"
+            language_handling = await perform_tts_call(None, legacy_data, is_legacy=True)
 
-    hass.services.async_register(
-        DOMAIN, 
-        "generate", 
-        generate_notification,
-        supports_response=SupportsResponse.OPTIONAL
-    )
+        record_tts_finding(
+            hass.data[DOMAIN].get(entry.entry_id), tts_service, language,
+            method if language_handling else None, language_handling, tts_errors
+        )
 
-    return True
-
-async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
-    """Unload a config entry."""
-    unload_ok = await hass.config_entries.async_unload_platforms(entry, ["sensor"])
-    if unload_ok:
-        hass.data[DOMAIN].pop(entry.entry_id)
-    return unload_ok
+def record_tts_finding(
+    entry_data: dict,
+    tts_service: str,
+    language: str,
+    method: str,
+    language_handling: str,
+    errors: list
+) -> None:
+    """Remember which call style and language form a TTS service accepted (for diagnostics)."""
+    if entry_data is None:
+        return
+    from homeassistant.util import dt as dt_util
 
-async def update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
-    """Update listener."""
-    await hass.config_entries.async_reload(entry.entry_id)
+    finding = entry_data["tts_findings"].setdefault(
+        tts_service, {"successes": 0, "failures": 0}
+    )
+    finding["successes" if method else "failures"] += 1
+    finding["language"] = language
+    finding["last_errors"] = errors[-3:]
+    finding["at"] = dt_util.now().isoformat()
+    if method:
+        # What worked last time; failures keep the previous finding
+        finding["method"] = method
+        finding["language_handling"] = language_handling
 
 def load_system_prompt(hass: HomeAssistant) -> str:
     """Reads the system prompt from the file."""
@@ -325,15 +1422,13 @@ def load_system_prompt(hass: HomeAssistant) -> str:
         _LOGGER.error("system_prompt.md not found at %s", prompt_path)
         return ""
 
-def load_image_base64(image_path: str) -> str:
-    """Loads an image and converts to base64."""
-    if not os.path.exists(image_path):
-        raise FileNotFoundError(f"Image not found at {image_path}")
-    
-    with open(image_path, "rb") as f:
-        image_bytes = f.read()
-    
-    return base64.b64encode(image_bytes).decode('utf-8')
+def entry_language(entry: ConfigEntry) -> str:
+    """The language an entry writes notifications in."""
+    return entry.options.get(CONF_NOTIFICATION_LANGUAGE) or DEFAULT_NOTIFICATION_LANGUAGE
+
+def localize_prompt(system_prompt: str, language: str) -> str:
+    """Fill the prompt's {language} placeholder (the prompt holds JSON braces, so no str.format)."""
+    return system_prompt.replace("{language}", language)
 
 async def call_gemini_api(
     hass: HomeAssistant,
@@ -341,24 +1436,26 @@ async def call_gemini_api(
     model_name: str, 
     system_prompt: str, 
     user_text: str,
-    image_base64: str = None,
+    images: list = None,
     entry_id: str = None
 ) -> str:
     """Call Google Gemini API directly via REST."""
     from homeassistant.util import dt as dt_util
     
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/{model_name}:generateContent?key={api_key}"
+    base_url = hass.data.get(DOMAIN, {}).get(entry_id, {}).get("base_url", PROVIDER_BASE_URLS["gemini"])
+    url = f"{base_url}/v1beta/models/{model_name}:generateContent?key={api_key}"
     session = async_get_clientsession(hass)
     
     # Build request payload
     contents = []
     parts = [{"text": user_text}]
     
-    if image_base64:
+    # Several frames go into the same request as consecutive inline_data parts
+    for image in images or []:
         parts.append({
             "inline_data": {
-                "mime_type": "image/jpeg",
-                "data": image_base64
+                "mime_type": image.get("mime_type", "image/jpeg"),
+                "data": image["data"]
             }
         })
     
@@ -374,12 +1471,15 @@ async def call_gemini_api(
         }
     }
     
-    async with session.post(url, json=payload) as response:
+    async with session.post(
+        url, json=payload, timeout=aiohttp.ClientTimeout(total=DEFAULT_PROVIDER_TIMEOUT)
+    ) as response:
         # Extract rate limit headers
         headers = response.headers
         
         if response.status != 200:
             error_text = await response.text()
+            retry_after = parse_retry_after(headers, error_text) if response.status == 429 else None
             
             # Update usage tracking with error
             if entry_id and entry_id in hass.data.get(DOMAIN, {}):
@@ -387,13 +1487,28 @@ async def call_gemini_api(
                 usage_data["last_call_time"] = dt_util.now().isoformat()
                 usage_data["last_call_status"] = f"Hata ({response.status})"
                 usage_data["last_error"] = error_text[:200]
+
+                key_pool = hass.data[DOMAIN][entry_id].get("key_pool")
+                if key_pool is not None:
+                    if response.status == 429:
+                        key_pool.report_rate_limited(api_key, retry_after)
+                    else:
+                        key_pool.report_error(api_key)
             
-            raise Exception(f"Gemini API error ({response.status}): {error_text}")
+            if response.status == 429:
+                raise RateLimitError(
+                    f"Gemini API rate limit (429): {error_text[:200]}", retry_after
+                )
+            raise ProviderError(f"Gemini API error ({response.status}): {error_text}", response.status)
         
-        data = await response.json()
+        response_text = await response.text()
+        with loop_stage(hass, "response_json"):
+            data = json.loads(response_text)
         
         # Extract and store quota information from headers
         if entry_id and entry_id in hass.data.get(DOMAIN, {}):
+            usage = hass.data[DOMAIN][entry_id]["usage"]
+            usage.record(model_name, api_key)
             quota_data = {}
             
             # Gemini uses x-ratelimit-* headers
@@ -415,6 +1530,15 @@ async def call_gemini_api(
             if quota_data:
                 quota_data['last_updated'] = dt_util.now().isoformat()
                 quota_data['source'] = 'api_headers'
+
+            # With several keys the entry-level quota is the sum over the pool
+            key_pool = hass.data[DOMAIN][entry_id].get("key_pool")
+            if key_pool is not None:
+                key_pool.report_success(api_key, quota_data)
+                if len(key_pool) > 1:
+                    quota_data = key_pool.aggregate_quota()
+
+            if quota_data:
                 hass.data[DOMAIN][entry_id]["quota_data"] = quota_data
                 
                 _LOGGER.debug("Gemini quota data updated: %s", quota_data)
@@ -430,7 +1554,7 @@ async def call_gemini_api(
                 usage_data["daily_count"] = quota_data['rpd_limit'] - quota_data['rpd_remaining']
             else:
                 # Fallback to local counting
-                usage_data["daily_count"] = usage_data.get("daily_count", 0) + 1
+                usage_data["daily_count"] = usage.day_count()
         
         # Extract text from response
         try:
@@ -453,6 +1577,17 @@ async def log_available_models(hass: HomeAssistant, api_key: str):
     except Exception as e:
         _LOGGER.error("❌ NotifyAI - Error listing models: %s", e)
 
+async def log_local_models(hass: HomeAssistant, base_url: str, api_key: str, model_name: str):
+    """Check that the local server is reachable and serves the configured model."""
+    try:
+        models = await async_fetch_models(async_get_clientsession(hass), base_url, api_key)
+    except Exception as e:
+        _LOGGER.warning("NotifyAI - Local server %s is not reachable: %s", base_url, e)
+        return
+    _LOGGER.debug("NotifyAI - Models on %s: %s", base_url, ", ".join(models))
+    if models and model_name not in models:
+        _LOGGER.warning("NotifyAI - Model %s is not served by %s (available: %s)", model_name, base_url, ", ".join(models))
+
 async def call_groq_api(
     hass: HomeAssistant,
     api_key: str,
@@ -464,7 +1599,8 @@ async def call_groq_api(
     """Call Groq API (OpenAI-compatible)."""
     from homeassistant.util import dt as dt_util
     
-    url = "https://api.groq.com/openai/v1/chat/completions"
+    base_url = hass.data.get(DOMAIN, {}).get(entry_id, {}).get("base_url", PROVIDER_BASE_URLS["groq"])
+    url = f"{base_url}/v1/chat/completions"
     session = async_get_clientsession(hass)
     
     headers = {
@@ -482,12 +1618,15 @@ async def call_groq_api(
         "max_tokens": 500
     }
     
-    async with session.post(url, json=payload, headers=headers) as response:
+    async with session.post(
+        url, json=payload, headers=headers, timeout=aiohttp.ClientTimeout(total=DEFAULT_PROVIDER_TIMEOUT)
+    ) as response:
         # Extract rate limit headers
         response_headers = response.headers
         
         if response.status != 200:
             error_text = await response.text()
+            retry_after = parse_retry_after(response_headers, error_text) if response.status == 429 else None
             
             # Update usage tracking with error
             if entry_id and entry_id in hass.data.get(DOMAIN, {}):
@@ -495,13 +1634,28 @@ async def call_groq_api(
                 usage_data["last_call_time"] = dt_util.now().isoformat()
                 usage_data["last_call_status"] = f"Hata ({response.status})"
                 usage_data["last_error"] = error_text[:200]
+
+                key_pool = hass.data[DOMAIN][entry_id].get("key_pool")
+                if key_pool is not None:
+                    if response.status == 429:
+                        key_pool.report_rate_limited(api_key, retry_after)
+                    else:
+                        key_pool.report_error(api_key)
             
-            raise Exception(f"Groq API error ({response.status}): {error_text}")
+            if response.status == 429:
+                raise RateLimitError(
+                    f"Groq API rate limit (429): {error_text[:200]}", retry_after
+                )
+            raise ProviderError(f"Groq API error ({response.status}): {error_text}", response.status)
         
-        data = await response.json()
+        response_text = await response.text()
+        with loop_stage(hass, "response_json"):
+            data = json.loads(response_text)
         
         # Extract and store quota information from headers
         if entry_id and entry_id in hass.data.get(DOMAIN, {}):
+            usage = hass.data[DOMAIN][entry_id]["usage"]
+            usage.record(model_name, api_key)
             quota_data = {}
             
             # Groq uses x-ratelimit-* headers
@@ -534,18 +1688,89 @@ async def call_groq_api(
             usage_data["last_call_status"] = "Başarılı"
             usage_data["last_error"] = None
             
-            # For Groq, we need to maintain local count for RPD since headers only show RPM
-            # Calculate RPD remaining by subtracting local count from limit
-            daily_count = usage_data.get("daily_count", 0) + 1
-            usage_data["daily_count"] = daily_count
-            
-            # Update quota_data with calculated RPD remaining
-            if quota_data:
-                quota_data['rpd_remaining'] = max(0, quota_data['rpd_limit'] - daily_count)
-                hass.data[DOMAIN][entry_id]["quota_data"] = quota_data
+            # Groq headers only show RPM; RPD remaining comes from our own count, which
+            # resets with Groq's day. Limits are per key and per model.
+            usage_data["daily_count"] = usage.day_count()
+            quota_data['rpd_remaining'] = max(0, quota_data['rpd_limit'] - usage.day_count(model_name, api_key))
+
+            key_pool = hass.data[DOMAIN][entry_id].get("key_pool")
+            if key_pool is not None:
+                key_pool.report_success(api_key, quota_data)
+                if len(key_pool) > 1:
+                    quota_data = key_pool.aggregate_quota()
+            hass.data[DOMAIN][entry_id]["quota_data"] = quota_data
         
         # Extract response
         try:
             return data["choices"][0]["message"]["content"]
         except (KeyError, IndexError) as e:
             raise Exception(f"Unexpected Groq API response format: {data}")
+
+async def call_local_api(
+    hass: HomeAssistant,
+    api_key: str,
+    model_name: str,
+    system_prompt: str,
+    user_text: str,
+    entry_id: str = None
+) -> str:
+    """Call an OpenAI-compatible server (same request as Groq, no quota headers)."""
+    from homeassistant.util import dt as dt_util
+
+    base_url = hass.data.get(DOMAIN, {}).get(entry_id, {}).get("base_url", PROVIDER_BASE_URLS["local"])
+    url = f"{base_url}/v1/chat/completions"
+    session = async_get_clientsession(hass)
+
+    payload = {
+        "model": model_name,
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_text}
+        ],
+        "temperature": 0.7,
+        "max_tokens": 500
+    }
+
+    async with session.post(
+        url, json=payload, headers=auth_headers(api_key), timeout=aiohttp.ClientTimeout(total=DEFAULT_PROVIDER_TIMEOUT)
+    ) as response:
+        if response.status != 200:
+            error_text = await response.text()
+
+            if entry_id and entry_id in hass.data.get(DOMAIN, {}):
+                usage_data = hass.data[DOMAIN][entry_id].get("usage_data", {})
+                usage_data["last_call_time"] = dt_util.now().isoformat()
+                usage_data["last_call_status"] = f"Hata ({response.status})"
+                usage_data["last_error"] = error_text[:200]
+
+            # A busy server (e.g. llama.cpp with all slots taken) answers 429 or 503
+            if response.status == 429:
+                raise RateLimitError(
+                    f"Local server busy (429): {error_text[:200]}",
+                    parse_retry_after(response.headers, error_text)
+                )
+            raise ProviderError(f"Local server error ({response.status}): {error_text}", response.status)
+
+        response_text = await response.text()
+        with loop_stage(hass, "response_json"):
+            data = json.loads(response_text)
+
+        # No quota: only count requests for the usage sensors
+        if entry_id and entry_id in hass.data.get(DOMAIN, {}):
+            usage = hass.data[DOMAIN][entry_id]["usage"]
+            usage.record(model_name, api_key)
+
+            usage_data = hass.data[DOMAIN][entry_id].get("usage_data", {})
+            usage_data["last_call_time"] = dt_util.now().isoformat()
+            usage_data["last_call_status"] = "Başarılı"
+            usage_data["last_error"] = None
+            usage_data["daily_count"] = usage.day_count()
+
+            key_pool = hass.data[DOMAIN][entry_id].get("key_pool")
+            if key_pool is not None:
+                key_pool.report_success(api_key)
+
+        try:
+            return data["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError) as e:
+            raise Exception(f"Unexpected local server response format: {data}")
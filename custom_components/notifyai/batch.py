@@ -0,0 +1,83 @@
+"""Helpers for notifyai.generate_batch - packing several events into one request."""
+import json
+import re
+
+from .images import has_image
+
+# Appended to the system prompt when several events share one request
+PACKED_SYSTEM_PROMPT = """
+
+BATCH REQUEST (overrides OUTPUT FORMAT):
+- The user message contains several numbered, independent events.
+- Write one notification per item, following all rules above with that item's Mode (and Persona, if given).
+- Return ONLY a JSON array with exactly {count} objects, in the same order as the items:
+[{{"title": "<title 1>", "body": "<body 1>"}}, ...]"""
+
+# Fields whose handling only the single-call path implements
+UNPACKABLE_FIELDS = (
+    "local_only", "timeout_ms", "supersede_key", "digest", "output_language", "recipients",
+)
+
+DEFAULT_BATCH_CONCURRENCY = 4
+DEFAULT_PACK_SIZE = 5
+
+
+def can_pack(item: dict) -> bool:
+    """Items that need the single-call path (images, local-only, deadlines, supersede,
+    digest, other-language and multi-recipient items) are handled one by one."""
+    return not has_image(item) and not any(item.get(field) for field in UNPACKABLE_FIELDS)
+
+
+def chunked(items: list, size: int) -> list:
+    """Split a list into consecutive chunks of at most `size` items."""
+    size = max(1, size)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def build_packed_prompt(items: list, time: str) -> str:
+    """Build one user message describing several events."""
+    blocks = []
+    for number, item in enumerate(items, 1):
+        lines = [
+            f"Item {number}:",
+            f"Event: {item.get('event')}",
+            f"Time: {time}",
+            f"Mode: {item.get('mode', 'smart')}",
+        ]
+        if item.get("persona"):
+            lines.append(f"Persona: {item['persona']}")
+        if item.get("context"):
+            lines.append(f"Context: {item['context']}")
+        blocks.append("\n".join(lines))
+    return "\n\n".join(blocks)
+
+
+def parse_packed_response(response_text: str, count: int = None) -> list:
+    """Return [(title, body), ...] for a JSON array answer, or None if it doesn't fit.
+
+    With count=None any non-empty array is accepted.
+    """
+    try:
+        parsed = json.loads(response_text)
+    except ValueError:
+        match = re.search(r"\[.*\]", response_text, re.DOTALL)
+        if not match:
+            return None
+        try:
+            parsed = json.loads(match.group())
+        except ValueError:
+            return None
+
+    # Some models wrap the array: {"items": [...]}
+    if isinstance(parsed, dict):
+        parsed = next((value for value in parsed.values() if isinstance(value, list)), None)
+
+    if not isinstance(parsed, list) or not parsed or (count is not None and len(parsed) != count):
+        return None
+
+    results = []
+    for element in parsed:
+        if not isinstance(element, dict) or not element.get("body"):
+            return None
+        results.append((element.get("title") or "Bildirim", element["body"]))
+    return results
@@ -0,0 +1,51 @@
+"""In-memory caches for generated notifications."""
+from collections import OrderedDict
+
+# Default number of events whose last AI result is kept per entry
+DEFAULT_RESPONSE_CACHE_SIZE = 256
+
+
+class ResponseCache:
+    """Bounded LRU of the last AI-generated (title, body) per event.
+
+    It is not used to skip provider calls (every notification should be worded
+    freshly); it only backs the fallback path when the provider can't answer.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_RESPONSE_CACHE_SIZE) -> None:
+        """Initialize the cache."""
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(event: str, mode: str = None, persona: str = None, context: str = None, language: str = None) -> tuple:
+        """Build the cache key for an event description (and its output language, if not the default)."""
+        return (
+            (event or "").strip().lower(),
+            mode or "",
+            (persona or "").strip().lower(),
+            (context or "").strip().lower(),
+            (language or "").strip().lower(),
+        )
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: tuple):
+        """Return the cached (title, body) or None."""
+        value = self._items.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._items.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: tuple, value: tuple) -> None:
+        """Store a result, evicting the least recently used one when full."""
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
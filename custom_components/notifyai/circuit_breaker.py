@@ -0,0 +1,189 @@
+"""Circuit breakers per provider model - fail fast to the fallback path during outages."""
+import asyncio
+import logging
+import time
+from collections import deque
+
+import aiohttp
+
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    DEFAULT_BREAKER_FAILURES,
+    DEFAULT_BREAKER_FAILURE_RATE,
+    DEFAULT_BREAKER_RECOVERY,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+# The failure rate is measured over the last WINDOW_SIZE calls, once MIN_CALLS are in
+WINDOW_SIZE = 20
+MIN_CALLS = 10
+
+
+class ProviderError(Exception):
+    """Raised when a provider answers with a non-200, non-429 status."""
+
+    def __init__(self, message: str, status: int = None) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose breaker is open."""
+
+
+def is_outage(error: Exception) -> bool:
+    """Whether an error means the provider is unhealthy (not a bad request or quota)."""
+    if isinstance(error, ProviderError):
+        return error.status is not None and error.status >= 500
+    return isinstance(error, (asyncio.TimeoutError, aiohttp.ClientError))
+
+
+class CircuitBreaker:
+    """Closed -> open after too many failures -> half-open single probe -> closed."""
+
+    def __init__(self, failures: int, failure_rate: float, recovery: float) -> None:
+        """Initialize the breaker; failure_rate is 0..1, recovery is in seconds."""
+        self.failures = failures
+        self.failure_rate = failure_rate
+        self.recovery = recovery
+        self.state = STATE_CLOSED
+        self.consecutive_failures = 0
+        self.times_opened = 0
+        self.last_error = None
+        self._outcomes = deque(maxlen=WINDOW_SIZE)
+        self._opened_at = None
+        self._opened_wall = None
+        self._probe_in_flight = False
+
+    def is_open(self) -> bool:
+        """True while calls are being refused (does not start a probe)."""
+        if self.state == STATE_OPEN:
+            return time.monotonic() - self._opened_at < self.recovery
+        return self.state == STATE_HALF_OPEN and self._probe_in_flight
+
+    def allow_request(self) -> bool:
+        """Return True if a call may go out; lets exactly one probe through when half-open."""
+        if self.state == STATE_CLOSED:
+            return True
+        if self.state == STATE_OPEN:
+            if time.monotonic() - self._opened_at < self.recovery:
+                return False
+            self.state = STATE_HALF_OPEN
+        if self._probe_in_flight:
+            return False
+        self._probe_in_flight = True
+        return True
+
+    def record_success(self) -> None:
+        """The provider answered (any answer that is not an outage)."""
+        self._probe_in_flight = False
+        self.consecutive_failures = 0
+        self._outcomes.append(False)
+        if self.state != STATE_CLOSED:
+            _LOGGER.info("NotifyAI - Circuit closed again after a successful probe")
+            self.state = STATE_CLOSED
+            self._outcomes.clear()
+
+    def record_failure(self, error: Exception) -> None:
+        """The provider failed with an outage-type error."""
+        self._probe_in_flight = False
+        self.consecutive_failures += 1
+        self.last_error = str(error)[:200]
+        self._outcomes.append(True)
+        if self.state == STATE_HALF_OPEN or self._should_open():
+            self._open()
+
+    def release(self) -> None:
+        """The call ended without a verdict (e.g. cancelled); free the probe slot."""
+        self._probe_in_flight = False
+
+    def _should_open(self) -> bool:
+        if self.failures and self.consecutive_failures >= self.failures:
+            return True
+        if self.failure_rate and len(self._outcomes) >= MIN_CALLS:
+            return sum(self._outcomes) / len(self._outcomes) >= self.failure_rate
+        return False
+
+    def _open(self) -> None:
+        if self.state != STATE_OPEN:
+            self.times_opened += 1
+        self.state = STATE_OPEN
+        self._opened_at = time.monotonic()
+        self._opened_wall = dt_util.now()
+        _LOGGER.warning(
+            "NotifyAI - Circuit opened for %.0f s after %s consecutive failures: %s",
+            self.recovery, self.consecutive_failures, self.last_error
+        )
+
+    def as_dict(self) -> dict:
+        """State for sensor attributes."""
+        state = self.state
+        if state == STATE_OPEN and not self.is_open():
+            # Recovery time is over; the next call will be the probe
+            state = STATE_HALF_OPEN
+        result = {
+            "state": state,
+            "consecutive_failures": self.consecutive_failures,
+            "failure_rate": round(sum(self._outcomes) / len(self._outcomes), 2) if self._outcomes else 0.0,
+            "times_opened": self.times_opened,
+            "last_error": self.last_error,
+        }
+        if self._opened_wall is not None:
+            result["opened_at"] = self._opened_wall.isoformat()
+        return result
+
+
+class CircuitBreakers:
+    """The breakers of one entry, one per model."""
+
+    def __init__(
+        self,
+        failures: int = DEFAULT_BREAKER_FAILURES,
+        failure_rate: float = DEFAULT_BREAKER_FAILURE_RATE / 100,
+        recovery: float = DEFAULT_BREAKER_RECOVERY
+    ) -> None:
+        """Initialize the set with the settings new breakers get."""
+        self.failures = failures
+        self.failure_rate = failure_rate
+        self.recovery = recovery
+        self._breakers = {}
+
+    def configure(self, failures: int, failure_rate: float, recovery: float) -> None:
+        """Apply new thresholds to existing breakers too; their state and history are kept."""
+        self.failures = failures
+        self.failure_rate = failure_rate
+        self.recovery = recovery
+        for breaker in self._breakers.values():
+            breaker.failures = failures
+            breaker.failure_rate = failure_rate
+            breaker.recovery = recovery
+
+    def get(self, model: str) -> CircuitBreaker:
+        """Return the breaker of a model, creating it on first use."""
+        breaker = self._breakers.get(model)
+        if breaker is None:
+            breaker = CircuitBreaker(self.failures, self.failure_rate, self.recovery)
+            self._breakers[model] = breaker
+        return breaker
+
+    def is_open(self, model: str) -> bool:
+        """True if calls to the model are currently refused."""
+        breaker = self._breakers.get(model)
+        return breaker is not None and breaker.is_open()
+
+    def state(self, model: str) -> str:
+        """Breaker state of a model for display."""
+        breaker = self._breakers.get(model)
+        if breaker is None:
+            return STATE_CLOSED
+        return breaker.as_dict()["state"]
+
+    def as_dict(self) -> dict:
+        """Per-model breaker states for sensor attributes."""
+        return {model: breaker.as_dict() for model, breaker in self._breakers.items()}
@@ -3,6 +3,7 @@ import voluptuous as vol
 import aiohttp
 from homeassistant import config_entries
 from homeassistant.core import callback
+from homeassistant.helpers.selector import TextSelector, TextSelectorConfig
 from .const import (
     DOMAIN, 
     CONF_API_KEY, 
@@ -18,8 +19,56 @@ from .const import (
     AI_PROVIDERS,
     GROQ_MODELS,
     DEFAULT_GROQ_MODEL,
-    GROQ_MODEL_LIMITS
+    GROQ_MODEL_LIMITS,
+    CONF_EXTRA_API_KEYS,
+    CONF_KEY_STRATEGY,
+    KEY_STRATEGIES,
+    DEFAULT_KEY_STRATEGY,
+    CONF_SIMILARITY_THRESHOLD,
+    CONF_SIMILARITY_MAX_ENTRIES,
+    DEFAULT_SIMILARITY_THRESHOLD,
+    DEFAULT_SIMILARITY_MAX_ENTRIES,
+    CONF_VARIANT_COUNT,
+    CONF_VARIANT_MAX_AGE,
+    DEFAULT_VARIANT_COUNT,
+    DEFAULT_VARIANT_MAX_AGE,
+    CONF_AUTO_MODEL,
+    DEFAULT_AUTO_MODEL,
+    CONF_BREAKER_FAILURES,
+    CONF_BREAKER_FAILURE_RATE,
+    CONF_BREAKER_RECOVERY,
+    DEFAULT_BREAKER_FAILURES,
+    DEFAULT_BREAKER_FAILURE_RATE,
+    DEFAULT_BREAKER_RECOVERY,
+    CONF_REPETITION_THRESHOLD,
+    CONF_REPETITION_HISTORY,
+    DEFAULT_REPETITION_THRESHOLD,
+    DEFAULT_REPETITION_HISTORY,
+    CONF_BASE_URL,
+    CONF_RECORD_TRAFFIC,
+    DEFAULT_RECORD_TRAFFIC,
+    CONF_CRITICAL_RESERVE,
+    CONF_THROTTLE_LOW_PRIORITY,
+    DEFAULT_CRITICAL_RESERVE,
+    DEFAULT_THROTTLE_LOW_PRIORITY,
+    CONF_LOOP_WATCHDOG,
+    CONF_SLOW_STEP_MS,
+    DEFAULT_LOOP_WATCHDOG,
+    DEFAULT_SLOW_STEP_MS,
+    CONF_DIGEST_INTERVAL,
+    CONF_DIGEST_MAX_EVENTS,
+    DEFAULT_DIGEST_INTERVAL,
+    DEFAULT_DIGEST_MAX_EVENTS,
+    CONF_TRIGGER_RULES,
+    CONF_NOTIFICATION_LANGUAGE,
+    DEFAULT_NOTIFICATION_LANGUAGE,
+    CONF_LOCAL_API_KEY,
+    PROVIDER_BASE_URLS,
+    PROVIDER_DISPLAY_NAMES
 )
+from .key_pool import parse_api_keys
+from .openai_compat import async_fetch_models, auth_headers, entry_base_url, normalize_base_url
+from .triggers import RULE_PLACEHOLDERS, RULES_EXAMPLE, parse_rules
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -34,6 +83,8 @@ class AiNotificationConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         if user_input is not None:
             # Store provider selection and move to API key step
             self.provider = user_input.get(CONF_AI_PROVIDER, "gemini")
+            if self.provider == "local":
+                return await self.async_step_local()
             return await self.async_step_api_key()
 
         return self.async_show_form(
@@ -53,28 +104,31 @@ class AiNotificationConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             return await self.async_step_user()
         
         if user_input is not None:
+            # Several keys may be entered separated by commas; the first one is the primary key
             if self.provider == "gemini":
-                api_key = user_input.get(CONF_API_KEY)
-                if not api_key:
+                api_keys = parse_api_keys(user_input.get(CONF_API_KEY))
+                if not api_keys:
                     errors["base"] = "invalid_api_key"
                 else:
                     return self.async_create_entry(
                         title="NotifyAI (Gemini)", 
                         data={
                             CONF_AI_PROVIDER: "gemini",
-                            CONF_API_KEY: api_key
+                            CONF_API_KEY: api_keys[0],
+                            CONF_EXTRA_API_KEYS: api_keys[1:]
                         }
                     )
             elif self.provider == "groq":
-                groq_key = user_input.get(CONF_GROQ_API_KEY)
-                if not groq_key:
+                groq_keys = parse_api_keys(user_input.get(CONF_GROQ_API_KEY))
+                if not groq_keys:
                     errors["base"] = "invalid_api_key"
                 else:
                     return self.async_create_entry(
                         title="NotifyAI (Groq)",
                         data={
                             CONF_AI_PROVIDER: "groq",
-                            CONF_GROQ_API_KEY: groq_key
+                            CONF_GROQ_API_KEY: groq_keys[0],
+                            CONF_EXTRA_API_KEYS: groq_keys[1:]
                         }
                     )
         
@@ -94,6 +148,41 @@ class AiNotificationConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             errors=errors
         )
 
+    async def async_step_local(self, user_input=None):
+        """Handle an OpenAI-compatible server: address, optional key and a discovered model."""
+        errors = {}
+
+        if user_input is not None:
+            base_url = normalize_base_url(user_input.get(CONF_BASE_URL))
+            api_key = (user_input.get(CONF_LOCAL_API_KEY) or "").strip()
+            models = await fetch_local_models(base_url, api_key)
+            model = (user_input.get(CONF_MODEL) or "").strip() or (models[0] if models else "")
+            if models is None:
+                errors["base"] = "cannot_connect"
+            elif not model or (models and model not in models):
+                errors[CONF_MODEL] = "invalid_model"
+            else:
+                return self.async_create_entry(
+                    title="NotifyAI (Yerel)",
+                    data={
+                        CONF_AI_PROVIDER: "local",
+                        CONF_BASE_URL: base_url,
+                        CONF_LOCAL_API_KEY: api_key,
+                        CONF_MODEL: model
+                    },
+                    options={CONF_MODEL: model}
+                )
+
+        return self.async_show_form(
+            step_id="local",
+            data_schema=vol.Schema({
+                vol.Required(CONF_BASE_URL, default=PROVIDER_BASE_URLS["local"]): str,
+                vol.Optional(CONF_LOCAL_API_KEY, default=""): str,
+                vol.Optional(CONF_MODEL, default=""): str,
+            }),
+            errors=errors
+        )
+
     @staticmethod
     @callback
     def async_get_options_flow(config_entry):
@@ -161,13 +250,19 @@ async def validate_model(api_key, model_name):
     except Exception as e:
         return False, str(e)
 
-async def validate_groq_model(api_key, model_name):
-    """Validate Groq model with a minimal chat completion request."""
-    url = "https://api.groq.com/openai/v1/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
+async def fetch_local_models(base_url, api_key=None):
+    """Model ids served by an OpenAI-compatible server, or None if it can't be reached."""
+    try:
+        async with aiohttp.ClientSession() as session:
+            return await async_fetch_models(session, base_url, api_key)
+    except Exception as e:
+        _LOGGER.error("Error fetching models from %s: %s", base_url, e)
+    return None
+
+async def validate_groq_model(api_key, model_name, base_url=None):
+    """Validate a Groq (or other OpenAI-compatible) model with a minimal chat completion request."""
+    url = f"{base_url or PROVIDER_BASE_URLS['groq']}/v1/chat/completions"
+    headers = auth_headers(api_key)
     payload = {
         "model": model_name,
         "messages": [{"role": "user", "content": "hi"}],
@@ -198,6 +293,25 @@ class AiNotificationOptionsFlowHandler(config_entries.OptionsFlow):
             return "***"
         return f"{api_key[:3]}...{api_key[-3:]}"
     
+    def _api_key(self, provider: str) -> str:
+        """The entry's primary API key for its provider."""
+        if provider == "gemini":
+            return self._config_entry.data.get(CONF_API_KEY)
+        if provider == "local":
+            return self._config_entry.data.get(CONF_LOCAL_API_KEY)
+        return self._config_entry.data.get(CONF_GROQ_API_KEY)
+
+    async def _local_model_options(self) -> dict:
+        """Models of the entry's local server; the configured one stays selectable if it's offline."""
+        models = await fetch_local_models(
+            entry_base_url("local", self._config_entry.data, self._config_entry.options),
+            self._config_entry.data.get(CONF_LOCAL_API_KEY)
+        ) or []
+        current_model = self._config_entry.options.get(CONF_MODEL) or self._config_entry.data.get(CONF_MODEL)
+        if current_model and current_model not in models:
+            models.append(current_model)
+        return {model: model for model in models}
+
     def _get_notify_services(self) -> dict:
         """Get all available notify services in Home Assistant."""
         notify_services = {"none": "Yok"}  # Use "none" as sentinel value instead of ""
@@ -227,21 +341,20 @@ class AiNotificationOptionsFlowHandler(config_entries.OptionsFlow):
         provider = self._config_entry.data.get(CONF_AI_PROVIDER, "gemini")
         
         # Get appropriate API key
-        if provider == "gemini":
-            api_key = self._config_entry.data.get(CONF_API_KEY)
-        else:  # groq
-            api_key = self._config_entry.data.get(CONF_GROQ_API_KEY)
+        api_key = self._api_key(provider)
         
         # Get masked key and provider display name for UI
         masked_key = self._mask_api_key(api_key)
-        provider_display = "Google Gemini" if provider == "gemini" else "Groq"
+        provider_display = PROVIDER_DISPLAY_NAMES.get(provider, provider)
         
         # Handle navigation to advanced settings
         if user_input is not None and user_input.get("advanced_settings"):
             return await self.async_step_advanced()
         
         # We need to maintain the list of available models across steps if validation fails
-        if "model_options" not in self.hass.data.get(DOMAIN, {}):
+        if provider == "local":
+            model_options = await self._local_model_options()
+        elif "model_options" not in self.hass.data.get(DOMAIN, {}):
             if provider == "gemini":
                 dynamic_models, _, _ = await fetch_models(api_key)
                 model_options = dynamic_models if dynamic_models else MODEL_OPTIONS
@@ -275,6 +388,10 @@ class AiNotificationOptionsFlowHandler(config_entries.OptionsFlow):
                 # Call appropriate validation based on provider
                 if provider == "groq":
                     success, error_msg = await validate_groq_model(api_key, new_model)
+                elif provider == "local":
+                    success, error_msg = await validate_groq_model(
+                        api_key, new_model, entry_base_url(provider, self._config_entry.data, self._config_entry.options)
+                    )
                 else:  # gemini
                     success, error_msg = await validate_model(api_key, new_model)
                 
@@ -295,9 +412,13 @@ class AiNotificationOptionsFlowHandler(config_entries.OptionsFlow):
                     CONF_NOTIFY_SERVICE_2: user_input.get(CONF_NOTIFY_SERVICE_2, ""),
                     CONF_NOTIFY_SERVICE_3: user_input.get(CONF_NOTIFY_SERVICE_3, ""),
                     CONF_NOTIFY_SERVICE_4: user_input.get(CONF_NOTIFY_SERVICE_4, ""),
+                    CONF_NOTIFICATION_LANGUAGE: (
+                        user_input.get(CONF_NOTIFICATION_LANGUAGE) or DEFAULT_NOTIFICATION_LANGUAGE
+                    ).strip(),
                 }
                 
-                return self.async_create_entry(title="", data=save_data)
+                # Keep options managed by other steps (e.g. key strategy)
+                return self.async_create_entry(title="", data={**self._config_entry.options, **save_data})
 
         current_model = self._config_entry.options.get(CONF_MODEL)
         
@@ -336,6 +457,10 @@ class AiNotificationOptionsFlowHandler(config_entries.OptionsFlow):
                     current_model = DEFAULT_MODEL
                 elif current_model not in model_options:
                     current_model = DEFAULT_MODEL
+        elif provider == "local":
+            # Whatever the server offers (GET /v1/models); no quota limits
+            if not current_model or current_model not in model_options:
+                current_model = self._config_entry.data.get(CONF_MODEL) or next(iter(model_options), "")
         else:  # groq
             # Use static Groq models
             model_options = GROQ_MODELS
@@ -352,7 +477,7 @@ class AiNotificationOptionsFlowHandler(config_entries.OptionsFlow):
                 current_model = DEFAULT_GROQ_MODEL
 
         # Get provider display name
-        provider_display = "Google Gemini" if provider == "gemini" else "Groq"
+        provider_display = PROVIDER_DISPLAY_NAMES.get(provider, provider)
         masked_key = self._mask_api_key(api_key)
         
         # Get available notify services
@@ -390,6 +515,10 @@ class AiNotificationOptionsFlowHandler(config_entries.OptionsFlow):
                 vol.Optional(CONF_NOTIFY_SERVICE_2, default=notify_2): vol.In(notify_services),
                 vol.Optional(CONF_NOTIFY_SERVICE_3, default=notify_3): vol.In(notify_services),
                 vol.Optional(CONF_NOTIFY_SERVICE_4, default=notify_4): vol.In(notify_services),
+                vol.Optional(
+                    CONF_NOTIFICATION_LANGUAGE,
+                    default=self._config_entry.options.get(CONF_NOTIFICATION_LANGUAGE, DEFAULT_NOTIFICATION_LANGUAGE)
+                ): str,
                 vol.Optional("advanced_settings", default=False): bool,
             }),
             errors=errors
@@ -400,19 +529,22 @@ class AiNotificationOptionsFlowHandler(config_entries.OptionsFlow):
         provider = self._config_entry.data.get(CONF_AI_PROVIDER, "gemini")
         
         # Get appropriate API key
-        if provider == "gemini":
-            api_key = self._config_entry.data.get(CONF_API_KEY)
-        else:  # groq
-            api_key = self._config_entry.data.get(CONF_GROQ_API_KEY)
+        api_key = self._api_key(provider)
         
         masked_key = self._mask_api_key(api_key)
-        provider_display = "Google Gemini" if provider == "gemini" else "Groq"
+        provider_display = PROVIDER_DISPLAY_NAMES.get(provider, provider)
         
         if user_input is not None:
             action = user_input.get("action")
             
             if action == "change_api_key":
                 return await self.async_step_change_api_key()
+            elif action == "manage_keys":
+                return await self.async_step_manage_keys()
+            elif action == "performance":
+                return await self.async_step_performance()
+            elif action == "rules":
+                return await self.async_step_rules()
             elif action == "change_provider":
                 return await self.async_step_change_provider()
             elif action == "back":
@@ -423,6 +555,9 @@ class AiNotificationOptionsFlowHandler(config_entries.OptionsFlow):
             data_schema=vol.Schema({
                 vol.Required("action", default="back"): vol.In({
                     "change_api_key": "🔑 API Anahtarını Değiştir",
+                    "manage_keys": "🗝️ Ek API Anahtarları (Anahtar Havuzu)",
+                    "performance": "⚡ Performans Ayarları",
+                    "rules": "📋 Tetikleme Kuralları",
                     "change_provider": "🔄 Sağlayıcıyı Değiştir",
                     "back": "⬅️ Ana Ayarlara Dön"
                 }),
@@ -437,11 +572,25 @@ class AiNotificationOptionsFlowHandler(config_entries.OptionsFlow):
         if user_input is not None:
             new_api_key = user_input.get("new_api_key")
             
-            if not new_api_key or len(new_api_key) < 10:
+            if not new_api_key or (provider != "local" and len(new_api_key) < 10):
                 errors["new_api_key"] = "invalid_api_key"
             else:
                 # Validate the new API key
-                if provider == "gemini":
+                if provider == "local":
+                    models = await fetch_local_models(
+                        entry_base_url(provider, self._config_entry.data, self._config_entry.options), new_api_key
+                    )
+                    if models is not None:
+                        new_data = dict(self._config_entry.data)
+                        new_data[CONF_LOCAL_API_KEY] = new_api_key
+                        self.hass.config_entries.async_update_entry(
+                            self._config_entry, data=new_data
+                        )
+                        # The update listener reloads the entry with the new key
+                        return self.async_create_entry(title="", data=dict(self._config_entry.options))
+                    else:
+                        errors["new_api_key"] = "invalid_api_key"
+                elif provider == "gemini":
                     # Try to fetch models with new key
                     models, _, _ = await fetch_models(new_api_key)
                     if models:
@@ -451,9 +600,8 @@ class AiNotificationOptionsFlowHandler(config_entries.OptionsFlow):
                         self.hass.config_entries.async_update_entry(
                             self._config_entry, data=new_data
                         )
-                        # Reload the integration
-                        await self.hass.config_entries.async_reload(self._config_entry.entry_id)
-                        return self.async_create_entry(title="", data={})
+                        # The update listener reloads the entry with the new key
+                        return self.async_create_entry(title="", data=dict(self._config_entry.options))
                     else:
                         errors["new_api_key"] = "invalid_api_key"
                 else:  # groq
@@ -466,13 +614,12 @@ class AiNotificationOptionsFlowHandler(config_entries.OptionsFlow):
                         self.hass.config_entries.async_update_entry(
                             self._config_entry, data=new_data
                         )
-                        # Reload the integration
-                        await self.hass.config_entries.async_reload(self._config_entry.entry_id)
-                        return self.async_create_entry(title="", data={})
+                        # The update listener reloads the entry with the new key
+                        return self.async_create_entry(title="", data=dict(self._config_entry.options))
                     else:
                         errors["new_api_key"] = "invalid_api_key"
         
-        provider_display = "Google Gemini" if provider == "gemini" else "Groq"
+        provider_display = PROVIDER_DISPLAY_NAMES.get(provider, provider)
         api_url = "https://aistudio.google.com/apikey" if provider == "gemini" else "https://console.groq.com/keys"
         
         if provider == "gemini":
@@ -503,6 +650,185 @@ class AiNotificationOptionsFlowHandler(config_entries.OptionsFlow):
             errors=errors
         )
 
+    def _async_update_data_and_options(self, data: dict, options: dict):
+        """Change data and options in one update, so the update listener runs (and reloads) once.
+
+        The flow result then carries the same options and changes nothing more.
+        """
+        self.hass.config_entries.async_update_entry(self._config_entry, data=data, options=options)
+        return self.async_create_entry(title="", data=options)
+
+    async def async_step_manage_keys(self, user_input=None):
+        """Handle extra API keys that are rotated together with the primary key."""
+        errors = {}
+        provider = self._config_entry.data.get(CONF_AI_PROVIDER, "gemini")
+        primary_key = self._api_key(provider)
+        current_keys = list(self._config_entry.data.get(CONF_EXTRA_API_KEYS, []))
+
+        if user_input is not None:
+            extra_keys = [
+                key for key in parse_api_keys(user_input.get(CONF_EXTRA_API_KEYS, ""))
+                if key != primary_key
+            ]
+
+            # Only validate keys that were not in the pool before
+            for key in extra_keys:
+                if key in current_keys:
+                    continue
+                if provider != "local" and len(key) < 10:
+                    errors[CONF_EXTRA_API_KEYS] = "invalid_api_key"
+                    break
+                if provider == "local":
+                    valid = await fetch_local_models(
+                        entry_base_url(provider, self._config_entry.data, self._config_entry.options), key
+                    ) is not None
+                elif provider == "gemini":
+                    models, _, _ = await fetch_models(key)
+                    valid = bool(models)
+                else:  # groq
+                    valid, _ = await validate_groq_model(key, DEFAULT_GROQ_MODEL)
+                if not valid:
+                    errors[CONF_EXTRA_API_KEYS] = "invalid_api_key"
+                    break
+
+            if not errors:
+                new_data = dict(self._config_entry.data)
+                new_data[CONF_EXTRA_API_KEYS] = extra_keys
+                # The update listener reloads the entry with the new pool
+                return self._async_update_data_and_options(
+                    new_data,
+                    {
+                        **self._config_entry.options,
+                        CONF_KEY_STRATEGY: user_input.get(CONF_KEY_STRATEGY, DEFAULT_KEY_STRATEGY),
+                    }
+                )
+
+        return self.async_show_form(
+            step_id="manage_keys",
+            data_schema=vol.Schema({
+                vol.Optional(CONF_EXTRA_API_KEYS, default=", ".join(current_keys)): str,
+                vol.Required(
+                    CONF_KEY_STRATEGY,
+                    default=self._config_entry.options.get(CONF_KEY_STRATEGY, DEFAULT_KEY_STRATEGY)
+                ): vol.In(KEY_STRATEGIES),
+            }),
+            errors=errors
+        )
+
+    async def async_step_performance(self, user_input=None):
+        """Handle performance tuning options."""
+        if user_input is not None:
+            return self.async_create_entry(title="", data={**self._config_entry.options, **user_input})
+
+        options = self._config_entry.options
+        return self.async_show_form(
+            step_id="performance",
+            data_schema=vol.Schema({
+                vol.Optional(
+                    CONF_SIMILARITY_THRESHOLD,
+                    default=options.get(CONF_SIMILARITY_THRESHOLD, DEFAULT_SIMILARITY_THRESHOLD)
+                ): vol.All(vol.Coerce(float), vol.Range(min=0, max=1)),
+                vol.Optional(
+                    CONF_SIMILARITY_MAX_ENTRIES,
+                    default=options.get(CONF_SIMILARITY_MAX_ENTRIES, DEFAULT_SIMILARITY_MAX_ENTRIES)
+                ): vol.All(vol.Coerce(int), vol.Range(min=100, max=100000)),
+                vol.Optional(
+                    CONF_VARIANT_COUNT,
+                    default=options.get(CONF_VARIANT_COUNT, DEFAULT_VARIANT_COUNT)
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=10)),
+                vol.Optional(
+                    CONF_VARIANT_MAX_AGE,
+                    default=options.get(CONF_VARIANT_MAX_AGE, DEFAULT_VARIANT_MAX_AGE)
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=10080)),
+                vol.Optional(
+                    CONF_REPETITION_THRESHOLD,
+                    default=options.get(CONF_REPETITION_THRESHOLD, DEFAULT_REPETITION_THRESHOLD)
+                ): vol.All(vol.Coerce(float), vol.Range(min=0, max=1)),
+                vol.Optional(
+                    CONF_REPETITION_HISTORY,
+                    default=options.get(CONF_REPETITION_HISTORY, DEFAULT_REPETITION_HISTORY)
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=50)),
+                vol.Optional(
+                    CONF_AUTO_MODEL,
+                    default=options.get(CONF_AUTO_MODEL, DEFAULT_AUTO_MODEL)
+                ): bool,
+                vol.Optional(
+                    CONF_BREAKER_FAILURES,
+                    default=options.get(CONF_BREAKER_FAILURES, DEFAULT_BREAKER_FAILURES)
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=100)),
+                vol.Optional(
+                    CONF_BREAKER_FAILURE_RATE,
+                    default=options.get(CONF_BREAKER_FAILURE_RATE, DEFAULT_BREAKER_FAILURE_RATE)
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=100)),
+                vol.Optional(
+                    CONF_BREAKER_RECOVERY,
+                    default=options.get(CONF_BREAKER_RECOVERY, DEFAULT_BREAKER_RECOVERY)
+                ): vol.All(vol.Coerce(int), vol.Range(min=5, max=3600)),
+                vol.Optional(
+                    CONF_CRITICAL_RESERVE,
+                    default=options.get(CONF_CRITICAL_RESERVE, DEFAULT_CRITICAL_RESERVE)
+                ): vol.All(vol.Coerce(int), vol.Range(min=0, max=10000)),
+                vol.Optional(
+                    CONF_THROTTLE_LOW_PRIORITY,
+                    default=options.get(CONF_THROTTLE_LOW_PRIORITY, DEFAULT_THROTTLE_LOW_PRIORITY)
+                ): bool,
+                vol.Optional(
+                    CONF_DIGEST_INTERVAL,
+                    default=options.get(CONF_DIGEST_INTERVAL, DEFAULT_DIGEST_INTERVAL)
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=1440)),
+                vol.Optional(
+                    CONF_DIGEST_MAX_EVENTS,
+                    default=options.get(CONF_DIGEST_MAX_EVENTS, DEFAULT_DIGEST_MAX_EVENTS)
+                ): vol.All(vol.Coerce(int), vol.Range(min=2, max=50)),
+                vol.Optional(
+                    CONF_LOOP_WATCHDOG,
+                    default=options.get(CONF_LOOP_WATCHDOG, DEFAULT_LOOP_WATCHDOG)
+                ): bool,
+                vol.Optional(
+                    CONF_SLOW_STEP_MS,
+                    default=options.get(CONF_SLOW_STEP_MS, DEFAULT_SLOW_STEP_MS)
+                ): vol.All(vol.Coerce(int), vol.Range(min=1, max=10000)),
+                vol.Optional(
+                    CONF_RECORD_TRAFFIC,
+                    default=options.get(CONF_RECORD_TRAFFIC, DEFAULT_RECORD_TRAFFIC)
+                ): bool,
+                vol.Optional(
+                    CONF_BASE_URL,
+                    default=options.get(CONF_BASE_URL, "")
+                ): str,
+            })
+        )
+
+    async def async_step_rules(self, user_input=None):
+        """Handle declarative state-change trigger rules (YAML)."""
+        errors = {}
+        placeholders = {"error_message": "", "fields": RULE_PLACEHOLDERS, "example": RULES_EXAMPLE}
+        rules_text = self._config_entry.options.get(CONF_TRIGGER_RULES, "")
+
+        if user_input is not None:
+            rules_text = user_input.get(CONF_TRIGGER_RULES, "")
+            try:
+                parse_rules(rules_text)
+            except vol.Invalid as e:
+                errors[CONF_TRIGGER_RULES] = "invalid_rules"
+                placeholders["error_message"] = str(e)
+            else:
+                return self.async_create_entry(
+                    title="", data={**self._config_entry.options, CONF_TRIGGER_RULES: rules_text}
+                )
+
+        return self.async_show_form(
+            step_id="rules",
+            data_schema=vol.Schema({
+                vol.Optional(
+                    CONF_TRIGGER_RULES,
+                    description={"suggested_value": rules_text}
+                ): TextSelector(TextSelectorConfig(multiline=True)),
+            }),
+            errors=errors,
+            description_placeholders=placeholders
+        )
+
     async def async_step_change_provider(self, user_input=None):
         """Handle provider change."""
         errors = {}
@@ -526,15 +852,29 @@ class AiNotificationOptionsFlowHandler(config_entries.OptionsFlow):
                             CONF_API_KEY: new_api_key
                         }
                         
-                        self.hass.config_entries.async_update_entry(
-                            self._config_entry, data=new_data
-                        )
-                        
-                        # Reset model to default and reload
-                        await self.hass.config_entries.async_reload(self._config_entry.entry_id)
-                        return self.async_create_entry(title="", data={CONF_MODEL: DEFAULT_MODEL})
+                        # Reset model to default; the update listener reloads the entry
+                        return self._async_update_data_and_options(new_data, {CONF_MODEL: DEFAULT_MODEL})
                     else:
                         errors[CONF_API_KEY] = "invalid_api_key"
+            elif new_provider == "local":
+                base_url = normalize_base_url(user_input.get(CONF_BASE_URL) or PROVIDER_BASE_URLS["local"])
+                new_api_key = (user_input.get(CONF_LOCAL_API_KEY) or "").strip()
+                models = await fetch_local_models(base_url, new_api_key)
+                if models is None:
+                    errors[CONF_BASE_URL] = "cannot_connect"
+                elif not models:
+                    errors[CONF_BASE_URL] = "invalid_model"
+                else:
+                    # Start with the first model the server offers; the update listener reloads the entry
+                    return self._async_update_data_and_options(
+                        {
+                            CONF_AI_PROVIDER: "local",
+                            CONF_BASE_URL: base_url,
+                            CONF_LOCAL_API_KEY: new_api_key,
+                            CONF_MODEL: models[0]
+                        },
+                        {CONF_MODEL: models[0]}
+                    )
             else:  # groq
                 new_api_key = user_input.get(CONF_GROQ_API_KEY)
                 if not new_api_key:
@@ -549,13 +889,8 @@ class AiNotificationOptionsFlowHandler(config_entries.OptionsFlow):
                             CONF_GROQ_API_KEY: new_api_key
                         }
                         
-                        self.hass.config_entries.async_update_entry(
-                            self._config_entry, data=new_data
-                        )
-                        
-                        # Reset model to default and reload
-                        await self.hass.config_entries.async_reload(self._config_entry.entry_id)
-                        return self.async_create_entry(title="", data={CONF_MODEL: DEFAULT_GROQ_MODEL})
+                        # Reset model to default; the update listener reloads the entry
+                        return self._async_update_data_and_options(new_data, {CONF_MODEL: DEFAULT_GROQ_MODEL})
                     else:
                         errors[CONF_GROQ_API_KEY] = "invalid_api_key"
         
@@ -568,10 +903,12 @@ class AiNotificationOptionsFlowHandler(config_entries.OptionsFlow):
                 vol.Required(CONF_AI_PROVIDER, default=suggested_provider): vol.In(AI_PROVIDERS),
                 vol.Optional(CONF_API_KEY): str,
                 vol.Optional(CONF_GROQ_API_KEY): str,
+                vol.Optional(CONF_BASE_URL): str,
+                vol.Optional(CONF_LOCAL_API_KEY): str,
             }),
             errors=errors,
             description_placeholders={
                 "current_provider": f"Mevcut: {current_provider}",
-                "info": "⚠️ Yeni sağlayıcıyı seçin ve ilgili API anahtarını girin.\\n\\nModel otomatik olarak varsayılana sıfırlanacak.\\n\\n📍 Gemini: https://aistudio.google.com/apikey\\n📍 Groq: https://console.groq.com/keys"
+                "info": "⚠️ Yeni sağlayıcıyı seçin ve ilgili API anahtarını girin.\\n\\nModel otomatik olarak varsayılana sıfırlanacak.\\n\\n📍 Gemini: https://aistudio.google.com/apikey\\n📍 Groq: https://console.groq.com/keys\\n📍 Yerel sunucu: adresi (örn. http://192.168.1.10:11434) ve varsa API anahtarı"
             }
         )
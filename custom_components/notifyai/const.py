@@ -12,9 +12,19 @@ CONF_GROQ_API_KEY = "groq_api_key"
 
 AI_PROVIDERS = {
     "gemini": "Google Gemini (1500/gün)",
-    "groq": "Groq (14,400/gün, Çok Hızlı)"
+    "groq": "Groq (14,400/gün, Çok Hızlı)",
+    "local": "Yerel Sunucu (OpenAI uyumlu: llama.cpp, Ollama - kota yok)"
 }
 
+PROVIDER_DISPLAY_NAMES = {
+    "gemini": "Google Gemini",
+    "groq": "Groq",
+    "local": "Yerel (OpenAI uyumlu)",
+}
+
+# OpenAI-compatible server on the LAN; the API key is optional
+CONF_LOCAL_API_KEY = "local_api_key"
+
 # Gemini Models
 MODEL_OPTIONS = {
     "gemini-2.5-flash": "Gemini 2.5 Flash (15 RPM, 1500/gün - Tahmini)",
@@ -54,3 +64,121 @@ GROQ_MODEL_LIMITS = {
     "llama-3.3-70b-specdec": {"rpm": 8000, "rpd": 14400},
     "gemma2-9b-it": {"rpm": 15000, "rpd": 14400},
 }
+
+# API Key Pool
+CONF_EXTRA_API_KEYS = "extra_api_keys"
+CONF_KEY_STRATEGY = "key_strategy"
+
+KEY_STRATEGY_ROUND_ROBIN = "round_robin"
+KEY_STRATEGY_LEAST_LOADED = "least_loaded"
+
+KEY_STRATEGIES = {
+    KEY_STRATEGY_ROUND_ROBIN: "Sırayla (Round-robin)",
+    KEY_STRATEGY_LEAST_LOADED: "En az yüklü anahtar",
+}
+
+DEFAULT_KEY_STRATEGY = KEY_STRATEGY_ROUND_ROBIN
+
+# Hard cap for a single provider request (seconds); the timeout_ms service field can be shorter
+DEFAULT_PROVIDER_TIMEOUT = 30
+
+# Events fired for background (fire-and-forget) generations
+EVENT_GENERATED = "notifyai_generated"
+EVENT_FAILED = "notifyai_failed"
+
+# Near-duplicate reuse (0 = disabled)
+CONF_SIMILARITY_THRESHOLD = "similarity_threshold"
+CONF_SIMILARITY_MAX_ENTRIES = "similarity_max_entries"
+
+DEFAULT_SIMILARITY_THRESHOLD = 0.0
+DEFAULT_SIMILARITY_MAX_ENTRIES = 20000
+
+# Extra variants generated per provider call and served for repeats of the same event (1 = off)
+CONF_VARIANT_COUNT = "variant_count"
+CONF_VARIANT_MAX_AGE = "variant_max_age"
+
+DEFAULT_VARIANT_COUNT = 1
+DEFAULT_VARIANT_MAX_AGE = 1440  # minutes
+
+# Quota-aware model switching: models of each provider from best quality to highest quota.
+# The configured model is the top rung; calls step down before its quota runs out.
+CONF_AUTO_MODEL = "auto_model"
+DEFAULT_AUTO_MODEL = True
+
+MODEL_LADDERS = {
+    "gemini": [
+        "gemini-2.5-pro",
+        "gemini-2.5-flash",
+        "gemini-2.0-flash-lite-preview-02-05",
+        "gemini-1.5-flash",
+    ],
+    "groq": [
+        "llama-3.3-70b-versatile",
+        "llama-3.3-70b-specdec",
+        "llama-3.1-8b-instant",
+        "gemma2-9b-it",
+    ],
+}
+
+# Circuit breaker per model (0 disables a rule)
+CONF_BREAKER_FAILURES = "breaker_failures"
+CONF_BREAKER_FAILURE_RATE = "breaker_failure_rate"
+CONF_BREAKER_RECOVERY = "breaker_recovery"
+
+DEFAULT_BREAKER_FAILURES = 5  # consecutive failures
+DEFAULT_BREAKER_FAILURE_RATE = 50  # percent of recent calls
+DEFAULT_BREAKER_RECOVERY = 30  # seconds before a probe is let through
+
+# Daily quotas reset at midnight in these time zones (Gemini: Pacific time)
+QUOTA_RESET_TIMEZONES = {
+    "gemini": "America/Los_Angeles",
+    "groq": "UTC",
+}
+
+# Anti-repetition against recently delivered notifications of the same event (0 = disabled)
+CONF_REPETITION_THRESHOLD = "repetition_threshold"
+CONF_REPETITION_HISTORY = "repetition_history"
+
+DEFAULT_REPETITION_THRESHOLD = 0.0
+DEFAULT_REPETITION_HISTORY = 10
+
+# Provider API roots; an entry can point at another address (proxy or local stand-in)
+CONF_BASE_URL = "base_url"
+
+PROVIDER_BASE_URLS = {
+    "gemini": "https://generativelanguage.googleapis.com",
+    "groq": "https://api.groq.com/openai",
+    "local": "http://localhost:8080",
+}
+
+# Opt-in JSONL recording of generate calls for offline replay
+CONF_RECORD_TRAFFIC = "record_traffic"
+DEFAULT_RECORD_TRAFFIC = False
+
+# Requests kept for priority: critical calls; low-priority calls are throttled when the forecast runs short
+CONF_CRITICAL_RESERVE = "critical_reserve"
+CONF_THROTTLE_LOW_PRIORITY = "throttle_low_priority"
+
+DEFAULT_CRITICAL_RESERVE = 0
+DEFAULT_THROTTLE_LOW_PRIORITY = True
+
+# Event-loop watchdog: lag probe while NotifyAI works, in-loop steps slower than this are reported (ms)
+CONF_LOOP_WATCHDOG = "loop_watchdog"
+CONF_SLOW_STEP_MS = "slow_step_ms"
+
+DEFAULT_LOOP_WATCHDOG = False
+DEFAULT_SLOW_STEP_MS = 50
+
+# Digest delivery: buffered events are summarized every N minutes or once this many are waiting
+CONF_DIGEST_INTERVAL = "digest_interval"
+CONF_DIGEST_MAX_EVENTS = "digest_max_events"
+
+DEFAULT_DIGEST_INTERVAL = 60
+DEFAULT_DIGEST_MAX_EVENTS = 10
+
+# Language the notifications are written in (a language name the model understands)
+CONF_NOTIFICATION_LANGUAGE = "notification_language"
+DEFAULT_NOTIFICATION_LANGUAGE = "Turkish"
+
+# Declarative state-change rules (YAML list) handled without an automation per notification
+CONF_TRIGGER_RULES = "trigger_rules"
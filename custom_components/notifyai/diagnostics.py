@@ -0,0 +1,113 @@
+"""Diagnostics support for NotifyAI - a redacted snapshot of the entry's runtime state."""
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import (
+    DOMAIN,
+    CONF_API_KEY,
+    CONF_GROQ_API_KEY,
+    CONF_EXTRA_API_KEYS,
+    CONF_LOCAL_API_KEY,
+    CONF_AI_PROVIDER,
+    CONF_MODEL,
+)
+from .router import entry_score, latency_histogram, remaining_quota_ratio
+
+TO_REDACT = {CONF_API_KEY, CONF_GROQ_API_KEY, CONF_EXTRA_API_KEYS, CONF_LOCAL_API_KEY}
+
+REDACTED = "**REDACTED**"
+
+# Shorter keys (an optional local-server key can be "x") would match inside any
+# text; those are only redacted as fields by async_redact_data
+MIN_SCRUB_LENGTH = 16
+
+
+def _scrub(value, secrets: tuple):
+    """Replace API keys that ended up inside strings (e.g. request URLs in error texts)."""
+    if isinstance(value, str):
+        for secret in secrets:
+            value = value.replace(secret, REDACTED)
+        return value
+    if isinstance(value, dict):
+        return {key: _scrub(item, secrets) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_scrub(item, secrets) for item in value]
+    return value
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict:
+    """Return diagnostics for a config entry.
+
+    Everything is read from in-memory counters, so collecting it does no I/O and
+    never waits on a provider.
+    """
+    domain_data = hass.data.get(DOMAIN, {})
+    entry_data = domain_data.get(entry.entry_id)
+    diagnostics = {
+        "entry": {
+            "title": entry.title,
+            "data": async_redact_data(dict(entry.data), TO_REDACT),
+            "options": async_redact_data(dict(entry.options), TO_REDACT),
+        },
+        "loaded": entry_data is not None,
+    }
+    if entry_data is None:
+        return diagnostics
+
+    key_pool = entry_data["key_pool"]
+    response_cache = entry_data["response_cache"]
+    lookups = response_cache.hits + response_cache.misses
+    latency = entry_data.get("latency", {})
+    jobs = domain_data.get("jobs")
+    suppression = domain_data.get("suppression")
+    digest = domain_data.get("digest")
+    supersede = domain_data.get("supersede")
+
+    diagnostics["runtime"] = {
+        "provider": entry_data.get(CONF_AI_PROVIDER, "gemini"),
+        "model": entry_data.get(CONF_MODEL),
+        "active_model": entry_data["model_policy"].active_model,
+        "routing_score": round(entry_score(hass, entry.entry_id), 3),
+        "remaining_quota_ratio": round(remaining_quota_ratio(hass, entry.entry_id), 3),
+        "quota_data": entry_data.get("quota_data", {}),
+        "usage_data": entry_data.get("usage_data", {}),
+        "usage": entry_data["usage"].as_dict(),
+        "forecast": entry_data["forecast"].as_dict(),
+        "latency": {
+            "ewma_ms": round(latency["ewma_ms"], 1) if latency.get("ewma_ms") is not None else None,
+            "last_ms": latency.get("last_ms"),
+            "samples": latency.get("samples", 0),
+            "histogram": latency_histogram(entry_data),
+        },
+        "caches": {
+            "response_cache": {
+                "size": len(response_cache),
+                "max_size": response_cache.max_size,
+                "hits": response_cache.hits,
+                "misses": response_cache.misses,
+                "hit_rate": round(response_cache.hits / lookups, 3) if lookups else 0.0,
+            },
+            "similarity": entry_data["similarity_index"].as_dict(),
+            "variants": entry_data["variant_pool"].as_dict(),
+            "repetition": entry_data["repetition_guard"].as_dict(),
+        },
+        "queues": {
+            "background_jobs": jobs.queue_depth(entry.entry_id) if jobs is not None else 0,
+            "background_jobs_total": jobs.queue_depth() if jobs is not None else 0,
+            "jobs": jobs.as_dict(entry.entry_id) if jobs is not None else None,
+            "suppression": suppression.as_dict(entry.entry_id) if suppression is not None else None,
+            "digest": digest.as_dict(entry.entry_id) if digest is not None else None,
+            "supersede": supersede.as_dict(entry.entry_id) if supersede is not None else None,
+        },
+        "recent_errors": list(entry_data.get("recent_errors", [])),
+        "model_policy": entry_data["model_policy"].as_dict(),
+        "circuit_breakers": entry_data["breakers"].as_dict(),
+        "triggers": entry_data["triggers"].as_dict() if "triggers" in entry_data else None,
+        "key_pool": key_pool.as_dict(),
+        "tts_findings": entry_data.get("tts_findings", {}),
+        "model_limits": domain_data.get("model_limits", {}),
+        "loop_watchdog": domain_data["loop_watchdog"].as_dict() if "loop_watchdog" in domain_data else None,
+    }
+
+    return _scrub(diagnostics, tuple(key for key in key_pool.keys if key and len(key) >= MIN_SCRUB_LENGTH))
@@ -0,0 +1,172 @@
+"""Digest delivery - buffer informational events per target and send one summary."""
+import logging
+import time
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_KEY = "notifyai_digest"
+STORAGE_VERSION = 1
+SAVE_DELAY = 10
+
+# Upper bound of events held per target; the oldest are dropped beyond it
+MAX_DIGEST_EVENTS = 50
+
+# Digests that came due while Home Assistant was down wait for the entries to load (seconds)
+STARTUP_FLUSH_DELAY = 30
+
+# Fields that decide how and where the digest is delivered (the newest call that sets one wins)
+DELIVERY_FIELDS = (
+    "mode", "persona", "notify_service", "audio_device", "tts_service", "language", "priority",
+)
+
+# Appended to the system prompt for the summary request
+DIGEST_SYSTEM_PROMPT = """
+
+DIGEST (overrides the single-event rules):
+- Context lists several informational events collected since the last digest, one per line with its time.
+- Write ONE notification that summarizes all of them briefly; group similar events and put the most important first.
+- Follow the Mode (and Persona, if given) as usual and return the usual single JSON object."""
+
+
+def is_digest(data: dict) -> bool:
+    """Whether a call is a digest summary (never reused for other calls)."""
+    return bool(data.get("digest_count"))
+
+
+class DigestManager:
+    """Per-target buffers of digest events, flushed by interval or count.
+
+    A buffer is keyed by entry and notify target. The first event schedules
+    the flush `interval` seconds later, reaching `max_events` flushes at
+    once. Buffers are persisted, so events survive a restart.
+    """
+
+    def __init__(self, hass: HomeAssistant, flush_callback) -> None:
+        """Initialize the manager.
+
+        `flush_callback(entry_id, data)` is awaited with the summary call.
+        """
+        self._hass = hass
+        self._flush_callback = flush_callback
+        self._store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._buffers = {}
+        self._timers = {}
+        self.entry_stats = {}
+
+    @staticmethod
+    def make_key(entry_id: str, data: dict) -> str:
+        """Return the buffer key of a call."""
+        return f"{entry_id}|{data.get('notify_service') or 'default'}"
+
+    def _stats(self, entry_id: str) -> dict:
+        return self.entry_stats.setdefault(entry_id, {"buffered": 0, "flushed": 0, "digests": 0, "dropped": 0})
+
+    async def async_load(self) -> None:
+        """Restore buffers from the last run and schedule their flushes."""
+        stored = await self._store.async_load()
+        if not stored:
+            return
+        self._buffers = stored.get("buffers", {})
+        now = time.time()
+        for key, buffer in self._buffers.items():
+            due = buffer["started"] + buffer["interval"] - now
+            self._schedule(key, max(STARTUP_FLUSH_DELAY, due))
+        if self._buffers:
+            _LOGGER.debug("NotifyAI - Restored %s digest buffer(s)", len(self._buffers))
+
+    @callback
+    def _data_to_save(self) -> dict:
+        return {"buffers": self._buffers}
+
+    def add(self, entry_id: str, data: dict, interval: float, max_events: int) -> dict:
+        """Buffer one call and return what the service responds."""
+        key = self.make_key(entry_id, data)
+        buffer = self._buffers.get(key)
+        if buffer is None:
+            buffer = {"entry_id": entry_id, "started": time.time(), "interval": interval, "events": [], "data": {}}
+            self._buffers[key] = buffer
+            self._schedule(key, interval)
+
+        buffer["events"].append({
+            "at": time.time(),
+            "event": data.get("event"),
+            "context": data.get("context") or None,
+        })
+        buffer["data"].update({field: data[field] for field in DELIVERY_FIELDS if data.get(field)})
+        stats = self._stats(entry_id)
+        stats["buffered"] += 1
+        if len(buffer["events"]) > MAX_DIGEST_EVENTS:
+            del buffer["events"][0]
+            stats["dropped"] += 1
+
+        count = len(buffer["events"])
+        if count >= max_events:
+            self._flush(key)
+            return {"key": key, "buffered": count, "flushed": True}
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+        return {
+            "key": key,
+            "buffered": count,
+            "flush_in_s": max(0, round(buffer["started"] + buffer["interval"] - time.time())),
+        }
+
+    def _schedule(self, key: str, delay: float) -> None:
+        @callback
+        def _due(_now) -> None:
+            self._timers.pop(key, None)
+            self._flush(key)
+
+        self._timers[key] = async_call_later(self._hass, max(0.0, delay), _due)
+
+    def _flush(self, key: str) -> None:
+        """Turn a buffer into one summary call and clear it."""
+        unsub = self._timers.pop(key, None)
+        if unsub is not None:
+            unsub()
+        buffer = self._buffers.pop(key, None)
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+        if not buffer or not buffer["events"]:
+            return
+
+        events = buffer["events"]
+        lines = []
+        for item in events:
+            at = dt_util.as_local(dt_util.utc_from_timestamp(item["at"])).strftime("%H:%M")
+            line = f"- {at} {item['event']}"
+            if item.get("context"):
+                line += f" ({item['context']})"
+            lines.append(line)
+
+        data = {
+            **buffer["data"],
+            "event": f"Özet: {len(events)} olay",
+            "context": "\n".join(lines),
+            "digest_count": len(events),
+        }
+        stats = self._stats(buffer["entry_id"])
+        stats["flushed"] += len(events)
+        stats["digests"] += 1
+        _LOGGER.debug("NotifyAI - Sending digest of %s event(s) for %s", len(events), key)
+        self._hass.async_create_task(self._flush_callback(buffer["entry_id"], data))
+
+    async def async_stop(self) -> None:
+        """Cancel the flush timers and persist the buffers for the next start."""
+        for unsub in self._timers.values():
+            unsub()
+        self._timers.clear()
+        await self._store.async_save(self._data_to_save())
+
+    def as_dict(self, entry_id: str) -> dict:
+        """Counters of an entry plus its buffers waiting for a flush."""
+        stats = dict(self._stats(entry_id))
+        stats["pending"] = {
+            key: len(buffer["events"])
+            for key, buffer in self._buffers.items()
+            if buffer["entry_id"] == entry_id
+        }
+        return stats
@@ -0,0 +1,101 @@
+"""Quota exhaustion forecast and priority-based throttling for one entry."""
+import logging
+from datetime import timedelta
+
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from .router import remaining_requests
+
+_LOGGER = logging.getLogger(__name__)
+
+PRIORITY_LOW = "low"
+PRIORITY_NORMAL = "normal"
+PRIORITY_CRITICAL = "critical"
+
+
+class QuotaForecast:
+    """Project when the entry's daily quota runs out at the smoothed (EWMA) burn rate.
+
+    The last `reserve` requests are kept for priority: critical calls; low-priority
+    calls go to the fallback as soon as the projected demand until the quota
+    reset no longer fits in what is left above the reserve.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry_id: str,
+        usage,
+        reserve: int = 0,
+        throttle_low: bool = True
+    ) -> None:
+        """Initialize the forecast."""
+        self._hass = hass
+        self._entry_id = entry_id
+        self._usage = usage
+        self.reserve = reserve
+        self.throttle_low = throttle_low
+        self.throttled = {"reserve": 0, "throttled": 0}
+
+    def remaining(self):
+        """Requests left today (None without a quota)."""
+        return remaining_requests(self._hass, self._entry_id)
+
+    def seconds_until_reset(self) -> float:
+        next_reset = self._usage.next_reset
+        if next_reset is None:
+            return 0.0
+        return max(0.0, (next_reset - dt_util.utcnow()).total_seconds())
+
+    def projected_use(self) -> float:
+        """Requests the current pace will use until the quota resets."""
+        return self._usage.burn_rate() * self.seconds_until_reset()
+
+    def exhaustion_time(self):
+        """When the quota runs out at the current pace (None if it doesn't, or there is no quota)."""
+        remaining = self.remaining()
+        rate = self._usage.burn_rate()
+        if remaining is None or rate <= 0:
+            return None
+        return dt_util.utcnow() + timedelta(seconds=remaining / rate)
+
+    def throttle_reason(self, priority: str = None, count: bool = True):
+        """Why a call of this priority should use the fallback, or None to call the provider.
+
+        `count=False` only asks, without counting the call as throttled.
+        """
+        if priority == PRIORITY_CRITICAL:
+            return None
+        remaining = self.remaining()
+        if remaining is None:
+            return None
+
+        reason = None
+        if self.reserve > 0 and remaining <= self.reserve:
+            reason = "reserve"
+        elif priority == PRIORITY_LOW and self.throttle_low and remaining - self.reserve < self.projected_use():
+            reason = "throttled"
+        if reason and count:
+            self.throttled[reason] += 1
+            _LOGGER.debug(
+                "NotifyAI - %s-priority call uses the fallback (%s, %s left, reserve %s)",
+                priority or PRIORITY_NORMAL, reason, remaining, self.reserve
+            )
+        return reason
+
+    def as_dict(self) -> dict:
+        """Forecast details for sensor attributes."""
+        exhaustion = self.exhaustion_time()
+        next_reset = self._usage.next_reset
+        return {
+            "remaining": self.remaining(),
+            "burn_rate_per_hour": round(self._usage.burn_rate() * 3600, 1),
+            "projected_until_reset": round(self.projected_use()),
+            "exhausts_before_reset": bool(exhaustion and next_reset and exhaustion < next_reset),
+            "next_reset": dt_util.as_local(next_reset).isoformat() if next_reset else None,
+            "critical_reserve": self.reserve,
+            "throttle_low_priority": self.throttle_low,
+            "fallbacks_reserve": self.throttled["reserve"],
+            "fallbacks_throttled": self.throttled["throttled"],
+        }
@@ -0,0 +1,204 @@
+"""Multi-frame vision input - sample, deduplicate, downscale and budget frames for one request."""
+import asyncio
+import io
+import logging
+import math
+
+from homeassistant.core import HomeAssistant
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_FRAME_RATE = 1.0  # frames per second taken from clips and camera bursts
+MAX_FRAMES = 8
+MAX_FRAME_DIMENSION = 768  # longest side after downscaling (one Gemini tile)
+FRAME_JPEG_QUALITY = 80
+
+# Frames whose 64-bit average hashes differ in at most this many bits are duplicates
+DEDUPE_DISTANCE = 5
+
+# Whole-request budgets for the packed frames
+FRAME_BYTE_BUDGET = 4 * 1024 * 1024
+FRAME_TOKEN_BUDGET = MAX_FRAMES * 258
+
+# Images are billed as 258 tokens per 768x768 tile (one tile if both sides <= 384)
+TOKENS_PER_TILE = 258
+TILE_SIZE = 768
+
+# Frame preprocessing jobs allowed in the executor at the same time (across all calls)
+FRAME_WORKERS = 2
+_frame_workers = asyncio.Semaphore(FRAME_WORKERS)
+
+CLIP_TIMEOUT = 30
+
+# Give up on a camera that doesn't deliver a still image in time (seconds)
+CAMERA_IMAGE_TIMEOUT = 10
+
+# Longest pause between two burst stills, whatever frame_rate asks for (seconds)
+MAX_BURST_INTERVAL = 5
+
+
+def estimate_image_tokens(width: int, height: int) -> int:
+    """Rough Gemini token cost of an image."""
+    if not width or not height:
+        return TOKENS_PER_TILE
+    if width <= 384 and height <= 384:
+        return TOKENS_PER_TILE
+    return math.ceil(width / TILE_SIZE) * math.ceil(height / TILE_SIZE) * TOKENS_PER_TILE
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def prepare_frame(raw: bytes, max_dimension: int = MAX_FRAME_DIMENSION) -> dict:
+    """Decode, hash and downscale one frame (runs in the executor).
+
+    Returns {"data", "hash", "width", "height"}; without Pillow the frame is
+    passed through unchanged and cannot be deduplicated.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return {"data": raw, "hash": None, "width": None, "height": None}
+
+    with Image.open(io.BytesIO(raw)) as image:
+        image = image.convert("RGB")
+
+        # Average hash: 8x8 grayscale, one bit per pixel above the mean
+        small = list(image.convert("L").resize((8, 8), Image.BILINEAR).getdata())
+        mean = sum(small) / 64
+        frame_hash = 0
+        for pixel in small:
+            frame_hash = (frame_hash << 1) | (pixel > mean)
+
+        image.thumbnail((max_dimension, max_dimension))
+        output = io.BytesIO()
+        image.save(output, format="JPEG", quality=FRAME_JPEG_QUALITY)
+        return {
+            "data": output.getvalue(),
+            "hash": frame_hash,
+            "width": image.width,
+            "height": image.height,
+        }
+
+
+def deduplicate(frames: list, distance: int = DEDUPE_DISTANCE) -> list:
+    """Drop frames that look the same as the last kept frame."""
+    kept = []
+    for frame in frames:
+        if kept and frame["hash"] is not None and kept[-1]["hash"] is not None:
+            if hamming(frame["hash"], kept[-1]["hash"]) <= distance:
+                continue
+        kept.append(frame)
+    return kept
+
+
+def fit_budget(
+    frames: list,
+    max_frames: int = MAX_FRAMES,
+    byte_budget: int = FRAME_BYTE_BUDGET,
+    token_budget: int = FRAME_TOKEN_BUDGET
+) -> list:
+    """Keep an evenly spread subset (always the first and last frame) within the budgets."""
+    count = min(len(frames), max_frames)
+    while count > 1:
+        indexes = sorted({round(i * (len(frames) - 1) / (count - 1)) for i in range(count)})
+        subset = [frames[i] for i in indexes]
+        size = sum(len(frame["data"]) for frame in subset)
+        tokens = sum(estimate_image_tokens(frame["width"], frame["height"]) for frame in subset)
+        # Base64 adds a third on the wire
+        if size * 4 / 3 <= byte_budget and tokens <= token_budget:
+            return subset
+        count -= 1
+    return frames[:1]
+
+
+async def async_prepare_frames(hass: HomeAssistant, raw_frames: list) -> list:
+    """Preprocess frames in a bounded executor pool, then dedupe and budget them."""
+    async def run(raw: bytes):
+        async with _frame_workers:
+            try:
+                return await hass.async_add_executor_job(prepare_frame, raw)
+            except Exception as e:
+                _LOGGER.warning("NotifyAI - Skipping a frame that could not be decoded: %s", e)
+                return None
+
+    prepared = [frame for frame in await asyncio.gather(*(run(raw) for raw in raw_frames)) if frame]
+    unique = deduplicate(prepared)
+    selected = fit_budget(unique)
+    _LOGGER.debug(
+        "NotifyAI - Frames: %s in, %s after dedupe, %s sent",
+        len(raw_frames), len(unique), len(selected)
+    )
+    return selected
+
+
+async def async_extract_clip_frames(
+    hass: HomeAssistant,
+    clip_path: str,
+    frame_rate: float = DEFAULT_FRAME_RATE,
+    max_frames: int = MAX_FRAMES * 4
+) -> list:
+    """Sample JPEG frames from a video file with ffmpeg (piped, no temporary files)."""
+    try:
+        from homeassistant.components.ffmpeg import get_ffmpeg_manager
+        binary = get_ffmpeg_manager(hass).binary
+    except (ImportError, KeyError):
+        binary = "ffmpeg"
+
+    process = await asyncio.create_subprocess_exec(
+        binary, "-nostdin", "-loglevel", "error",
+        "-i", clip_path,
+        "-vf", f"fps={frame_rate},scale='min({MAX_FRAME_DIMENSION * 2},iw)':-2",
+        "-frames:v", str(max_frames),
+        "-f", "image2pipe", "-c:v", "mjpeg", "-q:v", "4", "-",
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), CLIP_TIMEOUT)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        raise
+    if process.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {stderr.decode(errors='ignore')[:200]}")
+    return split_jpeg_stream(stdout)
+
+
+def split_jpeg_stream(stream: bytes) -> list:
+    """Split concatenated JPEGs (ffmpeg image2pipe output) at their SOI/EOI markers.
+
+    Entropy-coded data stuffs every 0xFF byte, so 0xFFD9 only appears as an end marker.
+    """
+    frames = []
+    start = stream.find(b"\xff\xd8")
+    while start != -1:
+        end = stream.find(b"\xff\xd9", start + 2)
+        if end == -1:
+            break
+        frames.append(stream[start:end + 2])
+        start = stream.find(b"\xff\xd8", end + 2)
+    return frames
+
+
+async def async_camera_burst(
+    hass: HomeAssistant,
+    entity_id: str,
+    count: int,
+    frame_rate: float = DEFAULT_FRAME_RATE
+) -> list:
+    """Take `count` stills from a camera, 1/frame_rate seconds apart (in memory).
+
+    `count` comes from service data unchecked, so it is capped like clip sampling.
+    """
+    from homeassistant.components.camera import async_get_image
+
+    frames = []
+    interval = min(MAX_BURST_INTERVAL, 1 / frame_rate) if frame_rate > 0 else 1
+    for index in range(min(count, MAX_FRAMES * 4)):
+        if index:
+            await asyncio.sleep(interval)
+        image = await async_get_image(hass, entity_id, timeout=CAMERA_IMAGE_TIMEOUT)
+        frames.append(image.content)
+    return frames
@@ -0,0 +1,133 @@
+"""Image inputs for vision requests - files on disk, camera entities and multi-frame input."""
+import base64
+import logging
+import os
+
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+
+from .frames import (
+    CAMERA_IMAGE_TIMEOUT,
+    DEFAULT_FRAME_RATE,
+    async_camera_burst,
+    async_extract_clip_frames,
+    async_prepare_frames,
+)
+from .loop_monitor import loop_stage
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def has_image(data: dict) -> bool:
+    """Whether a call carries an image (file, camera, image list or clip)."""
+    return bool(
+        data.get("image_path")
+        or data.get("camera_entity")
+        or data.get("image_paths")
+        or data.get("clip_path")
+    )
+
+
+def is_multi_frame(data: dict) -> bool:
+    """Whether a call asks for several frames in one request."""
+    return bool(data.get("image_paths") or data.get("clip_path") or int(data.get("frames") or 1) > 1)
+
+
+def load_image_bytes(image_path: str) -> bytes:
+    """Read an image file."""
+    if not os.path.exists(image_path):
+        raise FileNotFoundError(f"Image not found at {image_path}")
+
+    with open(image_path, "rb") as f:
+        return f.read()
+
+
+def load_image_base64(image_path: str) -> str:
+    """Loads an image and converts to base64."""
+    return base64.b64encode(load_image_bytes(image_path)).decode('utf-8')
+
+
+async def async_camera_image_base64(hass: HomeAssistant, entity_id: str, width: int = None) -> dict:
+    """Fetch a still image from a camera entity in memory (no snapshot file).
+
+    With `width` the camera integration scales the JPEG down before we get it.
+    """
+    from homeassistant.components.camera import async_get_image
+
+    image = await async_get_image(hass, entity_id, timeout=CAMERA_IMAGE_TIMEOUT, width=width)
+    with loop_stage(hass, "camera_base64"):
+        encoded = base64.b64encode(image.content).decode("utf-8")
+    return {
+        "mime_type": image.content_type or "image/jpeg",
+        "data": encoded,
+    }
+
+
+async def async_load_images(hass: HomeAssistant, data: dict) -> list:
+    """Return the call's images as [{"mime_type", "data"}, ...] for the request payload.
+
+    A single image (camera_entity wins over image_path) is sent as is. Image
+    lists, clips and camera bursts are sampled, deduplicated, downscaled and
+    budgeted first. Failures are logged and the call goes on without them.
+    """
+    if is_multi_frame(data):
+        return await async_load_frames(hass, data)
+
+    camera_entity = data.get("camera_entity")
+    if camera_entity:
+        try:
+            return [await async_camera_image_base64(hass, camera_entity, data.get("image_width"))]
+        except HomeAssistantError as e:
+            _LOGGER.warning("Could not get image from %s: %s", camera_entity, e)
+            return []
+
+    image_path = data.get("image_path")
+    if image_path:
+        try:
+            return [{
+                "mime_type": "image/jpeg",
+                "data": await hass.async_add_executor_job(load_image_base64, image_path),
+            }]
+        except Exception as e:
+            _LOGGER.warning("Could not load image at %s: %s", image_path, e)
+    return []
+
+
+async def async_load_frames(hass: HomeAssistant, data: dict) -> list:
+    """Collect raw frames from every source of the call and prepare them for one request."""
+    frame_rate = float(data.get("frame_rate") or DEFAULT_FRAME_RATE)
+    raw_frames = []
+
+    camera_entity = data.get("camera_entity")
+    if camera_entity:
+        try:
+            raw_frames += await async_camera_burst(
+                hass, camera_entity, max(1, int(data.get("frames") or 1)), frame_rate
+            )
+        except HomeAssistantError as e:
+            _LOGGER.warning("Could not get images from %s: %s", camera_entity, e)
+
+    clip_path = data.get("clip_path")
+    if clip_path:
+        try:
+            raw_frames += await async_extract_clip_frames(hass, clip_path, frame_rate)
+        except Exception as e:
+            _LOGGER.warning("Could not sample frames from %s: %s", clip_path, e)
+
+    paths = list(data.get("image_paths") or [])
+    if data.get("image_path"):
+        paths.insert(0, data["image_path"])
+    for path in paths:
+        try:
+            raw_frames.append(await hass.async_add_executor_job(load_image_bytes, path))
+        except Exception as e:
+            _LOGGER.warning("Could not load image at %s: %s", path, e)
+
+    if not raw_frames:
+        return []
+    frames = await async_prepare_frames(hass, raw_frames)
+    with loop_stage(hass, "frames_base64"):
+        return [
+            {"mime_type": "image/jpeg", "data": base64.b64encode(frame["data"]).decode("utf-8")}
+            for frame in frames
+        ]
@@ -0,0 +1,115 @@
+"""Background generation jobs for NotifyAI (fire-and-forget mode)."""
+import asyncio
+import logging
+import time
+import uuid
+
+from homeassistant.core import HomeAssistant
+
+from .const import EVENT_GENERATED, EVENT_FAILED
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class JobTracker:
+    """Keep track of in-flight background jobs and report results on the event bus."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the tracker."""
+        self._hass = hass
+        self._jobs = {}
+        self.entry_stats = {}
+
+    def submit(self, entry_id: str, data: dict, runner) -> str:
+        """Start a job in the background and return its id immediately.
+
+        `runner` is a coroutine function returning the service response dict.
+        """
+        job_id = uuid.uuid4().hex[:12]
+        job = {
+            "job_id": job_id,
+            "entry_id": entry_id,
+            "event": data.get("event"),
+            "queued_at": time.monotonic(),
+            "task": None,
+        }
+        self._jobs[job_id] = job
+        job["task"] = self._hass.async_create_background_task(
+            self._async_run(job, runner), name=f"notifyai_job_{job_id}"
+        )
+        return job_id
+
+    async def _async_run(self, job: dict, runner) -> None:
+        """Run one job and fire notifyai_generated / notifyai_failed."""
+        started = time.monotonic()
+        stats = self.entry_stats.setdefault(job["entry_id"], {"completed": 0, "failed": 0})
+        try:
+            result = await runner()
+        except asyncio.CancelledError:
+            # Unload or shutdown: waiting automations still get an answer
+            _LOGGER.debug("NotifyAI - Background job %s was cancelled", job["job_id"])
+            self._fail(job, started, stats, "cancelled")
+            raise
+        except Exception as e:
+            _LOGGER.error("NotifyAI - Background job %s failed: %s", job["job_id"], e)
+            self._fail(job, started, stats, str(e))
+        else:
+            stats["completed"] += 1
+            timings = dict(result.get("timings", {}))
+            timings.update(self._timings(job, started))
+            self._hass.bus.async_fire(EVENT_GENERATED, {
+                **result,
+                "job_id": job["job_id"],
+                "event": job["event"],
+                "timings": timings,
+            })
+        finally:
+            self._jobs.pop(job["job_id"], None)
+
+    def _fail(self, job: dict, started: float, stats: dict, error: str) -> None:
+        stats["failed"] += 1
+        self._hass.bus.async_fire(EVENT_FAILED, {
+            "job_id": job["job_id"],
+            "entry_id": job["entry_id"],
+            "event": job["event"],
+            "error": error,
+            "timings": self._timings(job, started),
+        })
+
+    @staticmethod
+    def _timings(job: dict, started: float) -> dict:
+        now = time.monotonic()
+        return {
+            "queued_ms": round((started - job["queued_at"]) * 1000, 1),
+            "total_ms": round((now - job["queued_at"]) * 1000, 1),
+        }
+
+    def queue_depth(self, entry_id: str = None) -> int:
+        """Number of jobs in flight (optionally for one entry)."""
+        if entry_id is None:
+            return len(self._jobs)
+        return sum(1 for job in self._jobs.values() if job["entry_id"] == entry_id)
+
+    def async_cancel_entry(self, entry_id: str) -> None:
+        """Cancel in-flight jobs of an entry that is being unloaded."""
+        for job in list(self._jobs.values()):
+            if job["entry_id"] == entry_id and job["task"] is not None:
+                job["task"].cancel()
+
+    def as_dict(self, entry_id: str) -> dict:
+        """In-flight jobs and totals of an entry for sensor attributes."""
+        now = time.monotonic()
+        stats = self.entry_stats.get(entry_id, {"completed": 0, "failed": 0})
+        return {
+            "completed": stats["completed"],
+            "failed": stats["failed"],
+            "jobs": [
+                {
+                    "job_id": job["job_id"],
+                    "event": job["event"],
+                    "age_s": round(now - job["queued_at"], 1),
+                }
+                for job in self._jobs.values()
+                if job["entry_id"] == entry_id
+            ],
+        }
@@ -0,0 +1,240 @@
+"""API key pool for NotifyAI - spreads requests over several keys of one provider."""
+import logging
+import re
+import time
+from datetime import timedelta
+
+from homeassistant.util import dt as dt_util
+
+from .const import KEY_STRATEGY_LEAST_LOADED, KEY_STRATEGY_ROUND_ROBIN
+
+_LOGGER = logging.getLogger(__name__)
+
+# Cooldown applied to a key that returned 429 without telling us how long to wait
+DEFAULT_RATE_LIMIT_COOLDOWN = 60
+
+
+class RateLimitError(Exception):
+    """Raised when a provider answers with HTTP 429 for a key."""
+
+    def __init__(self, message: str, retry_after: float = None) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def parse_api_keys(value) -> list:
+    """Split a comma or newline separated key string into a list of unique keys."""
+    if not value:
+        return []
+    if isinstance(value, (list, tuple)):
+        raw = value
+    else:
+        raw = re.split(r"[,\n;\s]+", str(value))
+
+    keys = []
+    for key in raw:
+        key = key.strip()
+        if key and key not in keys:
+            keys.append(key)
+    return keys
+
+
+def mask_api_key(api_key: str) -> str:
+    """Mask API key for display (show first 3 and last 3 characters)."""
+    if not api_key or len(api_key) < 8:
+        return "***"
+    return f"{api_key[:3]}...{api_key[-3:]}"
+
+
+def parse_retry_after(headers, error_text: str = "") -> float:
+    """Extract the wait time in seconds from a 429 response, if present."""
+    retry_after = headers.get("retry-after") if headers else None
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+
+    # Gemini puts it into the error body: "retryDelay": "37s"
+    match = re.search(r'"retryDelay"\s*:\s*"(\d+(?:\.\d+)?)s"', error_text or "")
+    if match:
+        return float(match.group(1))
+    return None
+
+
+class ApiKeyPool:
+    """Round-robin / least-loaded rotation over a provider's API keys."""
+
+    def __init__(self, keys: list, strategy: str = KEY_STRATEGY_ROUND_ROBIN, next_reset=None) -> None:
+        """Initialize the pool.
+
+        `next_reset()` returns the provider's next daily quota reset (UTC); keys
+        that ran out of daily quota are parked until then.
+        """
+        self._keys = list(keys)
+        self._index = 0
+        self.strategy = strategy
+        self._next_reset = next_reset
+        self.key_stats = {key: self._empty_stats() for key in self._keys}
+
+    @staticmethod
+    def _empty_stats() -> dict:
+        return {
+            "requests": 0,
+            "errors": 0,
+            "rate_limited": 0,
+            "daily_count": 0,
+            "quota_data": {},
+            "cooldown_until": None,
+            "last_status": None,
+        }
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @property
+    def keys(self) -> list:
+        """Return the configured keys in rotation order."""
+        return list(self._keys)
+
+    def _seconds_until_reset(self) -> float:
+        """Seconds left until the daily quotas reset (local midnight if unknown)."""
+        now = dt_util.utcnow()
+        if self._next_reset is not None:
+            reset = self._next_reset()
+        else:
+            reset = dt_util.start_of_local_day() + timedelta(days=1)
+        return max(1.0, (reset - now).total_seconds())
+
+    def reset_daily(self) -> None:
+        """Clear the daily counters and daily-quota parking at the provider's reset."""
+        for stats in self.key_stats.values():
+            stats["daily_count"] = 0
+            if stats["quota_data"].get("rpd_remaining") == 0:
+                stats["quota_data"] = {}
+                stats["cooldown_until"] = None
+
+    def is_available(self, key: str) -> bool:
+        """Return True if the key is not cooling down after 429/exhaustion."""
+        stats = self.key_stats[key]
+        cooldown_until = stats["cooldown_until"]
+        if cooldown_until is None:
+            return True
+        if time.monotonic() >= cooldown_until:
+            stats["cooldown_until"] = None
+            return True
+        return False
+
+    def available_count(self) -> int:
+        """Number of keys that can take a request right now."""
+        return sum(1 for key in self._keys if self.is_available(key))
+
+    def acquire(self, exclude=()) -> str:
+        """Pick the next key to use, or None if every key is cooling down."""
+        candidates = [k for k in self._keys if k not in exclude and self.is_available(k)]
+        if not candidates:
+            return None
+
+        if self.strategy == KEY_STRATEGY_LEAST_LOADED:
+            return max(candidates, key=self._headroom)
+
+        # Round-robin: walk from the current position to the next usable key
+        for _ in range(len(self._keys)):
+            key = self._keys[self._index % len(self._keys)]
+            self._index = (self._index + 1) % len(self._keys)
+            if key in candidates:
+                return key
+        return candidates[0]
+
+    def _headroom(self, key: str) -> tuple:
+        """Sort key for least-loaded selection (more remaining quota wins)."""
+        stats = self.key_stats[key]
+        quota = stats["quota_data"]
+        rpm_remaining = quota.get("rpm_remaining", float("inf"))
+        rpd_remaining = quota.get("rpd_remaining", float("inf"))
+        return (min(rpm_remaining, rpd_remaining), -stats["daily_count"])
+
+    def report_success(self, key: str, quota_data: dict = None) -> None:
+        """Record a successful call and the key's latest quota headers."""
+        stats = self.key_stats.get(key)
+        if stats is None:
+            return
+        stats["requests"] += 1
+        stats["daily_count"] += 1
+        stats["last_status"] = "ok"
+        if quota_data:
+            stats["quota_data"] = dict(quota_data)
+            # Park the key until the daily reset once its quota is gone
+            if quota_data.get("rpd_remaining") == 0:
+                self._cool_down(key, self._seconds_until_reset())
+
+    def report_rate_limited(self, key: str, retry_after: float = None) -> None:
+        """Skip a key that returned 429 until its limit resets."""
+        stats = self.key_stats.get(key)
+        if stats is None:
+            return
+        stats["rate_limited"] += 1
+        stats["last_status"] = "rate_limited"
+        if retry_after is None:
+            if stats["quota_data"].get("rpd_remaining") == 0:
+                retry_after = self._seconds_until_reset()
+            else:
+                retry_after = DEFAULT_RATE_LIMIT_COOLDOWN
+        self._cool_down(key, retry_after)
+
+    def report_error(self, key: str) -> None:
+        """Record a non-quota failure for a key."""
+        stats = self.key_stats.get(key)
+        if stats is None:
+            return
+        stats["errors"] += 1
+        stats["last_status"] = "error"
+
+    def _cool_down(self, key: str, seconds: float) -> None:
+        self.key_stats[key]["cooldown_until"] = time.monotonic() + seconds
+        _LOGGER.info("NotifyAI - API key %s paused for %.0f seconds", mask_api_key(key), seconds)
+
+    def daily_count(self, key: str) -> int:
+        """Requests made with a key today (local count)."""
+        stats = self.key_stats.get(key)
+        if stats is None:
+            return 0
+        return stats["daily_count"]
+
+    def aggregate_quota(self) -> dict:
+        """Sum the per-key quota data into one entry-level view."""
+        aggregate = {}
+        for stats in self.key_stats.values():
+            for field in ("rpm_limit", "rpm_remaining", "rpd_limit", "rpd_remaining"):
+                if field in stats["quota_data"]:
+                    aggregate[field] = aggregate.get(field, 0) + stats["quota_data"][field]
+        if aggregate:
+            aggregate["last_updated"] = dt_util.now().isoformat()
+            aggregate["source"] = "api_headers" if len(self._keys) == 1 else "key_pool"
+        return aggregate
+
+    def as_dict(self) -> list:
+        """Per-key usage for sensor attributes (keys are masked)."""
+        now = time.monotonic()
+        result = []
+        for key in self._keys:
+            stats = self.key_stats[key]
+            available = self.is_available(key)
+            item = {
+                "key": mask_api_key(key),
+                "available": available,
+                "requests": stats["requests"],
+                "daily_count": stats["daily_count"],
+                "errors": stats["errors"],
+                "rate_limited": stats["rate_limited"],
+                "last_status": stats["last_status"],
+            }
+            for field in ("rpm_remaining", "rpd_remaining"):
+                if field in stats["quota_data"]:
+                    item[field] = stats["quota_data"][field]
+            if not available and stats["cooldown_until"] is not None:
+                item["available_at"] = (
+                    dt_util.now() + timedelta(seconds=stats["cooldown_until"] - now)
+                ).isoformat()
+            result.append(item)
+        return result
@@ -0,0 +1,145 @@
+"""Local notification templates - used when the AI provider can't answer in time."""
+import random
+import re
+from datetime import datetime
+
+# Body templates per language and mode. {event} and {time} are filled in.
+BODY_TEMPLATES = {
+    "tr": {
+        "fun": [
+            "{event}, haberin olsun! 😉",
+            "Son dakika: {event}! 🎉",
+            "{event} - kaçırma dedik! 👀",
+        ],
+        "smart": [
+            "{event}. Saat {time}.",
+            "Saat {time} itibarıyla: {event}.",
+            "{event} ({time}).",
+        ],
+        "formal": [
+            "Bilgilendirme: {event}. Saat {time}.",
+            "{event}. Kayıt saati: {time}.",
+        ],
+        "sert": [
+            "{event}, haberin olsun!",
+            "Bak şimdi: {event}!",
+            "{event}. Gereğini yap!",
+        ],
+    },
+    "en": {
+        "fun": [
+            "{event}, just so you know! 😉",
+            "Breaking news: {event}! 🎉",
+            "{event} - don't miss it! 👀",
+        ],
+        "smart": [
+            "{event}. Time: {time}.",
+            "As of {time}: {event}.",
+            "{event} ({time}).",
+        ],
+        "formal": [
+            "Notice: {event}. Time: {time}.",
+            "{event}. Recorded at {time}.",
+        ],
+        "sert": [
+            "{event}, heads up!",
+            "Listen: {event}!",
+            "{event}. Deal with it!",
+        ],
+    },
+}
+
+TITLE_PREFIXES = {
+    "tr": {
+        "fun": ["Hey! 👋", "Haber var!", "Bak bak!"],
+        "smart": ["Bilgi", "Güncelleme", "Durum"],
+        "formal": ["Bildirim", "Bilgilendirme"],
+        "sert": ["Dikkat!", "Hey!"],
+    },
+    "en": {
+        "fun": ["Hey! 👋", "News!", "Look!"],
+        "smart": ["Info", "Update", "Status"],
+        "formal": ["Notification", "Notice"],
+        "sert": ["Attention!", "Hey!"],
+    },
+}
+
+EMPTY_EVENT = {"tr": "Yeni bir olay var", "en": "Something happened"}
+
+# Language names (as configured or passed per call) and codes of the template sets
+LANGUAGE_ALIASES = {
+    "turkish": "tr", "türkçe": "tr", "turkce": "tr", "tr": "tr",
+    "english": "en", "ingilizce": "en", "en": "en",
+}
+DEFAULT_TEMPLATE_LANGUAGE = "tr"
+
+# Keep local titles within the prompt's "maximum 5 words" rule
+MAX_TITLE_WORDS = 5
+
+
+def template_language(language: str = None):
+    """Template set for a language name or code ("English", "en-US" ...), None if there is none."""
+    if not language:
+        return DEFAULT_TEMPLATE_LANGUAGE
+    name = language.strip().lower()
+    return LANGUAGE_ALIASES.get(name) or LANGUAGE_ALIASES.get(re.split(r"[-_ ]", name)[0])
+
+
+def _clean_event(event: str, language: str = DEFAULT_TEMPLATE_LANGUAGE) -> str:
+    """Strip trailing punctuation and extra whitespace from the event text."""
+    event = re.sub(r"\s+", " ", (event or "").strip())
+    return event.rstrip(".!?") or EMPTY_EVENT.get(language, "🔔")
+
+
+def _event_title(event: str) -> str:
+    """Build a short title from the event itself."""
+    words = event.split()
+    title = " ".join(words[:MAX_TITLE_WORDS])
+    if len(words) > MAX_TITLE_WORDS:
+        title += "…"
+    return title[:1].upper() + title[1:]
+
+
+def render_local_notification(
+    event: str,
+    mode: str = "smart",
+    persona: str = None,
+    context: str = None,
+    time: str = None,
+    language: str = None
+) -> tuple:
+    """Produce a (title, body) pair without any network access.
+
+    Languages without templates get a language-neutral notification built
+    from the event text itself.
+    """
+    templates = template_language(language)
+    event = _clean_event(event, templates)
+    time = time or datetime.now().strftime('%H:%M')
+
+    if templates is None:
+        body = f"{event} ({time})."
+        if context:
+            body = f"{body.rstrip('.')} - {context.strip().rstrip('.')}."
+        return _event_title(event), f"{persona}: {body}" if persona else body
+
+    body_templates = BODY_TEMPLATES[templates]
+    if mode not in body_templates:
+        # "mixed" (or anything unknown) picks a mode the same way the prompt does
+        mode = random.choice(list(body_templates))
+
+    body = random.choice(body_templates[mode]).format(event=event, time=time)
+
+    if context and mode in ("smart", "formal"):
+        body = f"{body.rstrip('.')} - {context.strip().rstrip('.')}."
+
+    # With a persona the event itself makes the better title
+    if persona:
+        title = _event_title(event)
+        body = f"{persona}: {body}"
+    elif len(event.split()) <= MAX_TITLE_WORDS:
+        title = _event_title(event)
+    else:
+        title = random.choice(TITLE_PREFIXES[templates][mode])
+
+    return title, body
@@ -0,0 +1,163 @@
+"""Optional event-loop lag watchdog and timing of synchronous in-loop steps."""
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+# How often the probe wakes up while NotifyAI work is running (seconds)
+PROBE_INTERVAL = 0.1
+
+RECENT_REPORTS = 20
+
+
+class LoopWatchdog:
+    """Measure how late the event loop wakes a probe while NotifyAI work runs.
+
+    The probe only runs while at least one phase (generate, deliver ...) is
+    active, so it costs nothing when idle. Synchronous steps wrapped in
+    `stage()` are timed directly; any step or lag above the threshold is
+    logged together with the phases and steps that were running, which is
+    what attributes a stall to NotifyAI (or rules it out).
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the watchdog (disabled until an entry turns it on)."""
+        self._hass = hass
+        self._settings = {}
+        self.enabled = False
+        self.threshold_ms = 0.0
+        self.max_lag_ms = 0.0
+        self.last_lag_ms = None
+        self.samples = 0
+        self.stages = {}
+        self.reports = deque(maxlen=RECENT_REPORTS)
+        self._active = {}
+        self._since_tick = []
+        self._probe = None
+
+    def configure(self, entry_id: str, enabled: bool, threshold_ms: float) -> None:
+        """Apply one entry's setting; the loop is shared, so any enabled entry turns it on."""
+        self._settings[entry_id] = (enabled, threshold_ms)
+        self._apply()
+
+    def remove(self, entry_id: str) -> None:
+        """Forget an unloaded entry's setting."""
+        self._settings.pop(entry_id, None)
+        self._apply()
+
+    def _apply(self) -> None:
+        thresholds = [threshold for enabled, threshold in self._settings.values() if enabled]
+        self.enabled = bool(thresholds)
+        self.threshold_ms = min(thresholds) if thresholds else 0.0
+
+    @contextmanager
+    def phase(self, name: str):
+        """Mark NotifyAI work as running (awaits allowed inside); the probe runs meanwhile."""
+        if not self.enabled:
+            yield
+            return
+        self._active[name] = self._active.get(name, 0) + 1
+        if self._probe is None or self._probe.done():
+            self._probe = self._hass.async_create_background_task(
+                self._async_probe(), name="notifyai_loop_watchdog"
+            )
+        try:
+            yield
+        finally:
+            self._active[name] -= 1
+            if not self._active[name]:
+                del self._active[name]
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a synchronous step that runs in the event loop (no awaits inside)."""
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            stats = self.stages.setdefault(name, {"count": 0, "slow": 0, "total_ms": 0.0, "max_ms": 0.0})
+            stats["count"] += 1
+            stats["total_ms"] += elapsed_ms
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+            self._since_tick.append((name, elapsed_ms))
+            if elapsed_ms >= self.threshold_ms:
+                stats["slow"] += 1
+                self._report("slow_step", elapsed_ms, [name])
+                _LOGGER.warning(
+                    "NotifyAI - Step '%s' blocked the event loop for %.0f ms", name, elapsed_ms
+                )
+
+    async def _async_probe(self) -> None:
+        loop = asyncio.get_running_loop()
+        while self._active and self.enabled:
+            self._since_tick = []
+            expected = loop.time() + PROBE_INTERVAL
+            await asyncio.sleep(PROBE_INTERVAL)
+            lag_ms = max(0.0, (loop.time() - expected) * 1000)
+            self.samples += 1
+            self.last_lag_ms = round(lag_ms, 1)
+            self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+            if lag_ms >= self.threshold_ms:
+                # Steps timed during the late tick are the prime suspects
+                suspects = [f"{name} ({elapsed_ms:.0f} ms)" for name, elapsed_ms in self._since_tick]
+                self._report("lag", lag_ms, suspects)
+                _LOGGER.warning(
+                    "NotifyAI - Event loop lagged %.0f ms while running %s; NotifyAI steps in that window: %s",
+                    lag_ms, ", ".join(sorted(self._active)) or "-", ", ".join(suspects) or "none"
+                )
+
+    def _report(self, kind: str, elapsed_ms: float, stages: list) -> None:
+        self.reports.append({
+            "at": time.time(),
+            "kind": kind,
+            "ms": round(elapsed_ms, 1),
+            "phases": sorted(self._active),
+            "stages": stages,
+        })
+
+    def as_dict(self) -> dict:
+        """Watchdog statistics for sensor attributes and diagnostics."""
+        return {
+            "enabled": self.enabled,
+            "threshold_ms": self.threshold_ms,
+            "max_lag_ms": round(self.max_lag_ms, 1),
+            "last_lag_ms": self.last_lag_ms,
+            "samples": self.samples,
+            "stages": {
+                name: {
+                    "count": stats["count"],
+                    "slow": stats["slow"],
+                    "mean_ms": round(stats["total_ms"] / stats["count"], 2),
+                    "max_ms": round(stats["max_ms"], 1),
+                }
+                for name, stats in self.stages.items()
+            },
+            "recent_reports": list(self.reports),
+        }
+
+
+def loop_stage(hass: HomeAssistant, name: str):
+    """`with loop_stage(hass, "...")` times a synchronous step when the watchdog is on."""
+    watchdog = hass.data.get(DOMAIN, {}).get("loop_watchdog")
+    if watchdog is None or not watchdog.enabled:
+        return nullcontext()
+    return watchdog.stage(name)
+
+
+def loop_phase(hass: HomeAssistant, name: str):
+    """`with loop_phase(hass, "...")` keeps the lag probe running around async NotifyAI work."""
+    watchdog = hass.data.get(DOMAIN, {}).get("loop_watchdog")
+    if watchdog is None or not watchdog.enabled:
+        return nullcontext()
+    return watchdog.phase(name)
@@ -0,0 +1,193 @@
+"""Quota-aware model selection - step down the model ladder before a quota runs out."""
+import logging
+import math
+import time
+
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from .const import MODEL_LADDERS
+from .router import model_daily_limit, model_minute_limit
+
+_LOGGER = logging.getLogger(__name__)
+
+# Demand is measured over the last minute and this longer window to project the burn rate
+BURN_RATE_WINDOW = 3600
+
+# A model is left once its remaining quota would last less than this many seconds
+RESERVE_LOOKAHEAD = 600
+
+# Never run a stepped-from model below this many requests
+MIN_RESERVE = 2
+
+# Pause after a model returned 429 without a retry delay, or ran out of RPM
+DEFAULT_MODEL_COOLDOWN = 60
+
+
+class ModelPolicy:
+    """Pick the best model of an entry whose daily/minute quota can still carry the load.
+
+    The configured model is the ceiling; lower rungs are the higher-quota models
+    of the same provider from MODEL_LADDERS. Request counts come from the entry's
+    UsageTracker; once the provider's day resets (or a 429 pause ends) the
+    configured model is used again.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        provider: str,
+        preferred_model: str,
+        usage,
+        enabled: bool = True,
+        breakers=None
+    ) -> None:
+        """Initialize the policy; models with an open circuit breaker are skipped."""
+        self._hass = hass
+        self._usage = usage
+        self._breakers = breakers
+        self.provider = provider
+        self.preferred_model = preferred_model
+        self.enabled = enabled
+        self.ladder = self._build_ladder(provider, preferred_model) if enabled else [preferred_model]
+        self.active_model = preferred_model
+        self.switches = 0
+        self.last_switch = None
+        self._models = {}
+        usage.add_reset_listener(self.reset_daily)
+
+    def configure(self, preferred_model: str, enabled: bool) -> None:
+        """Switch the preferred model or auto switching; per-model quota state is kept."""
+        if preferred_model != self.preferred_model:
+            self.active_model = preferred_model
+        self.preferred_model = preferred_model
+        self.enabled = enabled
+        self.ladder = self._build_ladder(self.provider, preferred_model) if enabled else [preferred_model]
+        if len(self.ladder) == 1:
+            self.active_model = preferred_model
+
+    def _build_ladder(self, provider: str, preferred_model: str) -> list:
+        """The preferred model followed by the catalog models with at least its daily quota."""
+        catalog = MODEL_LADDERS.get(provider, [])
+        if preferred_model in catalog:
+            return catalog[catalog.index(preferred_model):]
+        preferred_limit = model_daily_limit(self._hass, provider, preferred_model)
+        return [preferred_model] + [
+            model for model in catalog
+            if model_daily_limit(self._hass, provider, model) >= preferred_limit
+        ]
+
+    def _state(self, model: str) -> dict:
+        state = self._models.get(model)
+        if state is None:
+            state = self._models[model] = {"rpd_remaining": None, "blocked_until": None}
+        return state
+
+    def reset_daily(self) -> None:
+        """Forget header-reported daily quotas at the provider's reset."""
+        for state in self._models.values():
+            state["rpd_remaining"] = None
+
+    def burn_rate(self) -> float:
+        """Requests per second (all models together), the higher of last minute and last hour."""
+        return max(
+            self._usage.minute_count() / 60,
+            self._usage.recent_count(BURN_RATE_WINDOW) / BURN_RATE_WINDOW
+        )
+
+    def remaining(self, model: str) -> int:
+        """Requests left today on a model (API headers when known, else local count)."""
+        state = self._state(model)
+        if state["rpd_remaining"] is not None:
+            return state["rpd_remaining"]
+        daily_limit = model_daily_limit(self._hass, self.provider, model)
+        return max(0, daily_limit - self._usage.day_count(model))
+
+    def reserve(self) -> int:
+        """Requests a model must keep to carry the projected load for the lookahead window."""
+        return max(MIN_RESERVE, math.ceil(self.burn_rate() * RESERVE_LOOKAHEAD))
+
+    def _blocked(self, model: str) -> bool:
+        if self._breakers is not None and self._breakers.is_open(model):
+            return True
+        # Sliding 60 s window against the model's RPM limit
+        minute_limit = model_minute_limit(self._hass, self.provider, model)
+        if minute_limit and self._usage.minute_count(model) >= minute_limit:
+            return True
+        blocked_until = self._state(model)["blocked_until"]
+        return blocked_until is not None and time.monotonic() < blocked_until
+
+    def select(self) -> str:
+        """Return the model the next request should use."""
+        if len(self.ladder) == 1:
+            # A stale fallback rung must not linger in responses and the sensor
+            self.active_model = self.preferred_model
+            return self.preferred_model
+
+        reserve = self.reserve()
+        usable = [model for model in self.ladder if not self._blocked(model)]
+        # Highest rung that keeps its reserve; the last rung may be drained completely
+        model = next(
+            (m for m in usable if self.remaining(m) > (reserve if m != self.ladder[-1] else 0)),
+            None
+        )
+        if model is None:
+            model = next((m for m in usable if self.remaining(m) > 0), self.ladder[-1])
+
+        if model != self.active_model:
+            self._switch(model, reserve)
+        return model
+
+    def _switch(self, model: str, reserve: int) -> None:
+        previous = self.active_model
+        direction = "down" if self.ladder.index(model) > self.ladder.index(previous) else "up"
+        self.active_model = model
+        self.switches += 1
+        self.last_switch = {
+            "from": previous,
+            "to": model,
+            "direction": direction,
+            "remaining": self.remaining(previous),
+            "reserve": reserve,
+            "at": dt_util.now().isoformat(),
+        }
+        _LOGGER.info(
+            "NotifyAI - Switched model %s -> %s (%s, %s left, reserve %s)",
+            previous, model, direction, self.remaining(previous), reserve
+        )
+
+    def report_success(self, model: str, quota_data: dict = None) -> None:
+        """Record the model's latest quota headers after a completed request."""
+        state = self._state(model)
+        if quota_data and "rpd_remaining" in quota_data:
+            state["rpd_remaining"] = quota_data["rpd_remaining"]
+        elif state["rpd_remaining"] is not None:
+            state["rpd_remaining"] = max(0, state["rpd_remaining"] - 1)
+        if quota_data and quota_data.get("rpm_remaining") == 0:
+            state["blocked_until"] = time.monotonic() + DEFAULT_MODEL_COOLDOWN
+
+    def report_rate_limited(self, model: str, retry_after: float = None) -> None:
+        """Skip a model that returned 429 until its limit resets."""
+        self._state(model)["blocked_until"] = time.monotonic() + (retry_after or DEFAULT_MODEL_COOLDOWN)
+
+    def as_dict(self) -> dict:
+        """Ladder state for sensor attributes."""
+        now = time.monotonic()
+        return {
+            "enabled": self.enabled,
+            "preferred_model": self.preferred_model,
+            "active_model": self.active_model,
+            "switches": self.switches,
+            "last_switch": self.last_switch,
+            "burn_rate_per_hour": round(self.burn_rate() * 3600, 1),
+            "reserve": self.reserve(),
+            "ladder": [
+                {
+                    "model": model,
+                    "remaining": self.remaining(model),
+                    "blocked_s": round(max(0.0, (self._state(model)["blocked_until"] or now) - now)),
+                    "circuit": self._breakers.state(model) if self._breakers is not None else None,
+                }
+                for model in self.ladder
+            ],
+        }
@@ -0,0 +1,51 @@
+"""OpenAI-compatible servers (llama.cpp, Ollama, vLLM, LM Studio ...) - URLs and model discovery."""
+import logging
+
+import aiohttp
+
+from .const import CONF_BASE_URL, PROVIDER_BASE_URLS
+
+_LOGGER = logging.getLogger(__name__)
+
+# Stands for "no key" in the key pool of servers that run without authentication
+NO_API_KEY = "sk-no-key-required"
+
+MODEL_DISCOVERY_TIMEOUT = 10
+
+
+def normalize_base_url(url: str) -> str:
+    """Accept "http://host:11434", ".../v1" or ".../v1/" alike; paths are appended to the root."""
+    url = (url or "").strip().rstrip("/")
+    if url.endswith("/v1"):
+        url = url[:-3]
+    return url
+
+
+def entry_base_url(provider: str, data: dict, options: dict) -> str:
+    """API root of an entry: the options override, then the configured server, then the provider default."""
+    return normalize_base_url(
+        options.get(CONF_BASE_URL) or data.get(CONF_BASE_URL) or PROVIDER_BASE_URLS[provider]
+    )
+
+
+def auth_headers(api_key: str) -> dict:
+    """Request headers for an OpenAI-style endpoint; without a key no Authorization is sent."""
+    headers = {"Content-Type": "application/json"}
+    if api_key and api_key != NO_API_KEY:
+        headers["Authorization"] = f"Bearer {api_key}"
+    return headers
+
+
+async def async_fetch_models(session: aiohttp.ClientSession, base_url: str, api_key: str = None) -> list:
+    """Return the model ids a server offers (GET /v1/models); raises on connection or HTTP errors."""
+    async with session.get(
+        f"{normalize_base_url(base_url)}/v1/models",
+        headers=auth_headers(api_key),
+        timeout=aiohttp.ClientTimeout(total=MODEL_DISCOVERY_TIMEOUT)
+    ) as response:
+        response.raise_for_status()
+        data = await response.json(content_type=None)
+
+    # OpenAI shape is {"data": [{"id": ...}]}; some servers return a bare list
+    items = data.get("data", []) if isinstance(data, dict) else data
+    return [item["id"] for item in items if isinstance(item, dict) and item.get("id")]
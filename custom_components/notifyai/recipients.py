@@ -0,0 +1,62 @@
+"""Several recipients (language, mode, persona, targets) served by one structured request."""
+from homeassistant.exceptions import HomeAssistantError
+
+# Appended to the system prompt when one event is written for several recipients
+RECIPIENTS_SYSTEM_PROMPT = """
+
+MULTIPLE RECIPIENTS (overrides LANGUAGE, STYLE MODES and OUTPUT FORMAT):
+- The user message describes ONE event and a numbered list of recipients.
+- Write one notification per recipient, in that recipient's Language and Mode (and Persona, if given), following all other rules above.
+- Return ONLY a JSON array with exactly {count} objects, in the same order as the recipients:
+[{{"title": "<title 1>", "body": "<body 1>"}}, ...]"""
+
+# Upper bound of recipients in one request (and one structured answer)
+MAX_RECIPIENTS = 10
+
+# Profile keys: how the text is written / where it goes
+PROFILE_FIELDS = ("language", "mode", "persona")
+TARGET_FIELDS = ("notify_service", "audio_device", "tts_service", "tts_language")
+
+
+def normalize_recipients(value) -> list:
+    """Validate the recipients field; raises HomeAssistantError with a readable message."""
+    if not isinstance(value, list) or not value or not all(isinstance(item, dict) for item in value):
+        raise HomeAssistantError("recipients must be a non-empty list of objects")
+    if len(value) > MAX_RECIPIENTS:
+        raise HomeAssistantError(f"At most {MAX_RECIPIENTS} recipients per call")
+    return [
+        {key: item[key] for key in PROFILE_FIELDS + TARGET_FIELDS + ("name",) if item.get(key)}
+        for item in value
+    ]
+
+
+def build_recipients_prompt(data: dict, recipients: list, time: str, default_language: str) -> str:
+    """Build the user message: the event once, then one line per recipient profile."""
+    lines = [f"Event: {data.get('event')}", f"Time: {time}"]
+    if data.get("context"):
+        lines.append(f"Context: {data['context']}")
+    lines.append("Recipients:")
+    for number, recipient in enumerate(recipients, 1):
+        profile = [
+            f"Language: {recipient.get('language') or default_language}",
+            f"Mode: {recipient.get('mode') or data.get('mode', 'smart')}",
+        ]
+        persona = recipient.get("persona") or data.get("persona")
+        if persona:
+            profile.append(f"Persona: {persona}")
+        lines.append(f"{number}. " + "; ".join(profile))
+    return "\n".join(lines)
+
+
+def recipient_call_data(data: dict, recipient: dict) -> dict:
+    """The single-call data of one recipient (used for delivery and one-by-one fallback)."""
+    call_data = {key: value for key, value in data.items() if key != "recipients"}
+    for key in ("mode", "persona", "notify_service", "audio_device", "tts_service"):
+        if recipient.get(key):
+            call_data[key] = recipient[key]
+    # `language` of a generate call is the TTS language; the caller's applies unless overridden
+    if recipient.get("tts_language"):
+        call_data["language"] = recipient["tts_language"]
+    if recipient.get("language"):
+        call_data["output_language"] = recipient["language"]
+    return call_data
@@ -0,0 +1,82 @@
+"""Anti-repetition check against recently delivered notifications of the same event."""
+from collections import OrderedDict, deque
+
+from .similarity import jaccard, shingles
+
+# Upper bound of events that keep a delivery history
+MAX_HISTORY_EVENTS = 512
+
+
+class RepetitionGuard:
+    """Bounded LRU of the last few delivered (title, body) pairs per event key.
+
+    Bodies are compared by word unigram/bigram overlap (Jaccard), so a check is a
+    handful of small set operations and memory is capped at
+    MAX_HISTORY_EVENTS * history entries.
+    """
+
+    def __init__(self, threshold: float = 0.0, history: int = 10) -> None:
+        """Initialize the guard; a threshold of 0 disables it."""
+        self.threshold = threshold
+        self.history = history
+        self._events = OrderedDict()
+        self.checks = 0
+        self.repeats = 0
+        self.replaced = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold > 0 and self.history > 0
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._events.values())
+
+    def score(self, key: tuple, body: str) -> float:
+        """Highest overlap of a body with the event's recent deliveries (0..1)."""
+        entries = self._events.get(key)
+        if not entries:
+            return 0.0
+        candidate = shingles(body)
+        return max(jaccard(candidate, sent) for _, sent in entries)
+
+    def is_repeat(self, key: tuple, body: str, count: bool = True) -> bool:
+        """True if the body is too close to something recently sent for this event.
+
+        Alternatives are checked with count=False so the counters reflect calls.
+        """
+        if not self.enabled:
+            return False
+        repeat = self.score(key, body) >= self.threshold
+        if count:
+            self.checks += 1
+            self.repeats += repeat
+        return repeat
+
+    def remember(self, key: tuple, title: str, body: str) -> None:
+        """Record a delivered notification."""
+        if not self.enabled:
+            return
+        entries = self._events.get(key)
+        if entries is None:
+            entries = self._events[key] = deque(maxlen=self.history)
+        entries.append((title, shingles(body)))
+        self._events.move_to_end(key)
+        while len(self._events) > MAX_HISTORY_EVENTS:
+            self._events.popitem(last=False)
+
+    def resize(self, history: int) -> None:
+        """Change how many deliveries are kept per event, trimming the oldest ones."""
+        self.history = history
+        for key, entries in self._events.items():
+            self._events[key] = deque(entries, maxlen=max(1, history))
+
+    def as_dict(self) -> dict:
+        """Counters for sensor attributes."""
+        return {
+            "threshold": self.threshold,
+            "events": len(self._events),
+            "entries": len(self),
+            "checks": self.checks,
+            "repeats": self.repeats,
+            "replaced": self.replaced,
+        }
@@ -0,0 +1,171 @@
+"""Offline replay of recorded generate traffic against a local stand-in provider."""
+import asyncio
+import json
+import logging
+import re
+import time
+
+from aiohttp import web
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_REPLAY_CONCURRENCY = 16
+DEFAULT_STANDIN_LATENCY_MS = 300
+
+# Answers that never needed a provider request
+SAVED_SOURCES = ("variant", "similar", "suppressed")
+
+# Inputs that make no sense offline (images) or would change what is measured
+REPLAY_DROPPED_FIELDS = ("background",)
+
+_ARRAY_REQUEST = re.compile(r"JSON array with (?:exactly )?(\d+) objects")
+
+# Rotating wording so repeated events don't all look identical to the repetition check
+_STANDIN_PHRASES = (
+    "{event}.",
+    "Bilgi: {event}.",
+    "Az önce: {event}.",
+    "{event}, haberiniz olsun.",
+    "Durum güncellemesi - {event}.",
+)
+
+
+class StandInProvider:
+    """Minimal Gemini/Groq look-alike on 127.0.0.1 with a fixed response latency.
+
+    Serves generateContent and chat/completions, answers single, variant and
+    packed prompts in the shape the integration expects and counts requests.
+    """
+
+    def __init__(self, latency_ms: float = DEFAULT_STANDIN_LATENCY_MS) -> None:
+        """Initialize the stand-in."""
+        self.latency = max(0.0, latency_ms) / 1000
+        self.requests = 0
+        self.base_url = None
+        self._runner = None
+        self._sequence = 0
+
+    async def async_start(self) -> str:
+        """Listen on a free local port and return the base URL."""
+        app = web.Application()
+        app.router.add_post("/v1beta/models/{model}", self._handle_gemini)
+        app.router.add_post("/v1/chat/completions", self._handle_openai)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        host, port = self._runner.addresses[0][:2]
+        self.base_url = f"http://{host}:{port}"
+        return self.base_url
+
+    async def async_stop(self) -> None:
+        """Shut the server down."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def _answer(self, system_prompt: str, user_text: str) -> str:
+        """Build a plausible answer from the Event lines of the prompt."""
+        events = re.findall(r"^Event: (.*)$", user_text, re.MULTILINE) or ["Bildirim"]
+        match = _ARRAY_REQUEST.search(system_prompt)
+        if match:
+            count = int(match.group(1))
+            # Packed prompts carry one event per item, variant prompts one event for all
+            items = events if len(events) == count else [events[0]] * count
+            return json.dumps([self._notification(event) for event in items], ensure_ascii=False)
+        return json.dumps(self._notification(events[0]), ensure_ascii=False)
+
+    def _notification(self, event: str) -> dict:
+        self._sequence += 1
+        phrase = _STANDIN_PHRASES[self._sequence % len(_STANDIN_PHRASES)]
+        return {"title": "NotifyAI", "body": phrase.format(event=event.strip())}
+
+    async def _handle_gemini(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        payload = await request.json()
+        await asyncio.sleep(self.latency)
+        system_prompt = payload.get("system_instruction", {}).get("parts", [{}])[0].get("text", "")
+        user_text = payload.get("contents", [{}])[0].get("parts", [{}])[0].get("text", "")
+        return web.json_response({
+            "candidates": [{"content": {"parts": [{"text": self._answer(system_prompt, user_text)}]}}]
+        })
+
+    async def _handle_openai(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        payload = await request.json()
+        await asyncio.sleep(self.latency)
+        messages = {message.get("role"): message.get("content", "") for message in payload.get("messages", [])}
+        return web.json_response({
+            "choices": [{"message": {"content": self._answer(messages.get("system", ""), messages.get("user", ""))}}]
+        })
+
+
+def percentile(values: list, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, round(fraction * len(values) + 0.5) - 1))
+    return round(values[index], 1)
+
+
+async def async_replay(
+    records: list,
+    handler,
+    speed: float = 1.0,
+    concurrency: int = DEFAULT_REPLAY_CONCURRENCY
+) -> dict:
+    """Re-issue recorded calls through `handler(data)` and measure them.
+
+    speed 1 keeps the recorded spacing, N plays it N times faster and 0 sends
+    everything as fast as `concurrency` allows.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    latencies = []
+    by_source = {}
+    failed = 0
+    first_ts = records[0].get("ts", 0) if records else 0
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+
+    async def run(record: dict) -> None:
+        nonlocal failed
+        if speed > 0:
+            delay = (record.get("ts", first_ts) - first_ts) / speed
+            await asyncio.sleep(max(0.0, started + delay - loop.time()))
+        data = {key: value for key, value in record.get("in", {}).items() if key not in REPLAY_DROPPED_FIELDS}
+        if not data.get("event"):
+            return
+        async with semaphore:
+            call_started = time.monotonic()
+            try:
+                response = await handler(data)
+            except Exception as e:
+                _LOGGER.debug("NotifyAI - Replayed call failed: %s", e)
+                failed += 1
+                return
+            latencies.append((time.monotonic() - call_started) * 1000)
+        source = response.get("source") or response.get("status", "ok")
+        by_source[source] = by_source.get(source, 0) + 1
+
+    await asyncio.gather(*(run(record) for record in records))
+    duration = loop.time() - started
+    latencies.sort()
+    completed = len(latencies)
+
+    return {
+        "calls": completed + failed,
+        "succeeded": completed,
+        "failed": failed,
+        "duration_s": round(duration, 2),
+        "throughput_per_s": round(completed / duration, 2) if duration > 0 else 0.0,
+        "latency_ms": {
+            "p50": percentile(latencies, 0.50),
+            "p90": percentile(latencies, 0.90),
+            "p99": percentile(latencies, 0.99),
+            "max": round(latencies[-1], 1) if latencies else 0.0,
+            "mean": round(sum(latencies) / completed, 1) if completed else 0.0,
+        },
+        "by_source": by_source,
+        "provider_calls_saved": sum(by_source.get(source, 0) for source in SAVED_SOURCES),
+        "recorded_provider_calls": sum(1 for record in records if record.get("source") == "ai"),
+    }
@@ -0,0 +1,178 @@
+"""Route NotifyAI service calls across the loaded config entries."""
+import logging
+from bisect import bisect_left
+from collections import deque
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    DOMAIN,
+    CONF_AI_PROVIDER,
+    CONF_MODEL,
+    MODEL_LIMITS_FALLBACK,
+    GROQ_MODEL_LIMITS,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# Weight of the newest sample in the latency moving average
+LATENCY_EWMA_ALPHA = 0.3
+
+# Latency assumed for entries that have not been measured yet, so they get tried
+UNMEASURED_LATENCY_MS = 0
+
+# Upper bounds (ms) of the latency histogram buckets; slower calls land in the last "+inf" bucket
+LATENCY_BUCKETS_MS = (250, 500, 1000, 2000, 5000, 10000, 30000)
+
+# Failed provider calls kept per entry for diagnostics
+RECENT_ERRORS = 20
+
+
+def async_loaded_entries(hass: HomeAssistant) -> list:
+    """Return the NotifyAI config entries that are currently set up."""
+    domain_data = hass.data.get(DOMAIN, {})
+    return [
+        entry for entry in hass.config_entries.async_entries(DOMAIN)
+        if entry.entry_id in domain_data
+    ]
+
+
+def record_latency(entry_data: dict, latency_ms: float) -> None:
+    """Fold a provider round trip into the entry's latency average and histogram."""
+    latency = entry_data.setdefault("latency", {"ewma_ms": None, "last_ms": None, "samples": 0})
+    histogram = latency.setdefault("histogram", [0] * (len(LATENCY_BUCKETS_MS) + 1))
+    histogram[bisect_left(LATENCY_BUCKETS_MS, latency_ms)] += 1
+    if latency["ewma_ms"] is None:
+        latency["ewma_ms"] = latency_ms
+    else:
+        latency["ewma_ms"] += LATENCY_EWMA_ALPHA * (latency_ms - latency["ewma_ms"])
+    latency["last_ms"] = round(latency_ms, 1)
+    latency["samples"] += 1
+
+
+def record_error(entry_data: dict, error: Exception, model_name: str = None) -> None:
+    """Remember the class of a failed provider call (only the last few are kept)."""
+    errors = entry_data.setdefault("recent_errors", deque(maxlen=RECENT_ERRORS))
+    errors.append({
+        "at": dt_util.now().isoformat(),
+        "error": type(error).__name__,
+        "status": getattr(error, "status", None),
+        "model": model_name,
+    })
+
+
+def model_daily_limit(hass: HomeAssistant, provider: str, model_name: str) -> int:
+    """Daily request limit of a model, from API-fetched limits or static tables (0 = unlimited)."""
+    if provider == "local":
+        return 0
+    if provider == "groq":
+        return GROQ_MODEL_LIMITS.get(model_name, {}).get("rpd", 14400)
+
+    model_limits = hass.data.get(DOMAIN, {}).get("model_limits", {})
+    if model_name in model_limits:
+        return model_limits[model_name].get("rpd", 1500)
+    return MODEL_LIMITS_FALLBACK.get(model_name, {}).get("rpd", 1500)
+
+
+def model_minute_limit(hass: HomeAssistant, provider: str, model_name: str) -> int:
+    """Per-minute request limit of a model, from API-fetched limits or static tables (0 = unlimited)."""
+    if provider == "local":
+        return 0
+    if provider == "groq":
+        return GROQ_MODEL_LIMITS.get(model_name, {}).get("rpm", 30)
+
+    model_limits = hass.data.get(DOMAIN, {}).get("model_limits", {})
+    if model_name in model_limits:
+        return model_limits[model_name].get("rpm", 15)
+    return MODEL_LIMITS_FALLBACK.get(model_name, {}).get("rpm", 15)
+
+
+def remaining_quota_ratio(hass: HomeAssistant, entry_id: str) -> float:
+    """Fraction of the entry's daily quota that is still available (0..1)."""
+    entry_data = hass.data[DOMAIN][entry_id]
+    quota_data = entry_data.get("quota_data", {})
+
+    if quota_data.get("rpd_limit") and "rpd_remaining" in quota_data:
+        return max(0.0, min(1.0, quota_data["rpd_remaining"] / quota_data["rpd_limit"]))
+
+    daily_limit = model_daily_limit(
+        hass, entry_data.get(CONF_AI_PROVIDER, "gemini"), entry_data.get(CONF_MODEL)
+    )
+    usage = entry_data.get("usage")
+    daily_count = usage.day_count() if usage is not None else 0
+    if not daily_limit:
+        return 1.0
+    return max(0.0, 1 - daily_count / daily_limit)
+
+
+def remaining_requests(hass: HomeAssistant, entry_id: str):
+    """Requests left today on the entry's model (None when the provider has no quota)."""
+    entry_data = hass.data[DOMAIN][entry_id]
+    quota_data = entry_data.get("quota_data", {})
+    if "rpd_remaining" in quota_data:
+        return quota_data["rpd_remaining"]
+
+    daily_limit = model_daily_limit(
+        hass, entry_data.get(CONF_AI_PROVIDER, "gemini"), entry_data.get(CONF_MODEL)
+    )
+    if not daily_limit:
+        return None
+    usage = entry_data.get("usage")
+    return max(0, daily_limit - (usage.day_count() if usage is not None else 0))
+
+
+def entry_score(hass: HomeAssistant, entry_id: str) -> float:
+    """Higher is better: plenty of quota left and fast recent responses."""
+    entry_data = hass.data[DOMAIN][entry_id]
+
+    key_pool = entry_data.get("key_pool")
+    if key_pool is not None and key_pool.available_count() == 0:
+        return 0.0
+
+    # Skip entries whose every model is behind an open circuit breaker
+    breakers = entry_data.get("breakers")
+    model_policy = entry_data.get("model_policy")
+    if breakers is not None and model_policy is not None:
+        if all(breakers.is_open(model) for model in model_policy.ladder):
+            return 0.0
+
+    latency_ms = entry_data.get("latency", {}).get("ewma_ms")
+    if latency_ms is None:
+        latency_ms = UNMEASURED_LATENCY_MS
+
+    return remaining_quota_ratio(hass, entry_id) / (1 + latency_ms / 1000)
+
+
+def async_select_entry(hass: HomeAssistant, entry_id: str = None) -> ConfigEntry:
+    """Pick the entry that should handle a call.
+
+    An explicit entry_id always wins; otherwise the loaded entry with the best
+    quota/latency score is used.
+    """
+    entries = async_loaded_entries(hass)
+
+    if entry_id:
+        for entry in entries:
+            if entry.entry_id == entry_id:
+                return entry
+        raise HomeAssistantError(f"NotifyAI entry {entry_id} is not loaded")
+
+    if not entries:
+        raise HomeAssistantError("No NotifyAI entry is loaded")
+
+    if len(entries) == 1:
+        return entries[0]
+
+    best = max(entries, key=lambda entry: entry_score(hass, entry.entry_id))
+    _LOGGER.debug("NotifyAI - Routed call to %s (%s)", best.title, best.entry_id)
+    return best
+
+
+def latency_histogram(entry_data: dict) -> dict:
+    """The entry's latency histogram as {"<=250ms": n, ..., "+inf": n}."""
+    histogram = entry_data.get("latency", {}).get("histogram") or [0] * (len(LATENCY_BUCKETS_MS) + 1)
+    labels = [f"<={bound}ms" for bound in LATENCY_BUCKETS_MS] + ["+inf"]
+    return dict(zip(labels, histogram))
@@ -1,13 +1,11 @@
 """Sensor platform for NotifyAI integration."""
 import logging
-from datetime import datetime, timedelta
-from homeassistant.components.sensor import SensorEntity, SensorStateClass
+from homeassistant.components.sensor import SensorDeviceClass, SensorEntity, SensorStateClass
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.util import dt as dt_util
 
-from .const import DOMAIN, CONF_MODEL, MODEL_LIMITS_FALLBACK, CONF_AI_PROVIDER, GROQ_MODEL_LIMITS
+from .const import DOMAIN, CONF_MODEL, MODEL_LIMITS_FALLBACK, CONF_AI_PROVIDER, GROQ_MODEL_LIMITS, PROVIDER_DISPLAY_NAMES
 
 
 _LOGGER = logging.getLogger(__name__)
@@ -22,6 +20,14 @@ async def async_setup_entry(
         NotifyAIUsageSensor(hass, entry),
         NotifyAIRemainingRequestsSensor(hass, entry),
         NotifyAIDailyLimitSensor(hass, entry),
+        NotifyAIKeyPoolSensor(hass, entry),
+        NotifyAIQueueSensor(hass, entry),
+        NotifyAISuppressionSensor(hass, entry),
+        NotifyAICacheSensor(hass, entry),
+        NotifyAIActiveModelSensor(hass, entry),
+        NotifyAICircuitBreakerSensor(hass, entry),
+        NotifyAIQuotaForecastSensor(hass, entry),
+        NotifyAIEventLoopLagSensor(hass, entry),
     ], True)
 
 class NotifyAIUsageSensor(SensorEntity):
@@ -58,25 +64,11 @@ class NotifyAIUsageSensor(SensorEntity):
             used = quota_data['rpd_limit'] - quota_data['rpd_remaining']
             return used
         
-        # Fallback to legacy local counting
-        usage_data = self._hass.data.get(DOMAIN, {}).get(self._entry.entry_id, {}).get("usage_data", {})
-        
-        # Check if we need to reset daily counter
-        last_reset = usage_data.get("last_reset")
-        now = dt_util.now()
-        
-        if last_reset:
-            last_reset_dt = datetime.fromisoformat(last_reset)
-            # Reset if it's a new day
-            if last_reset_dt.date() < now.date():
-                usage_data["daily_count"] = 0
-                usage_data["last_reset"] = now.isoformat()
-        else:
-            # First time setup
-            usage_data["daily_count"] = 0
-            usage_data["last_reset"] = now.isoformat()
-        
-        return usage_data.get("daily_count", 0)
+        # Fallback to local counting (reset at the provider's daily quota boundary)
+        usage = self._hass.data.get(DOMAIN, {}).get(self._entry.entry_id, {}).get("usage")
+        if usage is None:
+            return 0
+        return usage.day_count()
 
     @property
     def extra_state_attributes(self):
@@ -85,17 +77,32 @@ class NotifyAIUsageSensor(SensorEntity):
         quota_data = self._hass.data.get(DOMAIN, {}).get(self._entry.entry_id, {}).get("quota_data", {})
         current_model = self._hass.data.get(DOMAIN, {}).get(self._entry.entry_id, {}).get(CONF_MODEL, "Bilinmiyor")
         provider = self._hass.data.get(DOMAIN, {}).get(self._entry.entry_id, {}).get(CONF_AI_PROVIDER, "gemini")
+        model_policy = self._hass.data.get(DOMAIN, {}).get(self._entry.entry_id, {}).get("model_policy")
         
         # Get provider display name
-        provider_name = "Google Gemini" if provider == "gemini" else "Groq"
+        provider_name = PROVIDER_DISPLAY_NAMES.get(provider, provider)
         
         attributes = {
             "ai_provider": provider,
             "provider_name": provider_name,
             "current_model": current_model,
+            "active_model": model_policy.active_model if model_policy else current_model,
             "last_call_time": usage_data.get("last_call_time", "Henüz çağrı yapılmadı"),
             "last_call_status": usage_data.get("last_call_status", "Bilinmiyor"),
         }
+        if provider == "local":
+            attributes["base_url"] = self._hass.data.get(DOMAIN, {}).get(self._entry.entry_id, {}).get("base_url")
+
+        # Sliding-window request counters
+        usage = self._hass.data.get(DOMAIN, {}).get(self._entry.entry_id, {}).get("usage")
+        if usage is not None:
+            attributes.update(usage.as_dict())
+
+        # Recent provider latency (used by the service router)
+        latency = self._hass.data.get(DOMAIN, {}).get(self._entry.entry_id, {}).get("latency", {})
+        if latency.get("ewma_ms") is not None:
+            attributes["latency_ms"] = round(latency["ewma_ms"], 1)
+            attributes["last_latency_ms"] = latency.get("last_ms")
         
         # Add quota data source if available
         if quota_data:
@@ -106,7 +113,7 @@ class NotifyAIUsageSensor(SensorEntity):
                 attributes["daily_limit"] = quota_data['rpd_limit']
         else:
             attributes["data_source"] = "local_count"
-            attributes["daily_used"] = usage_data.get("daily_count", 0)
+            attributes["daily_used"] = usage.day_count() if usage is not None else 0
         
         # Add error message if last call failed
         if usage_data.get("last_error"):
@@ -153,12 +160,15 @@ class NotifyAIRemainingRequestsSensor(SensorEntity):
             return quota_data['rpd_remaining']
         
         # Fallback to calculating from local count
-        usage_data = self._hass.data.get(DOMAIN, {}).get(self._entry.entry_id, {}).get("usage_data", {})
-        daily_count = usage_data.get("daily_count", 0)
+        usage = self._hass.data.get(DOMAIN, {}).get(self._entry.entry_id, {}).get("usage")
+        daily_count = usage.day_count() if usage is not None else 0
         
         # Get daily limit from model
         model_name = self._hass.data.get(DOMAIN, {}).get(self._entry.entry_id, {}).get(CONF_MODEL, "gemini-2.5-flash")
         daily_limit = self._get_model_daily_limit(model_name)
+        if daily_limit is None:
+            # Local servers have no quota
+            return None
         
         remaining = max(0, daily_limit - daily_count)
         return remaining
@@ -167,12 +177,12 @@ class NotifyAIRemainingRequestsSensor(SensorEntity):
     def extra_state_attributes(self):
         """Return additional attributes."""
         quota_data = self._hass.data.get(DOMAIN, {}).get(self._entry.entry_id, {}).get("quota_data", {})
-        usage_data = self._hass.data.get(DOMAIN, {}).get(self._entry.entry_id, {}).get("usage_data", {})
+        usage = self._hass.data.get(DOMAIN, {}).get(self._entry.entry_id, {}).get("usage")
         model_name = self._hass.data.get(DOMAIN, {}).get(self._entry.entry_id, {}).get(CONF_MODEL, "gemini-2.5-flash")
         provider = self._hass.data.get(DOMAIN, {}).get(self._entry.entry_id, {}).get(CONF_AI_PROVIDER, "gemini")
         
         # Get provider display name
-        provider_name = "Google Gemini" if provider == "gemini" else "Groq"
+        provider_name = PROVIDER_DISPLAY_NAMES.get(provider, provider)
         
         # Use quota data if available, otherwise calculate
         if quota_data and 'rpd_limit' in quota_data:
@@ -182,8 +192,8 @@ class NotifyAIRemainingRequestsSensor(SensorEntity):
             data_source = quota_data.get('source', 'api_headers')
         else:
             daily_limit = self._get_model_daily_limit(model_name)
-            used = usage_data.get("daily_count", 0)
-            remaining = max(0, daily_limit - used)
+            used = usage.day_count() if usage is not None else 0
+            remaining = max(0, daily_limit - used) if daily_limit is not None else None
             data_source = 'local_count'
         
         return {
@@ -197,9 +207,11 @@ class NotifyAIRemainingRequestsSensor(SensorEntity):
         }
     
     def _get_model_daily_limit(self, model_name):
-        """Get daily limit for the model."""
+        """Get daily limit for the model (None for servers without quota)."""
         provider = self._hass.data.get(DOMAIN, {}).get(self._entry.entry_id, {}).get(CONF_AI_PROVIDER, "gemini")
         
+        if provider == "local":
+            return None
         if provider == "groq":
             # All Groq models have 14,400/day
             return GROQ_MODEL_LIMITS.get(model_name, {}).get('rpd', 14400)
@@ -255,7 +267,7 @@ class NotifyAIDailyLimitSensor(SensorEntity):
         model_limits = self._hass.data.get(DOMAIN, {}).get("model_limits", {})
         
         # Get provider display name
-        provider_name = "Google Gemini" if provider == "gemini" else "Groq"
+        provider_name = PROVIDER_DISPLAY_NAMES.get(provider, provider)
         
         # Use quota data from API if available
         if quota_data and 'rpd_limit' in quota_data:
@@ -264,7 +276,10 @@ class NotifyAIDailyLimitSensor(SensorEntity):
             data_source = quota_data.get('source', 'api_headers')
         else:
             # Get limits based on provider
-            if provider == "groq":
+            if provider == "local":
+                rpm = None
+                rpd = None
+            elif provider == "groq":
                 limits = GROQ_MODEL_LIMITS.get(model_name, {"rpm": 8000, "rpd": 14400})
                 rpm = limits['rpm']
                 rpd = limits['rpd']
@@ -290,9 +305,11 @@ class NotifyAIDailyLimitSensor(SensorEntity):
         }
     
     def _get_model_daily_limit(self, model_name):
-        """Get daily limit for the model."""
+        """Get daily limit for the model (None for servers without quota)."""
         provider = self._hass.data.get(DOMAIN, {}).get(self._entry.entry_id, {}).get(CONF_AI_PROVIDER, "gemini")
         
+        if provider == "local":
+            return None
         if provider == "groq":
             # All Groq models have 14,400/day
             return GROQ_MODEL_LIMITS.get(model_name, {}).get('rpd', 14400)
@@ -306,3 +323,381 @@ class NotifyAIDailyLimitSensor(SensorEntity):
     async def async_update(self):
         """Update the sensor."""
         pass
+
+
+class NotifyAIKeyPoolSensor(SensorEntity):
+    """Sensor to show the API key pool and per-key usage."""
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
+        """Initialize the sensor."""
+        self._hass = hass
+        self._entry = entry
+        self._attr_name = "NotifyAI API Anahtar Havuzu"
+        self._attr_unique_id = f"{entry.entry_id}_key_pool"
+        self._attr_icon = "mdi:key-chain"
+        self._attr_native_unit_of_measurement = "anahtar"
+        self._attr_should_poll = True  # Enable polling for updates
+
+    @property
+    def device_info(self):
+        """Return device information about this entity."""
+        return {
+            "identifiers": {(DOMAIN, self._entry.entry_id)},
+            "name": "NotifyAI",
+            "manufacturer": "NotifyAI",
+            "model": "API Integration",
+        }
+
+    @property
+    def native_value(self):
+        """Return the number of keys that can take requests right now."""
+        key_pool = self._hass.data.get(DOMAIN, {}).get(self._entry.entry_id, {}).get("key_pool")
+        if key_pool is None:
+            return None
+        return key_pool.available_count()
+
+    @property
+    def extra_state_attributes(self):
+        """Return per-key usage (keys are masked)."""
+        key_pool = self._hass.data.get(DOMAIN, {}).get(self._entry.entry_id, {}).get("key_pool")
+        if key_pool is None:
+            return {}
+        return {
+            "strategy": key_pool.strategy,
+            "total_keys": len(key_pool),
+            "keys": key_pool.as_dict(),
+        }
+
+    async def async_update(self):
+        """Update the sensor."""
+        pass
+
+
+class NotifyAIQueueSensor(SensorEntity):
+    """Sensor to show background (fire-and-forget) jobs in flight."""
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
+        """Initialize the sensor."""
+        self._hass = hass
+        self._entry = entry
+        self._attr_name = "NotifyAI Kuyruk"
+        self._attr_unique_id = f"{entry.entry_id}_queue_depth"
+        self._attr_icon = "mdi:tray-full"
+        self._attr_state_class = SensorStateClass.MEASUREMENT
+        self._attr_native_unit_of_measurement = "iş"
+        self._attr_should_poll = True  # Enable polling for updates
+
+    @property
+    def device_info(self):
+        """Return device information about this entity."""
+        return {
+            "identifiers": {(DOMAIN, self._entry.entry_id)},
+            "name": "NotifyAI",
+            "manufacturer": "NotifyAI",
+            "model": "API Integration",
+        }
+
+    @property
+    def native_value(self):
+        """Return the number of background jobs in flight for this entry."""
+        jobs = self._hass.data.get(DOMAIN, {}).get("jobs")
+        if jobs is None:
+            return 0
+        return jobs.queue_depth(self._entry.entry_id)
+
+    @property
+    def extra_state_attributes(self):
+        """Return in-flight jobs and completed/failed totals."""
+        jobs = self._hass.data.get(DOMAIN, {}).get("jobs")
+        if jobs is None:
+            return {}
+        return jobs.as_dict(self._entry.entry_id)
+
+    async def async_update(self):
+        """Update the sensor."""
+        pass
+
+
+class NotifyAISuppressionSensor(SensorEntity):
+    """Sensor to count calls suppressed by debounce/cooldown."""
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
+        """Initialize the sensor."""
+        self._hass = hass
+        self._entry = entry
+        self._attr_name = "NotifyAI Bastırılan Bildirimler"
+        self._attr_unique_id = f"{entry.entry_id}_suppressed"
+        self._attr_icon = "mdi:bell-off"
+        self._attr_state_class = SensorStateClass.TOTAL_INCREASING
+        self._attr_native_unit_of_measurement = "çağrı"
+        self._attr_should_poll = True  # Enable polling for updates
+
+    @property
+    def device_info(self):
+        """Return device information about this entity."""
+        return {
+            "identifiers": {(DOMAIN, self._entry.entry_id)},
+            "name": "NotifyAI",
+            "manufacturer": "NotifyAI",
+            "model": "API Integration",
+        }
+
+    @property
+    def native_value(self):
+        """Return the number of suppressed calls routed to this entry."""
+        suppression = self._hass.data.get(DOMAIN, {}).get("suppression")
+        if suppression is None:
+            return 0
+        return suppression.as_dict(self._entry.entry_id)["suppressed"]
+
+    @property
+    def extra_state_attributes(self):
+        """Return passed/summarized counters and keys with pending counts."""
+        suppression = self._hass.data.get(DOMAIN, {}).get("suppression")
+        if suppression is None:
+            return {}
+        return suppression.as_dict(self._entry.entry_id)
+
+    async def async_update(self):
+        """Update the sensor."""
+        pass
+
+
+class NotifyAICacheSensor(SensorEntity):
+    """Sensor to show how many provider calls were saved by reuse."""
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
+        """Initialize the sensor."""
+        self._hass = hass
+        self._entry = entry
+        self._attr_name = "NotifyAI Önbellek"
+        self._attr_unique_id = f"{entry.entry_id}_cache"
+        self._attr_icon = "mdi:cached"
+        self._attr_state_class = SensorStateClass.TOTAL_INCREASING
+        self._attr_native_unit_of_measurement = "isabet"
+        self._attr_should_poll = True  # Enable polling for updates
+
+    @property
+    def device_info(self):
+        """Return device information about this entity."""
+        return {
+            "identifiers": {(DOMAIN, self._entry.entry_id)},
+            "name": "NotifyAI",
+            "manufacturer": "NotifyAI",
+            "model": "API Integration",
+        }
+
+    @property
+    def native_value(self):
+        """Return the number of near-duplicate reuses."""
+        similarity_index = self._hass.data.get(DOMAIN, {}).get(self._entry.entry_id, {}).get("similarity_index")
+        if similarity_index is None:
+            return 0
+        return similarity_index.hits
+
+    @property
+    def extra_state_attributes(self):
+        """Return cache sizes and hit rates."""
+        entry_data = self._hass.data.get(DOMAIN, {}).get(self._entry.entry_id, {})
+        attributes = {}
+        if "similarity_index" in entry_data:
+            attributes["similarity"] = entry_data["similarity_index"].as_dict()
+        if "response_cache" in entry_data:
+            response_cache = entry_data["response_cache"]
+            attributes["fallback_cache"] = {
+                "size": len(response_cache),
+                "hits": response_cache.hits,
+                "misses": response_cache.misses,
+            }
+        if "variant_pool" in entry_data:
+            attributes["variants"] = entry_data["variant_pool"].as_dict()
+        if "repetition_guard" in entry_data:
+            attributes["repetition"] = entry_data["repetition_guard"].as_dict()
+        return attributes
+
+    async def async_update(self):
+        """Update the sensor."""
+        pass
+
+
+class NotifyAIActiveModelSensor(SensorEntity):
+    """Sensor to show the model currently chosen by the quota-aware policy."""
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
+        """Initialize the sensor."""
+        self._hass = hass
+        self._entry = entry
+        self._attr_name = "NotifyAI Aktif Model"
+        self._attr_unique_id = f"{entry.entry_id}_active_model"
+        self._attr_icon = "mdi:swap-vertical"
+        self._attr_should_poll = True  # Enable polling for updates
+
+    @property
+    def device_info(self):
+        """Return device information about this entity."""
+        return {
+            "identifiers": {(DOMAIN, self._entry.entry_id)},
+            "name": "NotifyAI",
+            "manufacturer": "NotifyAI",
+            "model": "API Integration",
+        }
+
+    @property
+    def native_value(self):
+        """Return the active model."""
+        model_policy = self._hass.data.get(DOMAIN, {}).get(self._entry.entry_id, {}).get("model_policy")
+        if model_policy is None:
+            return None
+        return model_policy.active_model
+
+    @property
+    def extra_state_attributes(self):
+        """Return the model ladder with remaining quota per model."""
+        model_policy = self._hass.data.get(DOMAIN, {}).get(self._entry.entry_id, {}).get("model_policy")
+        if model_policy is None:
+            return {}
+        return model_policy.as_dict()
+
+    async def async_update(self):
+        """Update the sensor."""
+        pass
+
+
+class NotifyAICircuitBreakerSensor(SensorEntity):
+    """Sensor to show the circuit breaker state of the active model."""
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
+        """Initialize the sensor."""
+        self._hass = hass
+        self._entry = entry
+        self._attr_name = "NotifyAI Devre Kesici"
+        self._attr_unique_id = f"{entry.entry_id}_circuit_breaker"
+        self._attr_icon = "mdi:electric-switch"
+        self._attr_should_poll = True  # Enable polling for updates
+
+    @property
+    def device_info(self):
+        """Return device information about this entity."""
+        return {
+            "identifiers": {(DOMAIN, self._entry.entry_id)},
+            "name": "NotifyAI",
+            "manufacturer": "NotifyAI",
+            "model": "API Integration",
+        }
+
+    @property
+    def native_value(self):
+        """Return closed / open / half_open for the active model."""
+        entry_data = self._hass.data.get(DOMAIN, {}).get(self._entry.entry_id, {})
+        breakers = entry_data.get("breakers")
+        model_policy = entry_data.get("model_policy")
+        if breakers is None or model_policy is None:
+            return None
+        return breakers.state(model_policy.active_model)
+
+    @property
+    def extra_state_attributes(self):
+        """Return the breaker of every model that has been called."""
+        entry_data = self._hass.data.get(DOMAIN, {}).get(self._entry.entry_id, {})
+        breakers = entry_data.get("breakers")
+        if breakers is None:
+            return {}
+        return {
+            "failure_threshold": breakers.failures,
+            "failure_rate_threshold": breakers.failure_rate,
+            "recovery_s": breakers.recovery,
+            "models": breakers.as_dict(),
+        }
+
+    async def async_update(self):
+        """Update the sensor."""
+        pass
+
+
+class NotifyAIQuotaForecastSensor(SensorEntity):
+    """Sensor to show when the daily quota runs out at the current pace."""
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
+        """Initialize the sensor."""
+        self._hass = hass
+        self._entry = entry
+        self._attr_name = "NotifyAI Kota Bitiş Tahmini"
+        self._attr_unique_id = f"{entry.entry_id}_quota_forecast"
+        self._attr_icon = "mdi:timer-sand"
+        self._attr_device_class = SensorDeviceClass.TIMESTAMP
+        self._attr_should_poll = True  # Enable polling for updates
+
+    @property
+    def device_info(self):
+        """Return device information about this entity."""
+        return {
+            "identifiers": {(DOMAIN, self._entry.entry_id)},
+            "name": "NotifyAI",
+            "manufacturer": "NotifyAI",
+            "model": "API Integration",
+        }
+
+    @property
+    def native_value(self):
+        """Return the projected exhaustion time (unknown when the quota lasts or there is none)."""
+        forecast = self._hass.data.get(DOMAIN, {}).get(self._entry.entry_id, {}).get("forecast")
+        if forecast is None:
+            return None
+        return forecast.exhaustion_time()
+
+    @property
+    def extra_state_attributes(self):
+        """Return the burn rate, reserve and throttling counters."""
+        forecast = self._hass.data.get(DOMAIN, {}).get(self._entry.entry_id, {}).get("forecast")
+        if forecast is None:
+            return {}
+        return forecast.as_dict()
+
+    async def async_update(self):
+        """Update the sensor."""
+        pass
+
+
+class NotifyAIEventLoopLagSensor(SensorEntity):
+    """Sensor to show the largest event-loop lag seen while NotifyAI work was running."""
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
+        """Initialize the sensor."""
+        self._hass = hass
+        self._entry = entry
+        self._attr_name = "NotifyAI Olay Döngüsü Gecikmesi"
+        self._attr_unique_id = f"{entry.entry_id}_loop_lag"
+        self._attr_icon = "mdi:speedometer-slow"
+        self._attr_state_class = SensorStateClass.MEASUREMENT
+        self._attr_native_unit_of_measurement = "ms"
+        self._attr_should_poll = True  # Enable polling for updates
+
+    @property
+    def device_info(self):
+        """Return device information about this entity."""
+        return {
+            "identifiers": {(DOMAIN, self._entry.entry_id)},
+            "name": "NotifyAI",
+            "manufacturer": "NotifyAI",
+            "model": "API Integration",
+        }
+
+    @property
+    def native_value(self):
+        """Return the maximum lag in ms (unknown while the watchdog is off)."""
+        watchdog = self._hass.data.get(DOMAIN, {}).get("loop_watchdog")
+        if watchdog is None or not watchdog.enabled:
+            return None
+        return round(watchdog.max_lag_ms, 1)
+
+    @property
+    def extra_state_attributes(self):
+        """Return per-step timings and the recent slow-step reports."""
+        watchdog = self._hass.data.get(DOMAIN, {}).get("loop_watchdog")
+        if watchdog is None:
+            return {}
+        return watchdog.as_dict()
+
+    async def async_update(self):
+        """Update the sensor."""
+        pass
@@ -0,0 +1,182 @@
+"""Near-duplicate index of recent generations (normalized tokens + MinHash/LSH)."""
+import random
+import re
+import time
+from collections import OrderedDict
+
+from .const import DEFAULT_SIMILARITY_MAX_ENTRIES
+
+# 32 hash functions split into 8 LSH bands of 4 rows
+NUM_PERMUTATIONS = 32
+BAND_ROWS = 4
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(0x5EED)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERMUTATIONS)
+]
+
+_NUMBER_RE = re.compile(r"\d+(?:[.,]\d+)?")
+_TOKEN_RE = re.compile(r"[^\W_]+|#", re.UNICODE)
+
+
+def normalize_tokens(text: str) -> list:
+    """Lowercase (Turkish-aware), mask numbers and split into word tokens."""
+    text = (text or "").replace("I", "ı").replace("İ", "i").lower()
+    text = _NUMBER_RE.sub(" # ", text)
+    return _TOKEN_RE.findall(text)
+
+
+def shingles(text: str) -> frozenset:
+    """Unigrams and bigrams of the normalized text."""
+    tokens = normalize_tokens(text)
+    result = set(tokens)
+    result.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+    return frozenset(result)
+
+
+def minhash(shingle_set: frozenset) -> tuple:
+    """MinHash signature of a shingle set."""
+    hashes = [hash(shingle) & _MERSENNE_PRIME for shingle in shingle_set]
+    if not hashes:
+        return tuple([0] * NUM_PERMUTATIONS)
+    return tuple(
+        min((a * h + b) % _MERSENNE_PRIME for h in hashes)
+        for a, b in _PERMUTATIONS
+    )
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    """Jaccard similarity of two sets."""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def retemplate(old_event: str, new_event: str, text: str):
+    """Carry the numbers of the new event over into a reused text.
+
+    "Sıcaklık 24.3°C" -> "Sıcaklık 24.4°C": if both events have the same count of
+    numbers, every old number in the text is swapped for its new value in one
+    pass. Returns None when the numbers can't be mapped unambiguously (different
+    counts, or one old value standing for two new ones); the text must not be
+    reused then.
+    """
+    old_numbers = _NUMBER_RE.findall(old_event or "")
+    new_numbers = _NUMBER_RE.findall(new_event or "")
+    if len(old_numbers) != len(new_numbers):
+        return None
+    mapping = {}
+    for old, new in zip(old_numbers, new_numbers):
+        if mapping.setdefault(old, new) != new:
+            return None
+    return _NUMBER_RE.sub(lambda match: mapping.get(match.group(), match.group()), text)
+
+
+class SimilarityIndex:
+    """Bounded LRU of recent generations searchable by near-duplicate event text."""
+
+    def __init__(self, threshold: float = 0.0, max_entries: int = DEFAULT_SIMILARITY_MAX_ENTRIES) -> None:
+        """Initialize the index; a threshold of 0 disables lookups."""
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._buckets = {}
+        # (scope, normalized text) -> entry id; a repeated event replaces its entry
+        self._exact = {}
+        self._next_id = 0
+        self.lookups = 0
+        self.hits = 0
+        self._lookup_time = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _bands(scope: tuple, signature: tuple) -> list:
+        return [
+            (scope, start, signature[start:start + BAND_ROWS])
+            for start in range(0, NUM_PERMUTATIONS, BAND_ROWS)
+        ]
+
+    def add(self, scope: tuple, text: str, value: tuple) -> None:
+        """Index a generated (title, body) under its event text."""
+        if not self.enabled:
+            return
+        exact_key = (scope, " ".join(normalize_tokens(text)))
+        previous = self._exact.get(exact_key)
+        if previous is not None:
+            self._remove(previous)
+        shingle_set = shingles(text)
+        bands = self._bands(scope, minhash(shingle_set))
+
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entries[entry_id] = (text, shingle_set, bands, value, exact_key)
+        self._exact[exact_key] = entry_id
+        for band in bands:
+            self._buckets.setdefault(band, set()).add(entry_id)
+
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, entry_id: int) -> None:
+        _, _, bands, _, exact_key = self._entries.pop(entry_id)
+        if self._exact.get(exact_key) == entry_id:
+            del self._exact[exact_key]
+        for band in bands:
+            bucket = self._buckets.get(band)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[band]
+
+    def lookup(self, scope: tuple, text: str):
+        """Return (source_text, value, score) of the best match above threshold, or None."""
+        if not self.enabled or not self._entries:
+            return None
+        started = time.perf_counter()
+        self.lookups += 1
+
+        shingle_set = shingles(text)
+        candidates = set()
+        for band in self._bands(scope, minhash(shingle_set)):
+            candidates.update(self._buckets.get(band, ()))
+
+        best = None
+        for entry_id in candidates:
+            source_text, candidate_set, _, value, _ = self._entries[entry_id]
+            score = jaccard(shingle_set, candidate_set)
+            if score >= self.threshold and (best is None or score > best[2]):
+                best = (entry_id, source_text, score, value)
+
+        self._lookup_time += time.perf_counter() - started
+        if best is None:
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end(best[0])
+        return best[1], best[3], best[2]
+
+    def resize(self, max_entries: int) -> None:
+        """Change the memory bound, evicting the oldest entries if needed."""
+        self.max_entries = max_entries
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def as_dict(self) -> dict:
+        """Size and hit-rate statistics."""
+        return {
+            "threshold": self.threshold,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.lookups, 3) if self.lookups else 0.0,
+            "avg_lookup_us": round(self._lookup_time / self.lookups * 1e6, 1) if self.lookups else 0.0,
+        }
@@ -0,0 +1,45 @@
+"""Latest-wins cancellation of in-flight generate calls that share a supersede_key."""
+import asyncio
+import logging
+from functools import partial
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class SupersedeTracker:
+    """Keep one in-flight task per supersede_key; a newer call cancels the older one.
+
+    Cancelling the task aborts whatever it is waiting on - the provider HTTP
+    request, notify service calls or a blocking TTS call - so a stale result
+    is never delivered after a newer one.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the tracker."""
+        self._tasks = {}
+        self.entry_stats = {}
+
+    def _stats(self, entry_id: str) -> dict:
+        return self.entry_stats.setdefault(entry_id, {"tracked": 0, "superseded": 0})
+
+    def track(self, entry_id: str, key: str, task: asyncio.Task) -> None:
+        """Register the newest task of a key, cancelling the one it replaces."""
+        previous = self._tasks.get(key)
+        if previous is not None and not previous[1].done():
+            previous[1].cancel()
+            self._stats(previous[0])["superseded"] += 1
+            _LOGGER.debug("NotifyAI - Cancelled the in-flight call for '%s', a newer one arrived", key)
+        self._tasks[key] = (entry_id, task)
+        self._stats(entry_id)["tracked"] += 1
+        task.add_done_callback(partial(self._done, key))
+
+    def _done(self, key: str, task: asyncio.Task) -> None:
+        current = self._tasks.get(key)
+        if current is not None and current[1] is task:
+            del self._tasks[key]
+
+    def as_dict(self, entry_id: str) -> dict:
+        """Counters of an entry plus the keys it has in flight."""
+        stats = dict(self._stats(entry_id))
+        stats["in_flight"] = sorted(key for key, (owner, _) in self._tasks.items() if owner == entry_id)
+        return stats
@@ -0,0 +1,173 @@
+"""Debounce and flap suppression for NotifyAI - runs before any provider call."""
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+_LOGGER = logging.getLogger(__name__)
+
+# Upper bound of suppression keys kept in memory
+MAX_SUPPRESSION_KEYS = 1024
+
+
+def summarize_event(event: str, count: int, minutes: int) -> str:
+    """Turn a repeated event into a summary line for the model."""
+    event = (event or "").strip().rstrip(".")
+    return f"{event} (son {minutes} dakikada {count} kez)"
+
+
+class SuppressionManager:
+    """Debounce, cooldown and count-and-summarize per suppression key.
+
+    The key is `suppress_key`, else `source_entity`, else the event text.
+    State is shared by all entries so load-balanced calls are still suppressed;
+    counters are attributed to the entry the call was routed to.
+    """
+
+    def __init__(self, hass: HomeAssistant, flush_callback=None) -> None:
+        """Initialize the manager.
+
+        `flush_callback(entry_id, data)` is awaited to send a trailing summary
+        when suppressed calls are left over at the end of a cooldown.
+        """
+        self._hass = hass
+        self._flush_callback = flush_callback
+        self._keys = OrderedDict()
+        self.entry_stats = {}
+
+    @staticmethod
+    def make_key(data: dict) -> str:
+        """Return the suppression key of a call."""
+        return (
+            data.get("suppress_key")
+            or data.get("source_entity")
+            or (data.get("event") or "").strip().lower()
+        )
+
+    def _state(self, key: str) -> dict:
+        state = self._keys.get(key)
+        if state is None:
+            state = {
+                "last_sent": None,
+                "window_start": None,
+                "suppressed": 0,
+                "last_data": None,
+                "pending": None,
+                "flush_scheduled": False,
+            }
+            self._keys[key] = state
+            self._evict()
+        self._keys.move_to_end(key)
+        return state
+
+    def _evict(self) -> None:
+        """Drop the oldest idle keys beyond the memory bound."""
+        for key in list(self._keys):
+            if len(self._keys) <= MAX_SUPPRESSION_KEYS:
+                break
+            state = self._keys[key]
+            if state["pending"] is None and not state["flush_scheduled"]:
+                del self._keys[key]
+
+    def _stats(self, entry_id: str) -> dict:
+        return self.entry_stats.setdefault(entry_id, {"suppressed": 0, "passed": 0, "summarized": 0})
+
+    def _suppress(self, entry_id: str, key: str, state: dict, data: dict) -> dict:
+        state["suppressed"] += 1
+        state["last_data"] = data
+        self._stats(entry_id)["suppressed"] += 1
+        _LOGGER.debug("NotifyAI - Suppressed '%s' (%s so far)", key, state["suppressed"])
+        return {"key": key, "suppressed_count": state["suppressed"]}
+
+    def _summarize(self, entry_id: str, state: dict, data: dict, current: int = 1) -> dict:
+        """Fold the suppressed count (plus the current call) into the event text if requested."""
+        count = state["suppressed"]
+        if count and data.get("summarize"):
+            minutes = max(1, math.ceil((time.monotonic() - state["window_start"]) / 60))
+            data = dict(data)
+            data["event"] = summarize_event(data.get("event"), count + current, minutes)
+            self._stats(entry_id)["summarized"] += 1
+        return data
+
+    def _mark_sent(self, entry_id: str, state: dict) -> None:
+        now = time.monotonic()
+        state["last_sent"] = now
+        state["window_start"] = now
+        state["suppressed"] = 0
+        state["last_data"] = None
+        self._stats(entry_id)["passed"] += 1
+
+    async def async_check(self, entry_id: str, data: dict) -> tuple:
+        """Return (data_to_generate, None) or (None, suppression_info).
+
+        Suppressed calls return immediately; only the call leading a debounce
+        window waits for the window to go quiet.
+        """
+        debounce = float(data.get("debounce") or 0)
+        cooldown = float(data.get("cooldown") or 0)
+        if not debounce and not cooldown:
+            return data, None
+
+        key = self.make_key(data)
+        state = self._state(key)
+        now = time.monotonic()
+
+        # A leader is already waiting: fold this call into it and extend the window
+        pending = state["pending"]
+        if pending is not None:
+            pending["data"] = data
+            pending["deadline"] = now + debounce
+            return None, self._suppress(entry_id, key, state, data)
+
+        if cooldown and state["last_sent"] is not None and now - state["last_sent"] < cooldown:
+            info = self._suppress(entry_id, key, state, data)
+            if data.get("summarize") and self._flush_callback and not state["flush_scheduled"]:
+                self._schedule_flush(entry_id, key, state, state["last_sent"] + cooldown - now)
+            return None, info
+
+        if state["suppressed"] == 0:
+            state["window_start"] = now
+
+        if debounce:
+            pending = {"data": data, "deadline": now + debounce}
+            state["pending"] = pending
+            try:
+                while (remaining := pending["deadline"] - time.monotonic()) > 0:
+                    await asyncio.sleep(remaining)
+            finally:
+                state["pending"] = None
+            # The newest state wins
+            data = pending["data"]
+
+        data = self._summarize(entry_id, state, data)
+        self._mark_sent(entry_id, state)
+        return data, None
+
+    def _schedule_flush(self, entry_id: str, key: str, state: dict, delay: float) -> None:
+        """Send the leftover count once the cooldown ends."""
+        state["flush_scheduled"] = True
+
+        @callback
+        def _flush(_now) -> None:
+            state["flush_scheduled"] = False
+            if not state["suppressed"] or state["last_data"] is None:
+                return
+            data = self._summarize(entry_id, state, state["last_data"], current=0)
+            self._mark_sent(entry_id, state)
+            self._hass.async_create_task(self._flush_callback(entry_id, data))
+
+        async_call_later(self._hass, max(0.0, delay), _flush)
+
+    def as_dict(self, entry_id: str) -> dict:
+        """Counters of an entry plus keys that currently hold suppressed calls."""
+        stats = dict(self._stats(entry_id))
+        stats["active_keys"] = {
+            key: state["suppressed"]
+            for key, state in self._keys.items()
+            if state["suppressed"]
+        }
+        return stats
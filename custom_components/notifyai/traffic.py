@@ -0,0 +1,130 @@
+"""Opt-in recording of generate calls to a rotating JSONL file (input for the replay service)."""
+import json
+import logging
+import os
+import time
+
+from homeassistant.core import HomeAssistant
+
+_LOGGER = logging.getLogger(__name__)
+
+TRAFFIC_FILE = "notifyai_traffic.jsonl"
+
+# Rotate at this size and keep this many older files (.1 is the newest)
+MAX_FILE_BYTES = 5 * 1024 * 1024
+BACKUP_COUNT = 3
+
+# Call fields that are written as they are; image inputs only as a flag, API keys never
+RECORDED_FIELDS = (
+    "event", "context", "mode", "persona", "custom_title", "timeout_ms", "local_only",
+    "background", "suppress_key", "source_entity", "debounce", "cooldown", "summarize",
+    "priority", "digest", "supersede_key", "recipients", "output_language",
+)
+IMAGE_FIELDS = ("image_path", "camera_entity", "image_paths", "clip_path")
+
+
+def build_record(entry_id: str, provider: str, data: dict, response: dict, error: Exception, elapsed_ms: float) -> dict:
+    """One compact line describing a generate call and how it was answered."""
+    record = {
+        # Arrival time, so replays keep the original spacing between calls
+        "ts": round(time.time() - elapsed_ms / 1000, 3),
+        "entry_id": entry_id,
+        "provider": provider,
+        "ms": round(elapsed_ms, 1),
+        "in": {field: data[field] for field in RECORDED_FIELDS if data.get(field) not in (None, "")},
+    }
+    images = [field for field in IMAGE_FIELDS if data.get(field)]
+    if images:
+        record["images"] = images
+    if error is not None:
+        record["status"] = "error"
+        record["error"] = type(error).__name__
+        return record
+
+    record["status"] = response.get("status", "ok")
+    for field in ("source", "model", "fallback_reason", "repeated", "timings"):
+        if field in response:
+            record[field] = response[field]
+    record["sizes"] = {
+        "in": len(data.get("event") or "") + len(data.get("context") or ""),
+        "title": len(response.get("title") or ""),
+        "body": len(response.get("body") or ""),
+    }
+    return record
+
+
+class TrafficRecorder:
+    """Append records to a JSONL file from the executor, a batch at a time.
+
+    Calls only queue the line; a single writer task drains the queue, so the
+    event loop never touches the file and bursts become one write.
+    """
+
+    def __init__(self, hass: HomeAssistant, path: str = None) -> None:
+        """Initialize the recorder (the file is created on the first record)."""
+        self._hass = hass
+        self.path = path or hass.config.path(TRAFFIC_FILE)
+        self._pending = []
+        self._writing = False
+        self.recorded = 0
+        self.dropped = 0
+
+    def record(self, record: dict) -> None:
+        """Queue one record for writing."""
+        self._pending.append(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+        if not self._writing:
+            self._writing = True
+            self._hass.async_create_background_task(self._async_drain(), name="notifyai_traffic_writer")
+
+    async def _async_drain(self) -> None:
+        try:
+            while self._pending:
+                lines, self._pending = self._pending, []
+                try:
+                    await self._hass.async_add_executor_job(self._write, lines)
+                    self.recorded += len(lines)
+                except OSError as e:
+                    self.dropped += len(lines)
+                    _LOGGER.warning("NotifyAI - Could not write traffic record: %s", e)
+        finally:
+            self._writing = False
+
+    def _write(self, lines: list) -> None:
+        """Append lines, rotating first if the file is full (runs in the executor)."""
+        try:
+            if os.path.getsize(self.path) >= MAX_FILE_BYTES:
+                self._rotate()
+        except FileNotFoundError:
+            pass
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+    def _rotate(self) -> None:
+        for index in range(BACKUP_COUNT - 1, 0, -1):
+            older = f"{self.path}.{index}"
+            if os.path.exists(older):
+                os.replace(older, f"{self.path}.{index + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+
+def load_records(path: str, limit: int = None) -> list:
+    """Read recorded calls in time order, oldest file first (runs in the executor)."""
+    files = [f"{path}.{index}" for index in range(BACKUP_COUNT, 0, -1)] + [path]
+    records = []
+    for file_path in files:
+        if not os.path.exists(file_path):
+            continue
+        with open(file_path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # A line cut short by a crash or rotation
+                    continue
+    records.sort(key=lambda record: record.get("ts", 0))
+    if limit:
+        records = records[:limit]
+    return records
@@ -0,0 +1,300 @@
+"""Declarative state-change trigger rules that feed the generate pipeline directly."""
+import fnmatch
+import logging
+import re
+from collections import OrderedDict
+
+import voluptuous as vol
+
+from homeassistant.const import EVENT_STATE_CHANGED
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.util.yaml import parse_yaml
+
+_LOGGER = logging.getLogger(__name__)
+
+# Entity ids whose matching rules are remembered; unrelated entities cost one dict lookup
+MAX_MATCH_CACHE = 4096
+
+# Rule keys that are passed to notifyai.generate as they are
+CALL_FIELDS = (
+    "mode", "persona", "custom_title", "notify_service", "audio_device", "tts_service", "language",
+    "priority", "digest", "debounce", "cooldown", "summarize", "suppress_key", "timeout_ms", "local_only",
+    "supersede_key", "recipients", "output_language",
+)
+
+
+# Shown in the options form
+RULE_PLACEHOLDERS = "{name}, {state}, {from_state}, {entity_id}, {attribute}"
+RULES_EXAMPLE = """- entity_id: binary_sensor.camasir_makinesi
+  to: "off"
+  event: "Çamaşır makinesi bitti"
+  digest: true
+- entity_id: sensor.*_sicaklik
+  above: 30
+  event: "{name} {state} dereceye çıktı"
+  priority: critical"""
+
+
+class _Placeholders(dict):
+    """format_map() mapping that leaves unknown placeholders visible instead of failing."""
+
+    def __missing__(self, key: str) -> str:
+        return "{" + key + "}"
+
+
+# Errors str.format_map() raises for a malformed template
+FORMAT_ERRORS = (ValueError, IndexError, KeyError, AttributeError, TypeError)
+
+
+def _template(value) -> str:
+    """A text with placeholders; formatted once here so a malformed one is rejected up front."""
+    if not isinstance(value, str):
+        raise vol.Invalid("expected text")
+    try:
+        value.format_map(_Placeholders(entity_id="", name="", state="", from_state="", attribute=""))
+    except FORMAT_ERRORS as e:
+        raise vol.Invalid(f"invalid placeholder in {value!r}: {e}") from e
+    return value
+
+
+def _state_values(value) -> list:
+    """Accept a state or a list of states; YAML's unquoted on/off arrive as booleans."""
+    values = value if isinstance(value, list) else [value]
+    result = []
+    for item in values:
+        if isinstance(item, bool):
+            item = "on" if item else "off"
+        if not isinstance(item, (str, int, float)):
+            raise vol.Invalid(f"invalid state: {item!r}")
+        result.append(str(item))
+    return result
+
+
+def _text_list(value) -> list:
+    values = value if isinstance(value, list) else [value]
+    if not values or not all(isinstance(item, str) and item for item in values):
+        raise vol.Invalid("expected an entity id, pattern or a list of them")
+    return [item.strip().lower() for item in values]
+
+
+def _has_target(rule: dict) -> dict:
+    if "entity_id" not in rule and "domain" not in rule:
+        raise vol.Invalid("every rule needs entity_id or domain")
+    return rule
+
+
+RULE_SCHEMA = vol.All(
+    vol.Schema({
+        vol.Optional("entity_id"): _text_list,
+        vol.Optional("domain"): _text_list,
+        vol.Required("event"): _template,
+        vol.Optional("context"): _template,
+        vol.Optional("from"): _state_values,
+        vol.Optional("to"): _state_values,
+        vol.Optional("attribute"): str,
+        vol.Optional("above"): vol.Coerce(float),
+        vol.Optional("below"): vol.Coerce(float),
+        vol.Optional("mode"): str,
+        vol.Optional("persona"): str,
+        vol.Optional("custom_title"): str,
+        vol.Optional("notify_service"): str,
+        vol.Optional("audio_device"): str,
+        vol.Optional("tts_service"): str,
+        vol.Optional("language"): str,
+        vol.Optional("priority"): vol.In(["low", "normal", "critical"]),
+        vol.Optional("digest"): bool,
+        vol.Optional("debounce"): vol.Coerce(float),
+        vol.Optional("cooldown"): vol.Coerce(float),
+        vol.Optional("summarize"): bool,
+        vol.Optional("suppress_key"): str,
+        vol.Optional("timeout_ms"): vol.Coerce(int),
+        vol.Optional("local_only"): bool,
+        vol.Optional("supersede_key"): str,
+        vol.Optional("recipients"): [dict],
+        vol.Optional("output_language"): str,
+    }),
+    _has_target,
+)
+
+RULES_SCHEMA = vol.Schema(vol.Any(None, [RULE_SCHEMA]))
+
+
+def parse_rules(text: str) -> list:
+    """Parse and validate the YAML rule list; raises vol.Invalid with a readable message."""
+    if not (text or "").strip():
+        return []
+    try:
+        rules = parse_yaml(text)
+    except HomeAssistantError as e:
+        raise vol.Invalid(f"YAML: {e}") from e
+    return RULES_SCHEMA(rules) or []
+
+
+class TriggerIndex:
+    """Rules indexed by exact entity id, by domain and by compiled pattern.
+
+    `match()` resolves an entity id once and memoizes the result, so a state
+    change of an entity no rule refers to costs a single dict lookup no matter
+    how many rules there are.
+    """
+
+    def __init__(self, rules: list) -> None:
+        """Build the index."""
+        self.rules = rules
+        self._order = {id(rule): position for position, rule in enumerate(rules)}
+        self._exact = {}
+        self._domains = {}
+        self._patterns = []
+        self._cache = OrderedDict()
+
+        for rule in rules:
+            for domain in rule.get("domain", []):
+                self._domains.setdefault(domain, []).append(rule)
+            for entity_id in rule.get("entity_id", []):
+                if not any(char in entity_id for char in "*?["):
+                    self._exact.setdefault(entity_id, []).append(rule)
+                elif entity_id.endswith(".*") and not any(char in entity_id[:-2] for char in "*?["):
+                    # "light.*" is just a domain rule
+                    self._domains.setdefault(entity_id[:-2], []).append(rule)
+                else:
+                    self._patterns.append((re.compile(fnmatch.translate(entity_id)), rule))
+
+    def match(self, entity_id: str) -> tuple:
+        """Rules that refer to an entity, in rule order."""
+        rules = self._cache.get(entity_id)
+        if rules is not None:
+            self._cache.move_to_end(entity_id)
+            return rules
+
+        matched = self._exact.get(entity_id, []) + self._domains.get(entity_id.split(".", 1)[0], [])
+        matched += [rule for pattern, rule in self._patterns if pattern.match(entity_id)]
+        # A rule listing several matching targets fires once
+        rules = tuple(sorted({id(rule): rule for rule in matched}.values(), key=lambda rule: self._order[id(rule)]))
+        self._cache[entity_id] = rules
+        if len(self._cache) > MAX_MATCH_CACHE:
+            self._cache.popitem(last=False)
+        return rules
+
+    def as_dict(self) -> dict:
+        """Index sizes for diagnostics."""
+        return {
+            "rules": len(self.rules),
+            "exact": len(self._exact),
+            "domains": len(self._domains),
+            "patterns": len(self._patterns),
+            "cached_entities": len(self._cache),
+        }
+
+
+def _value(state, attribute: str = None):
+    return state.attributes.get(attribute) if attribute else state.state
+
+
+def _in_range(rule: dict, value) -> bool:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return False
+    if "above" in rule and not number > rule["above"]:
+        return False
+    if "below" in rule and not number < rule["below"]:
+        return False
+    return True
+
+
+def rule_fires(rule: dict, old_state, new_state) -> bool:
+    """Whether a state change satisfies a rule (thresholds fire when they are crossed)."""
+    attribute = rule.get("attribute")
+    if "from" in rule and old_state.state not in rule["from"]:
+        return False
+    if "to" in rule and new_state.state not in rule["to"]:
+        return False
+    if "above" in rule or "below" in rule:
+        return _in_range(rule, _value(new_state, attribute)) and not _in_range(rule, _value(old_state, attribute))
+    if attribute:
+        return _value(new_state, attribute) != _value(old_state, attribute)
+    # Attribute-only updates don't count as a state change
+    return new_state.state != old_state.state
+
+
+def build_call(rule: dict, old_state, new_state) -> dict:
+    """The notifyai.generate data for a fired rule."""
+    placeholders = _Placeholders(
+        entity_id=new_state.entity_id,
+        name=new_state.name,
+        state=new_state.state,
+        from_state=old_state.state,
+        attribute=_value(new_state, rule["attribute"]) if rule.get("attribute") else "",
+    )
+    data = {field: rule[field] for field in CALL_FIELDS if field in rule}
+    data["event"] = rule["event"].format_map(placeholders)
+    if rule.get("context"):
+        data["context"] = rule["context"].format_map(placeholders)
+    data["source_entity"] = new_state.entity_id
+    return data
+
+
+class TriggerEngine:
+    """Listen to state changes and start a generate call for every rule that fires."""
+
+    def __init__(self, hass: HomeAssistant, rules: list, runner) -> None:
+        """Initialize the engine; `runner(data)` is awaited for each fired rule."""
+        self._hass = hass
+        self._runner = runner
+        self.index = TriggerIndex(rules)
+        self.fired = 0
+        self.failed = 0
+        self._unsub = None
+
+    def async_start(self) -> None:
+        """Subscribe to state changes (nothing to do without rules)."""
+        if self.index.rules and self._unsub is None:
+            self._unsub = self._hass.bus.async_listen(EVENT_STATE_CHANGED, self._async_state_changed)
+
+    def async_reload(self, rules: list) -> None:
+        """Swap in a new rule set (the listener is added or removed as needed)."""
+        self.index = TriggerIndex(rules)
+        if not rules:
+            self.async_stop()
+        else:
+            self.async_start()
+
+    def async_stop(self) -> None:
+        """Unsubscribe."""
+        if self._unsub is not None:
+            self._unsub()
+            self._unsub = None
+
+    @callback
+    def _async_state_changed(self, event: Event) -> None:
+        rules = self.index.match(event.data["entity_id"])
+        if not rules:
+            return
+        old_state = event.data.get("old_state")
+        new_state = event.data.get("new_state")
+        # Entities appearing (startup) or being removed are not transitions
+        if old_state is None or new_state is None:
+            return
+        for rule in rules:
+            if rule_fires(rule, old_state, new_state):
+                self.fired += 1
+                try:
+                    data = build_call(rule, old_state, new_state)
+                except FORMAT_ERRORS as e:
+                    # parse_rules rejects malformed templates; never let one escape the bus callback
+                    self.failed += 1
+                    _LOGGER.error("NotifyAI - Trigger rule for %s has a bad template: %s", new_state.entity_id, e)
+                    continue
+                self._hass.async_create_task(self._async_run(data))
+
+    async def _async_run(self, data: dict) -> None:
+        try:
+            await self._runner(data)
+        except Exception as e:
+            self.failed += 1
+            _LOGGER.error("NotifyAI - Trigger rule for %s failed: %s", data.get("source_entity"), e)
+
+    def as_dict(self) -> dict:
+        """Rule index and counters for diagnostics."""
+        return {**self.index.as_dict(), "listening": self._unsub is not None, "fired": self.fired, "failed": self.failed}
@@ -0,0 +1,198 @@
+"""Request counters for NotifyAI - sliding minute/day windows and provider-day totals."""
+import logging
+import math
+import time
+from array import array
+from datetime import datetime, time as dt_time, timedelta
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_track_point_in_utc_time
+from homeassistant.util import dt as dt_util
+
+from .const import QUOTA_RESET_TIMEZONES
+
+_LOGGER = logging.getLogger(__name__)
+
+# Time constant of the smoothed burn rate (seconds)
+BURN_RATE_TAU = 1800
+
+
+class RingCounter:
+    """Sliding-window event count in a fixed ring of time buckets."""
+
+    __slots__ = ("_width", "_size", "_counts", "_slots")
+
+    def __init__(self, bucket_seconds: int, buckets: int) -> None:
+        """Initialize a window of bucket_seconds * buckets seconds."""
+        self._width = bucket_seconds
+        self._size = buckets
+        self._counts = array("L", [0]) * buckets
+        # Absolute bucket number each slot currently holds (-1 = never used)
+        self._slots = array("q", [-1]) * buckets
+
+    def add(self, now: float, count: int = 1) -> None:
+        """Count events at monotonic time `now`."""
+        bucket = int(now // self._width)
+        slot = bucket % self._size
+        if self._slots[slot] != bucket:
+            self._slots[slot] = bucket
+            self._counts[slot] = 0
+        self._counts[slot] += count
+
+    def total(self, now: float, seconds: float = None) -> int:
+        """Events in the window (or in its last `seconds`, rounded to whole buckets)."""
+        buckets = self._size if seconds is None else max(1, min(self._size, -(-int(seconds) // self._width)))
+        oldest = int(now // self._width) - buckets + 1
+        return sum(
+            count for count, bucket in zip(self._counts, self._slots)
+            if bucket >= oldest
+        )
+
+    def clear(self) -> None:
+        for slot in range(self._size):
+            self._slots[slot] = -1
+            self._counts[slot] = 0
+
+
+class EwmaRate:
+    """Exponentially weighted event rate (events per second) with time constant `tau`.
+
+    Each event adds 1/tau and the estimate decays by exp(-dt/tau) in between, so
+    irregular traffic needs no sampling timer and a read is O(1).
+    """
+
+    __slots__ = ("tau", "_rate", "_last")
+
+    def __init__(self, tau: float) -> None:
+        self.tau = tau
+        self._rate = 0.0
+        self._last = None
+
+    def add(self, now: float, count: int = 1) -> None:
+        self._rate = self.rate(now) + count / self.tau
+        self._last = now
+
+    def rate(self, now: float) -> float:
+        if self._last is None:
+            return 0.0
+        return self._rate * math.exp(-max(0.0, now - self._last) / self.tau)
+
+
+class UsageCounter:
+    """Requests in the last minute, the last 24 hours and the current provider day."""
+
+    __slots__ = ("minute", "rolling_day", "day")
+
+    def __init__(self) -> None:
+        self.minute = RingCounter(1, 60)
+        self.rolling_day = RingCounter(900, 96)
+        self.day = 0
+
+    def add(self, now: float) -> None:
+        self.minute.add(now)
+        self.rolling_day.add(now)
+        self.day += 1
+
+
+def next_quota_reset(provider: str, now: datetime = None) -> datetime:
+    """Next daily quota reset of a provider (midnight in its quota time zone), in UTC."""
+    time_zone = dt_util.get_time_zone(QUOTA_RESET_TIMEZONES.get(provider, "UTC")) or dt_util.UTC
+    local_now = (now or dt_util.utcnow()).astimezone(time_zone)
+    midnight = datetime.combine(local_now.date() + timedelta(days=1), dt_time.min, tzinfo=time_zone)
+    return dt_util.as_utc(midnight)
+
+
+class UsageTracker:
+    """Per-entry request counters, also split per model and per (model, key).
+
+    The provider-day totals are cleared at the provider's quota reset boundary
+    by a scheduled callback; listeners (key pool, model policy) reset with them.
+    """
+
+    def __init__(self, hass: HomeAssistant, provider: str) -> None:
+        """Initialize the tracker."""
+        self._hass = hass
+        self.provider = provider
+        self._counters = {}
+        # Smoothed entry-level burn rate for the exhaustion forecast
+        self.ewma = EwmaRate(BURN_RATE_TAU)
+        self._reset_listeners = []
+        self._unsub_reset = None
+        self.next_reset = None
+        self.last_reset = None
+
+    def _counter(self, scope) -> UsageCounter:
+        counter = self._counters.get(scope)
+        if counter is None:
+            counter = self._counters[scope] = UsageCounter()
+        return counter
+
+    def record(self, model: str, api_key: str = None) -> None:
+        """Count one successful provider request."""
+        now = time.monotonic()
+        self.ewma.add(now)
+        self._counter(None).add(now)
+        self._counter(model).add(now)
+        if api_key:
+            self._counter((model, api_key)).add(now)
+
+    def day_count(self, model: str = None, api_key: str = None) -> int:
+        """Requests since the provider's last daily reset."""
+        scope = (model, api_key) if api_key else model
+        counter = self._counters.get(scope)
+        return counter.day if counter else 0
+
+    def minute_count(self, model: str = None) -> int:
+        """Requests in the last 60 seconds."""
+        counter = self._counters.get(model)
+        return counter.minute.total(time.monotonic()) if counter else 0
+
+    def recent_count(self, seconds: float, model: str = None) -> int:
+        """Requests in the last `seconds` (up to 24 hours, 15-minute resolution)."""
+        counter = self._counters.get(model)
+        return counter.rolling_day.total(time.monotonic(), seconds) if counter else 0
+
+    def burn_rate(self) -> float:
+        """Smoothed requests per second over roughly the last BURN_RATE_TAU seconds."""
+        return self.ewma.rate(time.monotonic())
+
+    def add_reset_listener(self, listener) -> None:
+        """Call `listener()` whenever the daily totals are reset."""
+        self._reset_listeners.append(listener)
+
+    @callback
+    def async_start(self) -> None:
+        """Schedule the first daily reset."""
+        self.next_reset = next_quota_reset(self.provider)
+        self._unsub_reset = async_track_point_in_utc_time(self._hass, self._async_reset, self.next_reset)
+
+    @callback
+    def async_stop(self) -> None:
+        """Cancel the scheduled reset."""
+        if self._unsub_reset is not None:
+            self._unsub_reset()
+            self._unsub_reset = None
+
+    @callback
+    def _async_reset(self, now: datetime) -> None:
+        """Clear the provider-day totals and schedule the next reset."""
+        for counter in self._counters.values():
+            counter.day = 0
+        self.last_reset = dt_util.now()
+        for listener in self._reset_listeners:
+            listener()
+        _LOGGER.debug("NotifyAI - Daily quota counters reset for %s", self.provider)
+        # Step past the boundary we were called for so a slightly early callback can't reschedule it
+        self.next_reset = next_quota_reset(self.provider, now + timedelta(seconds=1))
+        self._unsub_reset = async_track_point_in_utc_time(self._hass, self._async_reset, self.next_reset)
+
+    def as_dict(self) -> dict:
+        """Entry-level counters for sensor attributes."""
+        return {
+            "requests_last_minute": self.minute_count(),
+            "requests_last_24h": self.recent_count(86400),
+            "requests_today": self.day_count(),
+            "quota_reset_time_zone": QUOTA_RESET_TIMEZONES.get(self.provider, "UTC"),
+            "next_reset": dt_util.as_local(self.next_reset).isoformat() if self.next_reset else None,
+            "last_reset": self.last_reset.isoformat() if self.last_reset else None,
+        }
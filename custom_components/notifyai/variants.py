@@ -0,0 +1,80 @@
+"""Per-event pools of pre-generated notification variants."""
+import time
+from collections import OrderedDict, deque
+
+# Appended to the system prompt when several variants are requested at once
+VARIANTS_SYSTEM_PROMPT = """
+
+MULTIPLE VARIANTS (overrides OUTPUT FORMAT):
+- Write {count} different notifications for the same event; each must use different wording and sentence structure.
+- Variants are sent at different times later, so do not mention the exact time.
+- Return ONLY a JSON array with {count} objects:
+[{{"title": "<title 1>", "body": "<body 1>"}}, ...]"""
+
+# Upper bound of events that hold a pool at the same time
+MAX_VARIANT_EVENTS = 256
+
+
+class VariantPool:
+    """Bounded LRU of unused variants per event key."""
+
+    def __init__(self, max_variants: int = 0, max_age: float = 86400) -> None:
+        """Initialize the pool; max_age is in seconds."""
+        self.max_variants = max_variants
+        self.max_age = max_age
+        self._pools = OrderedDict()
+        self.served = 0
+        self.refills = 0
+
+    def __len__(self) -> int:
+        return sum(len(pool["variants"]) for pool in self._pools.values())
+
+    def take(self, key: tuple):
+        """Hand out one unused variant for the event, or None."""
+        pool = self._pools.get(key)
+        if pool is None:
+            return None
+        if time.monotonic() - pool["created"] > self.max_age or not pool["variants"]:
+            del self._pools[key]
+            return None
+
+        variant = pool["variants"].popleft()
+        if not pool["variants"]:
+            del self._pools[key]
+        else:
+            self._pools.move_to_end(key)
+        self.served += 1
+        return variant
+
+    def fill(self, key: tuple, variants: list) -> None:
+        """Replace the event's pool with freshly generated variants."""
+        if self.max_variants <= 0 or not variants:
+            return
+        self._pools[key] = {
+            "variants": deque(variants[:self.max_variants]),
+            "created": time.monotonic(),
+        }
+        self._pools.move_to_end(key)
+        self.refills += 1
+        while len(self._pools) > MAX_VARIANT_EVENTS:
+            self._pools.popitem(last=False)
+
+    def resize(self, max_variants: int, max_age: float) -> None:
+        """Change the pool settings, trimming pools that hold more than the new bound."""
+        self.max_variants = max_variants
+        self.max_age = max_age
+        for key in list(self._pools):
+            variants = self._pools[key]["variants"]
+            while len(variants) > max(0, max_variants):
+                variants.pop()
+            if not variants:
+                del self._pools[key]
+
+    def as_dict(self) -> dict:
+        """Pool statistics for sensor attributes."""
+        return {
+            "events": len(self._pools),
+            "variants": len(self),
+            "served": self.served,
+            "refills": self.refills,
+        }
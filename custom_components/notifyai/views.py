@@ -0,0 +1,122 @@
+"""Authenticated bulk HTTP endpoint - a JSON array in, NDJSON results out as they complete."""
+import asyncio
+import json
+import logging
+from http import HTTPStatus
+
+from aiohttp import web
+
+from homeassistant.components.http import HomeAssistantView
+from homeassistant.core import Context, HomeAssistant
+from homeassistant.exceptions import HomeAssistantError, Unauthorized
+
+from .batch import DEFAULT_BATCH_CONCURRENCY
+from .router import async_loaded_entries, async_select_entry
+
+_LOGGER = logging.getLogger(__name__)
+
+BULK_URL = "/api/notifyai/generate"
+
+# Upper bounds for one request
+MAX_BULK_ITEMS = 500
+MAX_BULK_CONCURRENCY = 32
+
+# Fields that make no sense on a streamed HTTP request
+DROPPED_FIELDS = ("background",)
+
+# Fields naming files on the Home Assistant host; only allowlisted paths are read
+PATH_FIELDS = ("image_path", "clip_path", "image_paths")
+
+
+class NotifyAIBulkView(HomeAssistantView):
+    """POST a JSON array of generate requests, read back one JSON line per finished item.
+
+    The body is either a bare array or {"items": [...], "concurrency": n,
+    "entry_id": "..."}. Items go through the same pipeline as notifyai.generate
+    (suppression, digest, routing, traffic recording), at most `concurrency`
+    at a time; each result line carries the item's index, so the producer
+    can match results that arrive out of order.
+
+    Items can call any notify/TTS service and read camera images, so only
+    administrators may use it; the services are called with their context.
+    """
+
+    url = BULK_URL
+    name = "api:notifyai:generate"
+    requires_auth = True
+
+    def __init__(self, handler) -> None:
+        """Initialize the view; `handler(entry, data)` is awaited for each item."""
+        self._handler = handler
+
+    async def post(self, request: web.Request) -> web.StreamResponse:
+        """Run the items and stream the results."""
+        hass = request.app["hass"]
+        user = request["hass_user"]
+        if not user.is_admin:
+            raise Unauthorized()
+        try:
+            body = await request.json()
+        except ValueError:
+            return self.json_message("Body must be JSON", HTTPStatus.BAD_REQUEST)
+
+        options = body if isinstance(body, dict) else {}
+        items = options.get("items") if isinstance(body, dict) else body
+        if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+            return self.json_message("Expected a JSON array of objects", HTTPStatus.BAD_REQUEST)
+        if len(items) > MAX_BULK_ITEMS:
+            return self.json_message(f"At most {MAX_BULK_ITEMS} items per request", HTTPStatus.BAD_REQUEST)
+        if not async_loaded_entries(hass):
+            return self.json_message("No NotifyAI entry is loaded", HTTPStatus.SERVICE_UNAVAILABLE)
+        try:
+            concurrency = int(options.get("concurrency") or request.query.get("concurrency") or DEFAULT_BATCH_CONCURRENCY)
+        except ValueError:
+            return self.json_message("concurrency must be a number", HTTPStatus.BAD_REQUEST)
+        concurrency = min(MAX_BULK_CONCURRENCY, max(1, concurrency))
+        default_entry_id = options.get("entry_id")
+        context = Context(user_id=user.id)
+
+        response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+        await response.prepare(request)
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run(index: int, item: dict) -> dict:
+            data = {key: value for key, value in item.items() if key not in DROPPED_FIELDS}
+            if not data.get("event"):
+                return {"index": index, "status": "error", "error": "event is required"}
+            if denied := _denied_path(hass, data):
+                return {"index": index, "status": "error", "error": f"Path not allowed: {denied}"}
+            data["call_context"] = context
+            async with semaphore:
+                try:
+                    entry = async_select_entry(hass, data.get("entry_id", default_entry_id))
+                    result = await self._handler(entry, data)
+                except HomeAssistantError as e:
+                    return {"index": index, "status": "error", "error": str(e)}
+                except Exception as e:
+                    _LOGGER.error("NotifyAI - Bulk item %s failed: %s", index, e)
+                    return {"index": index, "status": "error", "error": str(e)}
+            return {"index": index, "status": "ok", **result}
+
+        tasks = [hass.async_create_task(run(index, item)) for index, item in enumerate(items)]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                line = json.dumps(await finished, ensure_ascii=False, default=str)
+                await response.write(line.encode("utf-8") + b"\n")
+        except ConnectionResetError:
+            # The client went away; items already running still finish and deliver
+            _LOGGER.debug("NotifyAI - Bulk client disconnected before all results were sent")
+            return response
+        await response.write_eof()
+        return response
+
+
+def _denied_path(hass: HomeAssistant, data: dict):
+    """The first file path of an item outside allowlist_external_dirs, or None."""
+    for field in PATH_FIELDS:
+        value = data.get(field)
+        for path in value if isinstance(value, list) else [value]:
+            if path and not hass.config.is_allowed_path(str(path)):
+                return path
+    return None